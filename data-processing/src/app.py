@@ -4,16 +4,19 @@ Standalone Flask API Server for Semantic Search
 Run this on EC2 instance instead of using Lambda.
 
 Usage:
-    python app.py
+    python app.py                                        # development server
+    gunicorn -c gunicorn.conf.py "app:create_app()"      # pre-forked workers
 
 The server will start on http://0.0.0.0:5000
 """
 
+import hmac
 import json
 import yaml
 import logging
 import os
-from flask import Flask, request, jsonify
+import signal
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import sys
@@ -25,7 +28,11 @@ load_dotenv()
 # Add current directory to path
 sys.path.append(str(Path(__file__).parent))
 
+from unit_4_search_query.catalog import save_catalog_snapshot
+from unit_4_search_query.clients import get_client_registry
 from unit_4_search_query.search_service import SearchQueryService
+from unit_4_search_query.serialization import ResponseEncoder
+from unit_4_search_query.warmup import SearchWarmer
 
 # Configure logging
 logging.basicConfig(
@@ -41,6 +48,12 @@ CORS(app)  # Enable CORS for all routes
 # Global search service instance
 search_service = None
 
+# Startup warm-up and readiness (/health)
+warmer = None
+
+# Search response serializer/compressor (configured from api_response)
+response_encoder = ResponseEncoder()
+
 
 def load_config_with_env():
     """Load configuration from YAML and override with environment variables."""
@@ -70,28 +83,155 @@ def load_config_with_env():
     return config
 
 
-def init_service():
-    """Initialize search service on startup."""
-    global search_service
+def init_service(start_reload: bool = True):
+    """
+    Initialize search service on startup.
+    
+    Args:
+        start_reload: Start tag index hot reload and background warm-up now
+                      (False in a pre-fork master, where threads would not
+                      survive the fork)
+    """
+    global search_service, warmer, response_encoder
     
     try:
         logger.info("Initializing search service...")
         config = load_config_with_env()
-        search_service = SearchQueryService(config)
+        # Pools sized for server.threads concurrent requests per process
+        search_service = SearchQueryService(config, clients=get_client_registry(config))
+        response_encoder = ResponseEncoder(config)
+        warmer = SearchWarmer(search_service, config)
+        if start_reload:
+            enable_tag_index_reload(config)
+            # /health reports 503 until warm-up has finished
+            warmer.start_background()
         logger.info("✓ Search service initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize search service: {str(e)}", exc_info=True)
         raise
 
 
+def create_app():
+    """
+    App factory for pre-forked serving (gunicorn with preload_app).
+    
+    Builds config, compiled catalog, tag index and caches once in the
+    master so forked workers share them copy-on-write. The master is also
+    the one process that refreshes the catalog snapshot. Cluster and cache
+    warm-up (k-NN graphs, head-query replay) also runs here, before any
+    worker starts; the master then closes its connections so none are
+    inherited. Each worker calls init_worker() to get its own OpenSearch
+    and Bedrock clients.
+    """
+    if search_service is None:
+        init_service(start_reload=False)
+        save_catalog_snapshot(search_service.config)
+        warmer.run(steps=[step for step in warmer.steps if step != 'connections'])
+        # Fork without the warm-up's keep-alive sockets
+        search_service.reset_clients()
+    return app
+
+
+def init_worker():
+    """Per-worker setup after fork: fresh network clients (warmed) and reload watcher."""
+    search_service.reset_clients()
+    enable_tag_index_reload(search_service.config, install_signal=False)
+    if 'connections' in warmer.steps:
+        warmer.run(steps=['connections'])
+    logger.info(f"✓ Worker {os.getpid()} ready")
+
+
+def json_response(result, status_code: int) -> Response:
+    """Serialize a search response, compressed per the client's Accept-Encoding."""
+    body, headers = response_encoder.encode(result, request.headers.get('Accept-Encoding'))
+    return Response(body, status=status_code, headers=headers)
+
+
+def enable_tag_index_reload(config, install_signal: bool = True):
+    """
+    Hot-reload the tag index on source file changes and on SIGHUP.
+    
+    Gunicorn workers leave SIGHUP to the master (which restarts workers)
+    and rely on the file watcher.
+    """
+    reload_config = config.get('related_tags', {}).get('hot_reload', {})
+    if not reload_config.get('enabled', False):
+        return
+    
+    tag_index = search_service.tag_index
+    if reload_config.get('watch_files', True):
+        tag_index.start_watcher(reload_config.get('poll_interval_seconds', 30))
+    
+    if not install_signal:
+        return
+    
+    try:
+        signal.signal(signal.SIGHUP, lambda signum, frame: tag_index.reload_async())
+        logger.info("✓ SIGHUP reloads the tag index")
+    except (AttributeError, ValueError):
+        # No SIGHUP on this platform, or not running in the main thread
+        logger.warning("SIGHUP tag index reload not available")
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
+    """
+    Health check endpoint.
+    
+    Doubles as the readiness probe: 503 with status 'warming' until the
+    startup warm-up has finished.
+    """
+    warmup = warmer.status() if warmer else {'state': 'pending', 'ready': False}
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if warmup['ready'] else 'warming',
         'service': 'semantic-search-api',
-        'version': '1.0.0'
-    })
+        'version': '1.0.0',
+        'warmup': warmup,
+        'llm_cache': search_service.llm_service.get_cache_stats() if search_service else None,
+        'tag_index': search_service.tag_index.get_snapshot_info() if search_service else None
+    }), 200 if warmup['ready'] else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Latency histograms and counters for this process.
+    
+    JSON by default; ?format=prometheus returns Prometheus text format.
+    Under gunicorn each worker reports its own metrics.
+    """
+    if search_service is None:
+        return jsonify({'status': 'error', 'message': 'service not initialized'}), 503
+    
+    if request.args.get('format') == 'prometheus':
+        return Response(search_service.metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(search_service.metrics.snapshot())
+
+
+@app.route('/admin/reload-tags', methods=['POST'])
+def reload_tags():
+    """
+    Rebuild the tag index in the background and swap it in.
+    
+    Requires the X-Admin-Token header to match ADMIN_TOKEN; the endpoint
+    is disabled when ADMIN_TOKEN is not set.
+    """
+    admin_token = os.getenv('ADMIN_TOKEN')
+    # Refused outright without a configured token; otherwise compared in
+    # constant time (as bytes, so non-ASCII header values cannot raise)
+    provided = request.headers.get('X-Admin-Token', '')
+    if not admin_token or not hmac.compare_digest(provided.encode('utf-8'), admin_token.encode('utf-8')):
+        return jsonify({
+            'status': 'error',
+            'error_code': 'FORBIDDEN',
+            'message': 'Admin token required'
+        }), 403
+    
+    search_service.tag_index.reload_async()
+    return jsonify({
+        'status': 'accepted',
+        'tag_index': search_service.tag_index.get_snapshot_info()
+    }), 202
 
 
 @app.route('/search/text', methods=['POST'])
@@ -131,7 +271,7 @@ def text_search():
         
         # Return response
         status_code = 200 if result.get('status') == 'success' else 400
-        return jsonify(result), status_code
+        return json_response(result, status_code)
         
     except Exception as e:
         logger.error(f"Error in text search: {str(e)}", exc_info=True)
@@ -142,6 +282,57 @@ def text_search():
         }), 500
 
 
+@app.route('/search/text/batch', methods=['POST'])
+def text_search_batch():
+    """
+    Batch text search endpoint for offline jobs (merchandising, SEO).
+    
+    Request body:
+    {
+        "queries": ["grey sofa", "oak dining table", ...],
+        "llm_fallback": false,   # optional, default true
+        "include_tags": false    # optional, default true
+    }
+    
+    Response:
+    {
+        "status": "success",
+        "total_queries": 2,
+        "responses": [{...text search response...}, ...],
+        "batch_metadata": {...}
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'queries' not in data:
+            return jsonify({
+                'status': 'error',
+                'error_code': 'INVALID_REQUEST',
+                'message': 'Missing required field: queries'
+            }), 400
+        
+        queries = data.get('queries', [])
+        
+        logger.info(f"Batch text search request: {len(queries) if isinstance(queries, list) else 0} queries")
+        result = search_service.get_text_results_batch(
+            queries,
+            llm_fallback=bool(data.get('llm_fallback', True)),
+            include_tags=bool(data.get('include_tags', True))
+        )
+        
+        status_code = 200 if result.get('status') == 'success' else 400
+        return json_response(result, status_code)
+        
+    except Exception as e:
+        logger.error(f"Error in batch text search: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/search/image', methods=['POST'])
 def image_search():
     """
@@ -179,7 +370,7 @@ def image_search():
         
         # Return response
         status_code = 200 if result.get('status') == 'success' else 400
-        return jsonify(result), status_code
+        return json_response(result, status_code)
         
     except Exception as e:
         logger.error(f"Error in image search: {str(e)}", exc_info=True)
@@ -231,7 +422,7 @@ def refine_search():
         
         # Return response
         status_code = 200 if result.get('status') == 'success' else 400
-        return jsonify(result), status_code
+        return json_response(result, status_code)
         
     except Exception as e:
         logger.error(f"Error in refine search: {str(e)}", exc_info=True)
@@ -298,14 +489,21 @@ def main():
         logger.error("Failed to start server")
         sys.exit(1)
     
+    # Debug mode: per-request stage timings in search_metadata
+    if args.debug:
+        search_service.metrics.debug = True
+    
     # Start server
     logger.info(f"Starting server on {args.host}:{args.port}")
     logger.info("=" * 60)
     logger.info("Available endpoints:")
     logger.info(f"  GET  http://{args.host}:{args.port}/health")
+    logger.info(f"  GET  http://{args.host}:{args.port}/metrics")
     logger.info(f"  POST http://{args.host}:{args.port}/search/text")
+    logger.info(f"  POST http://{args.host}:{args.port}/search/text/batch")
     logger.info(f"  POST http://{args.host}:{args.port}/search/image")
     logger.info(f"  POST http://{args.host}:{args.port}/search/refine")
+    logger.info(f"  POST http://{args.host}:{args.port}/admin/reload-tags")
     logger.info("=" * 60)
     
     app.run(
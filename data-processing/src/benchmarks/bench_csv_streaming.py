@@ -0,0 +1,145 @@
+"""
+Benchmark: streaming, schema-typed CSV ingestion vs whole-object reads.
+
+Writes the synthetic catalog from bench_enrich_variants.py as CSV exports,
+serves them through an in-memory S3 stub, checks that the streamed
+enriched batches match the previous load (read + decode + StringIO +
+dtype inference) followed by enrich_variant_data, then reports time and
+peak traced memory (Python and NumPy allocations) for:
+
+    legacy load    whole-object read of every file, inferred dtypes
+    typed load     load_all_data (chunked parse, CSV_SCHEMAS dtypes)
+    stream         iter_enriched_batches, batches consumed and dropped
+
+Usage:
+    python benchmarks/bench_csv_streaming.py
+    python benchmarks/bench_csv_streaming.py --variants 200000 --batch-rows 10000
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from bench_enrich_variants import normalize, synthetic_catalog
+from unit_1_data_ingestion.data_ingestion_service import DataIngestionService
+from unit_1_data_ingestion.s3_fetch import S3Fetcher
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
+
+FILES = ['variant.csv', 'variant_image.csv', 'variant_property.csv',
+         'variant_option.csv', 'variant_affinity.csv', 'variant_file.csv']
+
+
+class InMemoryS3:
+    """get_object over a dict of key -> bytes (bodies are file objects, like StreamingBody)."""
+
+    def __init__(self, objects: Dict[str, bytes]):
+        self.objects = objects
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None) -> Dict:
+        data = self.objects[Key]
+        etag = f'"{Key}"'  # objects never change
+        if Range is None:
+            return {'Body': BytesIO(data), 'ETag': etag}
+        first, last = (int(n) for n in Range[len('bytes='):].split('-'))
+        last = min(last, len(data) - 1)
+        return {'Body': BytesIO(data[first:last + 1]), 'ETag': etag,
+                'ContentRange': f'bytes {first}-{last}/{len(data)}'}
+
+
+def make_service(n_variants: int, batch_rows: int) -> DataIngestionService:
+    """DataIngestionService over CSV exports of a synthetic catalog."""
+    objects = {
+        f'data/{name}.csv': df.to_csv(index=False).encode('utf-8')
+        for name, df in synthetic_catalog(n_variants).items()
+    }
+    service = DataIngestionService.__new__(DataIngestionService)
+    service.config = {
+        'aws': {'s3': {'files': FILES}},
+        'data_ingestion': {'csv_chunk_rows': 100000, 'enriched_batch_rows': batch_rows}
+    }
+    service.s3_client = InMemoryS3(objects)
+    service.bucket = 'benchmark'
+    service.prefix = 'data/'
+    service.fetcher = S3Fetcher(service.s3_client, service.bucket, service.config)
+    # Every run parses: snapshots would hide the cost being measured
+    service.snapshots = SnapshotCache('.ingestion_cache', enabled=False)
+    return service
+
+
+def legacy_load_all_data(service: DataIngestionService) -> Dict[str, pd.DataFrame]:
+    """The previous loader: whole object -> str -> StringIO -> inferred dtypes."""
+    dataframes = {}
+    for filename in FILES:
+        response = service.s3_client.get_object(Bucket=service.bucket, Key=f'{service.prefix}{filename}')
+        csv_content = response['Body'].read().decode('utf-8')
+        dataframes[filename.replace('.csv', '')] = pd.read_csv(StringIO(csv_content))
+    return dataframes
+
+
+def measure(label: str, run) -> None:
+    """Print wall time and peak traced memory for one run."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<14} {elapsed:>8.2f}s {peak / 2**20:>10.1f} MiB   {result}")
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark streaming CSV ingestion')
+    parser.add_argument('--variants', type=int, default=50000, help='Catalog size (default: 50000)')
+    parser.add_argument('--batch-rows', type=int, default=5000, help='Variants per streamed batch')
+    args = parser.parse_args()
+
+    check = make_service(2000, batch_rows=300)
+    expected = check.enrich_variant_data(legacy_load_all_data(check))
+    streamed = [product for batch in check.iter_enriched_batches() for product in batch]
+    assert normalize(streamed) == normalize(expected), 'streamed products differ from the legacy load'
+    print(f"✓ Streamed batches match the legacy load on 2000 variants")
+
+    service = make_service(args.variants, args.batch_rows)
+    raw_mib = sum(len(body) for body in service.s3_client.objects.values()) / 2**20
+    print(f"{args.variants} variants, {raw_mib:.1f} MiB of CSV")
+
+    def legacy_load():
+        dataframes = legacy_load_all_data(service)
+        return f"{sum(df.memory_usage(deep=True).sum() for df in dataframes.values()) / 2**20:.1f} MiB frames"
+
+    def typed_load():
+        dataframes = service.load_all_data()
+        return f"{sum(df.memory_usage(deep=True).sum() for df in dataframes.values()) / 2**20:.1f} MiB frames"
+
+    def legacy_enrich():
+        return f"{len(service.enrich_variant_data(legacy_load_all_data(service)))} products"
+
+    def stream():
+        batches = products = 0
+        for batch in service.iter_enriched_batches():
+            batches += 1
+            products += len(batch)
+        return f"{products} products in {batches} batches"
+
+    print(f"  {'':<14} {'time':>9} {'peak':>14}")
+    measure('legacy load', legacy_load)
+    measure('typed load', typed_load)
+    measure('legacy enrich', legacy_enrich)
+    measure('stream', stream)
+
+
+if __name__ == '__main__':
+    main()
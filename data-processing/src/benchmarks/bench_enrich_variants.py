@@ -0,0 +1,227 @@
+"""
+Benchmark: DataIngestionService.enrich_variant_data on synthetic catalogs.
+
+Generates variant tables with the related image, property, option,
+affinity and file tables (about 21 related rows per variant, with missing
+values), checks the groupby join against the previous per-variant
+boolean-mask loop on a small catalog, then times both as the catalog grows.
+The legacy loop is only run up to --legacy-max variants.
+
+Usage:
+    python benchmarks/bench_enrich_variants.py
+    python benchmarks/bench_enrich_variants.py --sizes 10000,100000,500000
+"""
+
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from unit_1_data_ingestion.data_ingestion_service import DataIngestionService
+
+
+def synthetic_catalog(n_variants: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Synthetic variant tables shaped like the S3 CSV exports."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n_variants + 1)
+
+    def pick(values, n, missing=0.0):
+        column = pd.Series(rng.choice(values, n), dtype=object)
+        if missing:
+            column[rng.random(n) < missing] = np.nan
+        return column
+
+    variants = pd.DataFrame({
+        'variant_id': ids,
+        'product_id': ids // 3 + 1000,
+        'sku': [f'SKU{i:08d}' for i in ids],
+        'variant_name': pick(['Grey Sofa', 'Oak Table', 'Linen Bed', 'Leather Chair'], n_variants),
+        'product_name': pick(['Madison', 'Hudson', 'Marlow', 'Dawson'], n_variants),
+        'description': pick(['Comfortable and durable', 'Solid wood frame', ''], n_variants, missing=0.1),
+        'sale_price': np.where(rng.random(n_variants) < 0.2, np.nan, rng.uniform(100, 3000, n_variants).round(2)),
+        'original_price': rng.uniform(100, 3000, n_variants).round(2),
+        'currency': 'SGD',
+        'lifecycle_status': 'active',
+        'product_type': 'furniture',
+        'frontend_category': pick(['Sofas', 'Tables', 'Beds', 'Chairs'], n_variants),
+        'backend_category': pick(['Living Room', 'Dining', 'Bedroom'], n_variants, missing=0.05),
+        'review_count': rng.integers(0, 500, n_variants),
+        'review_rating': rng.uniform(0, 5, n_variants).round(1),
+        'stock_status': 'in_stock',
+        'market': 'SG',
+        'url': [f'/products/{i}' for i in ids],
+        'delivery_time': '2-3 weeks'
+    })
+
+    def related(per_variant: int, columns: Dict) -> pd.DataFrame:
+        n = n_variants * per_variant
+        # Shuffled so each variant's rows are scattered through the table
+        frame = pd.DataFrame({'variant_id': rng.permutation(np.repeat(ids, per_variant))})
+        for name, make in columns.items():
+            frame[name] = make(n)
+        return frame
+
+    return {
+        'variant': variants,
+        'variant_image': related(5, {
+            'image_type': lambda n: pick(['product', 'lifestyle'], n),
+            'image_url': lambda n: pd.Series([f'https://cdn.example.com/{i}.jpg' for i in range(n)]),
+            'image_position': lambda n: rng.integers(0, 10, n),
+            'default_image': lambda n: rng.random(n) < 0.2
+        }),
+        'variant_property': related(8, {
+            'property_category': lambda n: pick(['Material', 'Dimensions', 'Care'], n),
+            'property_type': lambda n: pick(['Fabric', 'Width', 'Height', 'Cleaning'], n),
+            'property_value': lambda n: pick(['Linen', '200 cm', '90 cm', 'Spot clean', ''], n, missing=0.1)
+        }),
+        'variant_option': related(3, {
+            'option_type': lambda n: pick(['Color', 'Size'], n),
+            'option_value': lambda n: pick(['Grey', 'Blue', 'Large', 'Small'], n)
+        }),
+        'variant_affinity': related(4, {
+            'affinity_type': lambda n: pick(['similar', 'bundle'], n),
+            'affinity_group_variant_id': lambda n: rng.integers(1, n_variants + 1, n)
+        }),
+        'variant_file': related(1, {
+            'file_type': lambda n: pick(['manual', 'assembly'], n),
+            'file_url': lambda n: pd.Series([f'https://cdn.example.com/{i}.pdf' for i in range(n)])
+        })
+    }
+
+
+def legacy_enrich_variant_data(dataframes: Dict[str, pd.DataFrame]) -> List[Dict]:
+    """The previous implementation: iterrows plus a boolean mask per variant and table."""
+    variants_df = dataframes['variant']
+    images_df = dataframes['variant_image']
+    properties_df = dataframes['variant_property']
+    options_df = dataframes['variant_option']
+    affinity_df = dataframes['variant_affinity']
+    files_df = dataframes['variant_file']
+
+    enriched_products = []
+    for _, variant in variants_df.iterrows():
+        variant_id = str(variant['variant_id'])
+
+        images = [{
+            'type': img.get('image_type', ''),
+            'url': img.get('image_url', ''),
+            'position': img.get('image_position', 0),
+            'is_default': img.get('default_image', False)
+        } for _, img in images_df[images_df['variant_id'] == int(variant_id)].iterrows()]
+
+        properties = {}
+        property_texts = []
+        for _, prop in properties_df[properties_df['variant_id'] == int(variant_id)].iterrows():
+            cat = prop.get('property_category', '')
+            ptype = prop.get('property_type', '')
+            pval = prop.get('property_value', '')
+            if cat not in properties:
+                properties[cat] = {}
+            properties[cat][ptype] = pval
+            if pval:
+                property_texts.append(f"{ptype}: {pval}")
+
+        options = [{
+            'type': opt.get('option_type', ''),
+            'value': opt.get('option_value', '')
+        } for _, opt in options_df[options_df['variant_id'] == int(variant_id)].iterrows()]
+
+        affinity = [{
+            'type': aff.get('affinity_type', ''),
+            'related_variant_id': str(aff.get('affinity_group_variant_id', ''))
+        } for _, aff in affinity_df[affinity_df['variant_id'] == int(variant_id)].iterrows()]
+
+        files = [{
+            'type': f.get('file_type', ''),
+            'url': f.get('file_url', '')
+        } for _, f in files_df[files_df['variant_id'] == int(variant_id)].iterrows()]
+
+        aggregated_text_parts = [
+            variant.get('variant_name', ''),
+            variant.get('product_name', ''),
+            variant.get('description', ''),
+            variant.get('frontend_category', ''),
+            variant.get('backend_category', ''),
+        ]
+        aggregated_text_parts.extend(property_texts)
+        aggregated_text = ' '.join([str(p) for p in aggregated_text_parts if pd.notna(p)])
+
+        enriched_products.append({
+            'variant_id': variant_id,
+            'aggregated_text': aggregated_text,
+            'price': float(variant.get('sale_price', 0) or variant.get('original_price', 0) or 0),
+            'images': images,
+            'properties': properties,
+            'options': options,
+            'affinity': affinity,
+            'files': files
+        })
+    return enriched_products
+
+
+def normalize(value):
+    """Make NaN comparable and NumPy scalars plain for the equivalence check."""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    return value
+
+
+def check_equivalence(service: DataIngestionService, n_variants: int = 300):
+    """Assert the groupby join matches the legacy loop on the compared fields."""
+    dataframes = synthetic_catalog(n_variants, seed=1)
+    legacy = legacy_enrich_variant_data(dataframes)
+    current = service.enrich_variant_data(dataframes)
+    assert len(legacy) == len(current)
+    for old, new in zip(legacy, current):
+        for key, value in old.items():
+            assert normalize(new[key]) == normalize(value), f"{key} differs for {old['variant_id']}"
+    print(f"✓ Matches the legacy loop on {n_variants} variants")
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark enrich_variant_data')
+    parser.add_argument('--sizes', type=str, default='1000,2000,10000,50000,200000',
+                        help='Comma-separated variant counts')
+    parser.add_argument('--legacy-max', type=int, default=2000,
+                        help='Largest catalog to run the legacy loop on (default: 2000)')
+    args = parser.parse_args()
+
+    # The S3 client is never used by enrich_variant_data
+    service = DataIngestionService.__new__(DataIngestionService)
+    check_equivalence(service)
+
+    print(f"{'variants':>10} {'rows':>11} {'groupby s':>10} {'µs/row':>8} {'legacy s':>10}")
+    for n_variants in (int(size) for size in args.sizes.split(',')):
+        dataframes = synthetic_catalog(n_variants)
+        rows = sum(len(df) for df in dataframes.values())
+
+        start = time.perf_counter()
+        service.enrich_variant_data(dataframes)
+        elapsed = time.perf_counter() - start
+
+        legacy = ''
+        if n_variants <= args.legacy_max:
+            start = time.perf_counter()
+            legacy_enrich_variant_data(dataframes)
+            legacy = f'{time.perf_counter() - start:.2f}'
+
+        print(f"{n_variants:>10} {rows:>11} {elapsed:>10.2f} {elapsed / rows * 1e6:>8.2f} {legacy:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: streamed vs whole-file image CSVs for local image embedding jobs.
+
+Writes synthetic image_base64/batch_*.csv files (random payloads of
+--image-kb each), stubs the Bedrock call, and reports wall time and peak
+traced memory for:
+
+    whole file   load_image_data per file + generate_embeddings_for_images_batch
+    streamed     iter_image_rows over the glob + generate_embeddings_for_images_batch
+
+The same embedding batch files are written by both. Streamed peak memory
+should stay flat as the number of images grows.
+
+Usage:
+    python benchmarks/bench_image_streaming.py
+    python benchmarks/bench_image_streaming.py --images 500,2000 --image-kb 200
+"""
+
+import base64
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from unit_1_data_ingestion.data_ingestion_service_local import DataIngestionServiceLocal
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
+
+IMAGES_PER_FILE = 250
+
+
+def write_image_csvs(data_dir: Path, n_images: int, image_kb: int):
+    """image_base64/batch_N.csv files of IMAGES_PER_FILE rows."""
+    image_dir = data_dir / 'image_base64'
+    image_dir.mkdir(parents=True)
+    payload = base64.b64encode(os.urandom(image_kb * 1024)).decode('ascii')
+    for batch_num, start in enumerate(range(0, n_images, IMAGES_PER_FILE), start=1):
+        ids = range(start, min(start + IMAGES_PER_FILE, n_images))
+        pd.DataFrame({
+            'variant_id_image_id': [f'{i}_1' for i in ids],
+            'filename': [f'{i}.jpg' for i in ids],
+            # Distinct strings, as in real exports
+            'image_base64': [payload[:-8] + f'{i:08d}' for i in ids],
+            'variant_id': list(ids)
+        }).to_csv(image_dir / f'batch_{batch_num}.csv', index=False)
+
+
+def make_service(data_dir: Path) -> DataIngestionServiceLocal:
+    """Local service with Bedrock stubbed out."""
+    service = DataIngestionServiceLocal.__new__(DataIngestionServiceLocal)
+    service.config = {'data_ingestion': {'image_chunk_rows': 50}}
+    service.data_dir = data_dir
+    service.snapshots = SnapshotCache(str(data_dir), enabled=False)
+    service.generate_image_embedding = lambda image_base64: [len(image_base64) % 97 / 97.0] * 8
+    return service
+
+
+def whole_file(service: DataIngestionServiceLocal):
+    """The previous job shape: every file loaded into one DataFrame, then embedded."""
+    frames = [service.load_image_data(str(path.relative_to(service.data_dir)))
+              for path in service.image_csv_paths('image_base64/batch_*.csv')]
+    service.generate_embeddings_for_images_batch(pd.concat(frames, ignore_index=True), output_dir='whole')
+
+
+def streamed(service: DataIngestionServiceLocal):
+    service.generate_embeddings_for_images_batch(service.iter_image_rows('image_base64/batch_*.csv'),
+                                                 output_dir='streamed')
+
+
+def measure(label: str, run) -> float:
+    """Print wall time and peak traced memory for one run."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"    {label:<12} {elapsed:>7.2f}s {peak / 2**20:>9.1f} MiB")
+    return peak
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark streamed image CSV reading')
+    parser.add_argument('--images', type=str, default='500,2000',
+                        help='Comma-separated image counts (default: 500,2000)')
+    parser.add_argument('--image-kb', type=int, default=100, help='Raw image size in KiB (default: 100)')
+    args = parser.parse_args()
+
+    for n_images in (int(n) for n in args.images.split(',')):
+        data_dir = Path(tempfile.mkdtemp())
+        try:
+            write_image_csvs(data_dir, n_images, args.image_kb)
+            csv_mib = sum(p.stat().st_size for p in data_dir.rglob('*.csv')) / 2**20
+            print(f"{n_images} images, {csv_mib:.0f} MiB of CSV")
+
+            service = make_service(data_dir)
+            measure('whole file', lambda: whole_file(service))
+            measure('streamed', lambda: streamed(service))
+
+            outputs = [sorted((data_dir / name).iterdir()) for name in ('whole', 'streamed')]
+            assert [p.read_bytes() for p in outputs[0]] == [p.read_bytes() for p in outputs[1]], \
+                'streamed embedding batches differ'
+        finally:
+            shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
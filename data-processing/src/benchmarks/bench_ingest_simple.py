@@ -0,0 +1,146 @@
+"""
+Benchmark: DataIngestionServiceLocal.ingest_data_simple, column-wise vs iterrows.
+
+Writes a synthetic variant.csv (the catalog from bench_enrich_variants.py
+plus the extra text columns the simple ingestion reads, with missing,
+blank and numeric values), checks that the column-wise records equal the
+previous iterrows/safe_get loop, then times both on the parsed frame
+(CSV parsing is shared and excluded).
+
+Usage:
+    python benchmarks/bench_ingest_simple.py
+    python benchmarks/bench_ingest_simple.py --sizes 10000,100000,500000
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from bench_enrich_variants import synthetic_catalog
+from unit_1_data_ingestion.data_ingestion_service_local import DataIngestionServiceLocal
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
+
+
+def synthetic_variants(n_variants: int, seed: int = 0) -> pd.DataFrame:
+    """variant.csv as read by the simple ingestion."""
+    rng = np.random.default_rng(seed)
+    variants = synthetic_catalog(n_variants, seed)['variant']
+
+    def pick(values, missing):
+        column = pd.Series(rng.choice(np.array(values, dtype=object), n_variants), dtype=object)
+        column[rng.random(n_variants) < missing] = np.nan
+        return column
+
+    variants['frontend_subcategory'] = pick(['3 Seater', 'Dining Tables', 'Queen Beds'], 0.2)
+    variants['collection'] = pick(['Madison', 'Hudson', '  '], 0.3)
+    variants['color_tone'] = pick(['Grey', 'Natural', 'Dark'], 0.1)
+    variants['material'] = pick(['Linen', 'Oak', 'Leather', 0], 0.1)
+    variants['other_properties'] = pick(['Removable covers', 'Water resistant'], 0.6)
+    variants['variant_url'] = [f'https://example.com/products/{i}' for i in variants['variant_id']]
+    variants.loc[rng.random(n_variants) < 0.05, 'product_id'] = np.nan
+    variants.loc[rng.random(n_variants) < 0.1, 'review_count'] = np.nan
+    return variants
+
+
+def legacy_ingest_data_simple(variant_df: pd.DataFrame) -> List[Dict]:
+    """The previous implementation: iterrows with a safe_get closure per row."""
+    enriched_products = []
+    for _, variant in variant_df.iterrows():
+        variant_id = str(variant.get('variant_id', ''))
+
+        def safe_get(key, default=''):
+            value = variant.get(key, default)
+            return value if pd.notna(value) else default
+
+        aggregated_text_parts = [
+            safe_get('variant_name'), safe_get('product_name'), safe_get('description'),
+            safe_get('frontend_category'), safe_get('frontend_subcategory'), safe_get('collection'),
+            safe_get('color_tone'), safe_get('material'), safe_get('other_properties'),
+        ]
+        aggregated_text = ' '.join([str(p) for p in aggregated_text_parts if p and str(p).strip()])
+
+        enriched_products.append({
+            'variant_id': variant_id,
+            'product_id': str(safe_get('product_id')),
+            'variant_name': safe_get('variant_name'),
+            'product_name': safe_get('product_name'),
+            'description': safe_get('description'),
+            'aggregated_text': aggregated_text,
+            'price': float(safe_get('sale_price', 0) or 0),
+            'currency': safe_get('currency', 'SGD'),
+            'product_type': safe_get('product_type'),
+            'frontend_category': safe_get('frontend_category'),
+            'frontend_subcategory': safe_get('frontend_subcategory'),
+            'backend_category': safe_get('frontend_category'),
+            'review_count': int(safe_get('review_count', 0) or 0),
+            'review_rating': float(safe_get('review_rating', 0) or 0),
+            'collection': safe_get('collection'),
+            'color_tone': safe_get('color_tone'),
+            'material': safe_get('material'),
+            'other_properties': safe_get('other_properties'),
+            'variant_url': safe_get('variant_url'),
+            'stock_status': 'in_stock',
+            'lifecycle_status': 'active',
+        })
+    return enriched_products
+
+
+def make_service(data_dir: str, variant_df: pd.DataFrame) -> DataIngestionServiceLocal:
+    """Local service over data_dir/variant.csv, parsed once and served from memory."""
+    variant_df.to_csv(Path(data_dir) / 'variant.csv', index=False)
+    parsed = pd.read_csv(Path(data_dir) / 'variant.csv')
+
+    service = DataIngestionServiceLocal.__new__(DataIngestionServiceLocal)
+    service.config = {}
+    service.data_dir = Path(data_dir)
+    service.snapshots = SnapshotCache(data_dir, enabled=False)
+    service.load_csv_from_local = lambda filename: parsed
+    return service
+
+
+def time_call(run, repeat: int = 3) -> float:
+    """Best wall time of repeat runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark ingest_data_simple')
+    parser.add_argument('--sizes', type=str, default='1000,10000,100000',
+                        help='Comma-separated catalog sizes (default: 1000,10000,100000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        check = make_service(data_dir, synthetic_variants(3000, seed=1))
+        parsed = check.load_csv_from_local('variant.csv')
+        expected = json.dumps(legacy_ingest_data_simple(parsed))
+        assert json.dumps(check.ingest_data_simple()) == expected, 'column-wise records differ from iterrows'
+        print("✓ Column-wise records match the iterrows loop on 3000 variants")
+
+        print(f"{'variants':>10} {'iterrows':>10} {'column-wise':>12} {'speedup':>8}")
+        for n_variants in (int(size) for size in args.sizes.split(',')):
+            service = make_service(data_dir, synthetic_variants(n_variants))
+            parsed = service.load_csv_from_local('variant.csv')
+            legacy = time_call(lambda: legacy_ingest_data_simple(parsed), repeat=1)
+            vectorized = time_call(service.ingest_data_simple)
+            print(f"{n_variants:>10} {legacy:>9.2f}s {vectorized:>11.3f}s {legacy / vectorized:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
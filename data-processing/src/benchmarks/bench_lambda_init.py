@@ -0,0 +1,106 @@
+"""
+Benchmark: Lambda cold-start initialization time.
+
+Each run starts a fresh Python process (a cold container) and times:
+    imports  - importing the search service modules
+    config   - loading the config (YAML parse vs marshal snapshot)
+    service  - constructing SearchQueryService (clients, catalog, components)
+
+Modes:
+    eager     - YAML config, catalog compiled, LLM and tag index built at init
+    optimized - config/catalog snapshots, LLM and tag index deferred to first use
+
+No AWS calls are made (clients are constructed, not used; warm-up is off),
+so dummy AWS and OpenSearch credentials are set for the child processes.
+
+Usage:
+    python benchmarks/bench_lambda_init.py --runs 10
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+import lambda_handler
+from unit_4_search_query.search_service import SearchQueryService
+imports_done = time.perf_counter()
+
+mode, snapshot_dir = sys.argv[1], sys.argv[2]
+if mode == 'optimized':
+    config = lambda_handler.load_config_snapshot(f'{snapshot_dir}/config_snapshot.bin')
+    config['catalog_snapshot'] = {'path': f"{snapshot_dir}/{config['catalog_snapshot']['path']}"}
+else:
+    import yaml
+    with open('config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['catalog_snapshot'] = {}
+config_done = time.perf_counter()
+
+service = SearchQueryService(config, lazy=(mode == 'optimized'))
+service_done = time.perf_counter()
+
+first_use = 0.0
+if mode == 'optimized':
+    service.llm_service
+    service.tag_index
+    first_use = time.perf_counter() - service_done
+
+print(json.dumps({
+    'imports': (imports_done - start) * 1000,
+    'config': (config_done - imports_done) * 1000,
+    'service': (service_done - config_done) * 1000,
+    'first_use': first_use * 1000
+}))
+'''
+
+
+def run_once(mode: str, snapshot_dir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    env.setdefault('OPENSEARCH_USERNAME', 'benchmark')
+    env.setdefault('OPENSEARCH_PASSWORD', 'benchmark')
+    env['AWS_EC2_METADATA_DISABLED'] = 'true'
+    env.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, mode, snapshot_dir],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark Lambda cold-start init time')
+    parser.add_argument('--runs', type=int, default=10, help='Cold starts per mode (default: 10)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        subprocess.run(
+            [sys.executable, 'build_lambda_snapshots.py', '--output-dir', snapshot_dir,
+             '--runtime', f'{sys.version_info.major}.{sys.version_info.minor}'],
+            cwd=SRC_DIR, check=True, capture_output=True
+        )
+
+        print(f"{'mode':<10} {'imports':>9} {'config':>9} {'service':>9} {'init':>9} {'first use':>10}  (median ms, {args.runs} runs)")
+        for mode in ('eager', 'optimized'):
+            runs = [run_once(mode, snapshot_dir) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            init = median['imports'] + median['config'] + median['service']
+            print(f"{mode:<10} {median['imports']:>9.1f} {median['config']:>9.1f} "
+                  f"{median['service']:>9.1f} {init:>9.1f} {median['first_use']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: sequential GETs vs the concurrent S3 fetch layer.
+
+Simulates S3 with a fixed time to first byte per request and a per-
+connection throughput cap, then times the ingestion inputs fetched
+one after another (the previous loaders) against S3Fetcher:
+
+    csv          the six catalog exports, sizes unknown (probe + ranged parts)
+    embeddings   many image-embedding batch files with sizes from a listing
+
+Usage:
+    python benchmarks/bench_s3_fetch.py
+    python benchmarks/bench_s3_fetch.py --ttfb-ms 60 --mib-per-s 40 --concurrency 32
+"""
+
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from unit_1_data_ingestion.s3_fetch import S3Fetcher
+
+MIB = 2**20
+
+
+class SimulatedS3:
+    """get_object with latency and per-connection bandwidth; bodies are zero bytes."""
+
+    def __init__(self, sizes, ttfb_ms: float, mib_per_s: float):
+        self.sizes = sizes
+        self.ttfb = ttfb_ms / 1000
+        self.bytes_per_s = mib_per_s * MIB
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        size = self.sizes[Key]
+        first, last = 0, size - 1
+        if Range is not None:
+            first, last = (int(n) for n in Range[len('bytes='):].split('-'))
+            last = min(last, size - 1)
+        length = last - first + 1
+        time.sleep(self.ttfb + length / self.bytes_per_s)
+        response = {'Body': BytesIO(bytes(length)), 'ETag': f'"{Key}"'}
+        if Range is not None:
+            response['ContentRange'] = f'bytes {first}-{last}/{size}'
+        return response
+
+
+def sequential(s3, keys):
+    """The previous loaders: one whole-object GET after another."""
+    return {key: s3.get_object(Bucket='bench', Key=key)['Body'].read() for key in keys}
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark concurrent S3 fetches')
+    parser.add_argument('--ttfb-ms', type=float, default=40, help='Time to first byte per request')
+    parser.add_argument('--mib-per-s', type=float, default=80, help='Throughput per connection')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--part-size-mb', type=float, default=8)
+    args = parser.parse_args()
+
+    workloads = {
+        'csv': {
+            'variant.csv': 40 * MIB, 'variant_image.csv': 25 * MIB, 'variant_property.csv': 60 * MIB,
+            'variant_option.csv': 6 * MIB, 'variant_affinity.csv': 8 * MIB, 'variant_file.csv': 2 * MIB
+        },
+        'embeddings': {f'image_embeddings_batch_{i:04d}.json': 3 * MIB for i in range(100)}
+    }
+    config = {'aws': {'s3': {'fetch': {'max_concurrency': args.concurrency,
+                                       'part_size_mb': args.part_size_mb}}}}
+
+    print(f"TTFB {args.ttfb_ms:.0f}ms, {args.mib_per_s:.0f} MiB/s per connection, "
+          f"concurrency {args.concurrency}, parts {args.part_size_mb:g} MiB")
+    print(f"{'workload':<12} {'objects':>8} {'MiB':>7} {'sequential s':>13} {'fetcher s':>10} {'speedup':>8}")
+    for name, sizes in workloads.items():
+        s3 = SimulatedS3(sizes, args.ttfb_ms, args.mib_per_s)
+        keys = list(sizes)
+
+        start = time.perf_counter()
+        sequential(s3, keys)
+        before = time.perf_counter() - start
+
+        fetcher = S3Fetcher(s3, 'bench', config)
+        start = time.perf_counter()
+        fetcher.fetch_many(keys, sizes=sizes if name == 'embeddings' else None)
+        after = time.perf_counter() - start
+
+        total_mib = sum(sizes.values()) / MIB
+        print(f"{name:<12} {len(keys):>8} {total_mib:>7.0f} {before:>13.2f} {after:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Lambda Cold-Start Snapshots: Pre-serialize config and catalog for the package.
+Writes the parsed config.yaml (config_snapshot.bin) and the compiled catalog
+(catalog_snapshot.path) as marshal snapshots into the Lambda package, so a
+cold start loads them instead of parsing YAML and compiling the catalog.
+
+Snapshots are tied to the Python minor version that writes them; run this
+with the same Python version as the Lambda runtime (mismatches fall back to
+YAML parsing and catalog compilation).
+
+Usage:
+    python build_lambda_snapshots.py --output-dir lambda_package
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+import yaml
+
+# Add current directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from unit_4_search_query.catalog import get_catalog_section, CompiledCatalog
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write cold-start snapshots into the Lambda package')
+    parser.add_argument('--config', type=str, default='config.yaml',
+                        help='Path to configuration file (default: config.yaml)')
+    parser.add_argument('--output-dir', type=str, default='lambda_package',
+                        help='Lambda package directory (default: lambda_package)')
+    parser.add_argument('--runtime', type=str, default='3.11',
+                        help='Lambda Python runtime version to check against (default: 3.11)')
+
+    args = parser.parse_args()
+
+    # Import here so the snapshot format stays defined in one place
+    from lambda_handler import CONFIG_SNAPSHOT_PATH, save_config_snapshot
+
+    running = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if running != args.runtime:
+        logger.warning(f"Writing snapshots with Python {running}; the Lambda runtime is "
+                       f"{args.runtime}, so they will be ignored there")
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    config_snapshot = output_dir / CONFIG_SNAPSHOT_PATH
+    save_config_snapshot(config, str(config_snapshot), source_path=args.config)
+    print(f"✓ Config snapshot: {config_snapshot}")
+
+    catalog_path = config.get('catalog_snapshot', {}).get('path')
+    if catalog_path:
+        compiled = CompiledCatalog.compile(get_catalog_section(config))
+        compiled.save_snapshot(str(output_dir / catalog_path))
+        print(f"✓ Catalog snapshot: {output_dir / catalog_path} (version {compiled.version})")
+    else:
+        logger.warning("catalog_snapshot.path is not configured; skipping catalog snapshot")
+
+
+if __name__ == '__main__':
+    main()
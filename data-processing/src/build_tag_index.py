@@ -0,0 +1,109 @@
+"""
+Offline Tag Index Build: Derive Feature 6 Tier-1 tags from the product catalog.
+Counts co-occurring categories, materials, colors, styles and price bands
+on indexed products and writes the artifact TagIndexService loads from
+related_tags.tag_index_path.
+
+Usage:
+    python build_tag_index.py --products ../data/active_only/embeddings/text_embeddings/products_with_embeddings.json
+    python build_tag_index.py --s3
+    python build_tag_index.py --opensearch
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add current directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from pipeline import load_config
+from unit_4_search_query.catalog import get_compiled_catalog
+from unit_4_search_query.tag_index_builder import (
+    build_from_aggregations,
+    build_from_products,
+    write_tag_index,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_products_file(path: str):
+    """Load product documents from a local embeddings JSON file."""
+    with open(path, 'r') as f:
+        content = f.read()
+
+    # Embedding exports may contain bare NaN values
+    if 'NaN' in content:
+        content = content.replace('NaN', 'null')
+
+    products = json.loads(content)
+    logger.info(f"Loaded {len(products)} products from {path}")
+    return products
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the Feature 6 tag index from product data')
+    parser.add_argument('--config', type=str, default='config.yaml',
+                        help='Path to configuration file (default: config.yaml)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--products', type=str,
+                        help='Local products JSON (e.g. products_with_embeddings.json)')
+    source.add_argument('--s3', action='store_true',
+                        help='Load products from the S3 text embeddings file')
+    source.add_argument('--opensearch', action='store_true',
+                        help='Use aggregations on the OpenSearch text index (via SSH tunnel)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output path (default: related_tags.tag_index_path)')
+    parser.add_argument('--min-count', type=int, default=None,
+                        help='Minimum co-occurrence count for a tag')
+
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    tags_config = config.get('related_tags', {})
+    output = args.output or tags_config.get('tag_index_path', 'tag_index.json')
+    min_count = args.min_count or tags_config.get('tag_index_min_count', 3)
+    catalog = get_compiled_catalog(config)
+
+    tunnel = None
+    try:
+        if args.opensearch:
+            from unit_3_search_index.index_from_s3 import create_opensearch_client_with_tunnel
+            client, tunnel = create_opensearch_client_with_tunnel(config)
+            index_name = config['aws']['opensearch']['indices']['text_index']
+            counts = build_from_aggregations(client, index_name, catalog)
+            source_name = f"opensearch:{index_name}"
+        elif args.s3:
+            from unit_3_search_index.index_from_s3 import S3EmbeddingLoader
+            counts = build_from_products(S3EmbeddingLoader(config).load_text_embeddings(), catalog)
+            source_name = 's3:text_embeddings'
+        else:
+            counts = build_from_products(load_products_file(args.products), catalog)
+            source_name = Path(args.products).name
+
+        index = counts.to_index(min_count=min_count)
+        write_tag_index(output, index, catalog, counts.product_count, source=source_name)
+    except Exception as e:
+        logger.error(f"Tag index build failed: {str(e)}", exc_info=True)
+        sys.exit(1)
+    finally:
+        if tunnel:
+            tunnel.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -88,6 +88,9 @@ cp -r unit_4_search_query lambda_package/
 cp lambda_handler.py lambda_package/
 cp config.yaml lambda_package/
 
+# Pre-serialized config and catalog for faster cold starts
+python build_lambda_snapshots.py --output-dir lambda_package
+
 # Install dependencies
 echo "Installing dependencies..."
 pip install -r requirements.txt -t lambda_package/ --quiet
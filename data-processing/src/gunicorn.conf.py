@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for the Semantic Search API.
+
+Usage:
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+The app is preloaded in the master so config, the compiled catalog, the
+tag index and the LLM caches are built once and shared copy-on-write by
+the forked workers. Network clients are recreated per worker (post_fork).
+"""
+
+import gc
+import multiprocessing
+import os
+
+import yaml
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')) as f:
+    server_config = yaml.safe_load(f).get('server', {})
+
+bind = f"{server_config.get('host', '0.0.0.0')}:{os.getenv('PORT', server_config.get('port', 5000))}"
+workers = int(os.getenv('WEB_CONCURRENCY', server_config.get('workers', 0))) or multiprocessing.cpu_count()
+threads = server_config.get('threads', 4)
+timeout = server_config.get('timeout_seconds', 60)
+graceful_timeout = server_config.get('graceful_timeout_seconds', 30)
+max_requests = server_config.get('max_requests', 0)
+max_requests_jitter = max_requests // 10
+preload_app = True
+
+
+def when_ready(server):
+    """Move preloaded objects to a permanent GC generation before forking.
+
+    Otherwise the collector touches their headers in every worker and the
+    shared pages get copied.
+    """
+    gc.freeze()
+    server.log.info(f"Preloaded app, forking {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    """Give each worker its own clients and reload watcher."""
+    import app
+    app.init_worker()
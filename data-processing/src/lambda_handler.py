@@ -3,12 +3,19 @@ AWS Lambda Handler for Search API
 Provides serverless endpoints for text and image search.
 """
 
+import base64
+import hashlib
 import json
-import yaml
 import logging
+import marshal
 import os
+import sys
+import time
 from dotenv import load_dotenv
+from unit_4_search_query.clients import get_client_registry
 from unit_4_search_query.search_service import SearchQueryService
+from unit_4_search_query.serialization import ResponseEncoder
+from unit_4_search_query.warmup import SearchWarmer
 
 # Load environment variables (for local testing)
 # In Lambda, environment variables are set in the Lambda configuration
@@ -22,16 +29,77 @@ logger.setLevel(logging.INFO)
 # Load configuration
 config = None
 search_service = None
+warmer = None
+response_encoder = ResponseEncoder()
+
+# Pre-parsed config.yaml written by build_lambda_snapshots.py
+CONFIG_PATH = 'config.yaml'
+CONFIG_SNAPSHOT_PATH = os.environ.get('SEARCH_CONFIG_SNAPSHOT', 'config_snapshot.bin')
+CONFIG_SNAPSHOT_FORMAT_VERSION = 1
+
+
+def _config_digest(path: str = CONFIG_PATH) -> str:
+    """SHA-256 of the YAML source, so edits to config.yaml invalidate the snapshot."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def save_config_snapshot(config: dict, path: str = CONFIG_SNAPSHOT_PATH,
+                         source_path: str = CONFIG_PATH) -> None:
+    """Write a config parsed from source_path as a marshal snapshot (atomic replace)."""
+    payload = {
+        'format_version': CONFIG_SNAPSHOT_FORMAT_VERSION,
+        'python': sys.version_info[:2],
+        'source_digest': _config_digest(source_path),
+        'config': config
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        marshal.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def load_config_snapshot(path: str = CONFIG_SNAPSHOT_PATH, source_path: str = CONFIG_PATH):
+    """
+    Load a config snapshot written by save_config_snapshot.
+    
+    Returns:
+        Config dict, or None if the snapshot is missing, unreadable,
+        written by another Python version or older than source_path
+    """
+    try:
+        with open(path, 'rb') as f:
+            payload = marshal.load(f)
+        source_digest = _config_digest(source_path)
+    except FileNotFoundError:
+        return None
+    except (EOFError, ValueError, TypeError, OSError) as e:
+        logger.warning(f"Ignoring unreadable config snapshot {path}: {str(e)}")
+        return None
+    
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('format_version') != CONFIG_SNAPSHOT_FORMAT_VERSION:
+        return None
+    if tuple(payload.get('python', ())) != sys.version_info[:2]:
+        return None
+    if payload.get('source_digest') != source_digest:
+        return None
+    return payload['config']
 
 
 def load_config_with_env():
     """Load configuration from YAML and override with environment variables."""
     config_str = os.environ.get('SEARCH_CONFIG')
-    if config_str:
-        config = yaml.safe_load(config_str)
-    else:
-        with open('config.yaml', 'r') as f:
-            config = yaml.safe_load(f)
+    config = None if config_str else load_config_snapshot()
+    if config is None:
+        # YAML parsing is only needed without a (matching) snapshot
+        import yaml
+        if config_str:
+            config = yaml.safe_load(config_str)
+        else:
+            with open(CONFIG_PATH, 'r') as f:
+                config = yaml.safe_load(f)
     
     # Override with environment variables for security
     if os.getenv('S3_BUCKET_NAME'):
@@ -54,13 +122,76 @@ def load_config_with_env():
 
 
 def init_service():
-    """Initialize search service (called once per Lambda container)."""
-    global config, search_service
+    """
+    Initialize search service (called once per Lambda container).
+    
+    With lambda_init.lazy_components the LLM and tag index services are
+    built on the first request that needs them (image search never does).
+    The lambda_init.warmup_steps warm-up steps (by default only opening
+    the OpenSearch and Bedrock connections) run here, during the init
+    phase, instead of on the first request.
+    """
+    global config, search_service, warmer, response_encoder
     
     if search_service is None:
-        config = load_config_with_env()
-        search_service = SearchQueryService(config)
-        logger.info("Search service initialized")
+        start = time.perf_counter()
+        new_config = load_config_with_env()
+        init_config = new_config.get('lambda_init', {})
+        
+        # One request at a time per container; pools cover batch fan-out
+        new_service = SearchQueryService(
+            new_config,
+            clients=get_client_registry(new_config, concurrency=1),
+            lazy=init_config.get('lazy_components', True)
+        )
+        new_encoder = ResponseEncoder(new_config)
+        
+        # k-NN graph loading is cluster-wide; leave it to the search nodes
+        new_warmer = SearchWarmer(new_service, new_config)
+        new_warmer.run(steps=init_config.get('warmup_steps', ['connections']))
+        
+        # Published together once everything is built: search_service is the
+        # "initialized" flag, so a failure above leaves it None and the next
+        # request retries instead of running with half the components
+        config, response_encoder, warmer = new_config, new_encoder, new_warmer
+        search_service = new_service
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Search service initialized in {elapsed_ms:.0f}ms")
+
+
+# Initialize during the Lambda init phase rather than on the first request
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    try:
+        init_service()
+    except Exception as e:
+        logger.error(f"Init-phase initialization failed, retrying per request: {str(e)}")
+
+
+def encode_response(result, status_code: int, event) -> dict:
+    """
+    Build the API Gateway response, compressing per the Accept-Encoding header.
+    
+    Compressed bodies are returned base64-encoded (isBase64Encoded), which
+    API Gateway decodes before sending binary content to the client.
+    """
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    body, response_headers = response_encoder.encode(result, headers.get('accept-encoding'))
+    response_headers['Access-Control-Allow-Origin'] = '*'
+    
+    if 'Content-Encoding' in response_headers:
+        return {
+            'statusCode': status_code,
+            'headers': response_headers,
+            'body': base64.b64encode(body).decode('ascii'),
+            'isBase64Encoded': True
+        }
+    
+    return {
+        'statusCode': status_code,
+        'headers': response_headers,
+        'body': body.decode('utf-8')
+    }
 
 
 def lambda_handler(event, context):
@@ -81,16 +212,35 @@ def lambda_handler(event, context):
         # Parse request
         http_method = event.get('httpMethod', 'POST')
         path = event.get('path', '')
-        body = json.loads(event.get('body', '{}'))
+        raw_body = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body)
+        body = json.loads(raw_body)
         
         logger.info(f"Request: {http_method} {path}")
         
         # Route to appropriate handler
-        if path == '/search/text' or path == '/text':
+        if path == '/health':
+            # Readiness: warm-up has run during the init phase
+            status = warmer.status()
+            return encode_response(
+                {'status': 'healthy' if status['ready'] else 'warming', 'warmup': status},
+                200 if status['ready'] else 503, event
+            )
+            
+        elif path == '/search/text' or path == '/text':
             # Text search (includes Feature 5 LLM fallback & Feature 6 related tags)
             query = body.get('query', '')
             result = search_service.get_text_results(query)
             
+        elif path == '/search/text/batch' or path == '/text/batch':
+            # Batch text search for offline jobs
+            result = search_service.get_text_results_batch(
+                body.get('queries', []),
+                llm_fallback=bool(body.get('llm_fallback', True)),
+                include_tags=bool(body.get('include_tags', True))
+            )
+            
         elif path == '/search/image' or path == '/image':
             # Image search
             image_base64 = body.get('image', '')
@@ -119,14 +269,7 @@ def lambda_handler(event, context):
         # Return response
         status_code = 200 if result.get('status') == 'success' else 400
         
-        return {
-            'statusCode': status_code,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(result)
-        }
+        return encode_response(result, status_code, event)
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
@@ -20,6 +20,7 @@ sys.path.append(str(Path(__file__).parent))
 from unit_1_data_ingestion.data_ingestion_service import DataIngestionService
 from unit_2_embedding_generation.embedding_service import EmbeddingService
 from unit_3_search_index.index_service import SearchIndexService
+from unit_3_search_index.index_manifest import IndexManifest
 
 logging.basicConfig(
     level=logging.INFO,
@@ -56,7 +57,43 @@ def load_config(config_path: str = 'config.yaml'):
     return config
 
 
-def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False):
+def run_delta(products, embedding_service: EmbeddingService, index_service: SearchIndexService,
+              manifest: IndexManifest) -> int:
+    """
+    Bring the existing text index up to date with the ingested products:
+    embed added and text-changed products only, upsert them, update
+    content-only changes in place and delete removed variants. The
+    manifest records only the operations that succeeded.
+    
+    Returns:
+        Number of documents written or deleted
+    """
+    plan = manifest.plan(products)
+    logger.info(f"Delta against manifest: {plan.summary()}")
+    
+    to_embed = plan.to_embed
+    if to_embed:
+        embedding_service.enrich_products_with_embeddings(to_embed)
+    upserts = [p for p in to_embed if p.get('text_embedding')]
+    if len(upserts) < len(to_embed):
+        logger.warning(f"{len(to_embed) - len(upserts)} products have no embedding; retried next run")
+    
+    failed = set(index_service.apply_text_delta(upserts, plan.content_changed, plan.deleted))
+    
+    # Failed upserts/updates are forgotten so the next run re-embeds and re-indexes them
+    manifest.record(p for p in upserts + plan.content_changed if p['variant_id'] not in failed)
+    manifest.remove(variant_id for variant_id in plan.deleted if variant_id not in failed)
+    manifest.remove(failed - set(plan.deleted))
+    manifest.save()
+    
+    if failed:
+        logger.warning(f"{len(failed)} delta operations failed; retried next run")
+    logger.info(f"✓ Embedded {len(upserts)} products (skipped {plan.unchanged} unchanged)")
+    return len(upserts) + len(plan.content_changed) + len(plan.deleted) - len(failed)
+
+
+def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False,
+                 full_rebuild: bool = False):
     """
     Run the complete data pipeline:
     1. Ingest data from S3
@@ -64,9 +101,13 @@ def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False):
     3. Create OpenSearch indices
     4. Index data
     
+    With indexing.delta enabled and a manifest matching the live text
+    index, steps 2-4 are replaced by an incremental update (run_delta).
+    
     Args:
         config_path: Path to config file
         simple_mode: If True, use simplified single-file ingestion (MVP)
+        full_rebuild: If True, recreate the indices even when a delta run is possible
     """
     start_time = time.time()
     
@@ -95,6 +136,28 @@ def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False):
     
     logger.info(f"✓ Ingested {len(products)} products")
     
+    index_service = None
+    delta_enabled = config.get('indexing', {}).get('delta', {}).get('enabled', False) and not simple_mode
+    if delta_enabled:
+        manifest = IndexManifest.from_config(config)
+        index_service = SearchIndexService(config)
+        
+        if not full_rebuild and manifest.load(index_service.text_index_uuid()):
+            logger.info("\n" + "=" * 80)
+            logger.info("STEP 2-4: INCREMENTAL INDEX UPDATE")
+            logger.info("=" * 80)
+            
+            changed = run_delta(products, EmbeddingService(config), index_service, manifest)
+            
+            elapsed_time = time.time() - start_time
+            logger.info("\n" + "=" * 80)
+            logger.info("PIPELINE COMPLETE (INCREMENTAL)")
+            logger.info("=" * 80)
+            logger.info(f"Total time: {elapsed_time:.2f} seconds")
+            logger.info(f"Documents changed: {changed}")
+            logger.info("=" * 80)
+            return
+    
     # Step 2: Embedding Generation
     logger.info("\n" + "=" * 80)
     logger.info("STEP 2: EMBEDDING GENERATION")
@@ -110,7 +173,8 @@ def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False):
     logger.info("STEP 3: CREATE OPENSEARCH INDICES")
     logger.info("=" * 80)
     
-    index_service = SearchIndexService(config)
+    if index_service is None:
+        index_service = SearchIndexService(config)
     
     logger.info("Creating text index...")
     index_service.create_text_index()
@@ -126,9 +190,17 @@ def run_pipeline(config_path: str = 'config.yaml', simple_mode: bool = False):
     logger.info("=" * 80)
     
     logger.info("Indexing products to OpenSearch...")
-    index_service.index_products(products_with_embeddings)
+    failed_ids = index_service.index_products(products_with_embeddings)
     logger.info(f"✓ Indexed {len(products_with_embeddings)} products")
     
+    if delta_enabled:
+        # Fresh index: the manifest starts over with what was indexed
+        failed_ids = set(failed_ids)
+        manifest.reset(index_service.text_index_uuid())
+        manifest.record(p for p in products_with_embeddings
+                        if p.get('text_embedding') and p['variant_id'] not in failed_ids)
+        manifest.save()
+    
     # Get index statistics
     logger.info("\n" + "=" * 80)
     logger.info("INDEX STATISTICS")
@@ -166,11 +238,16 @@ def main():
         action='store_true',
         help='Use simplified single-file ingestion (MVP mode, faster)'
     )
+    parser.add_argument(
+        '--full-rebuild',
+        action='store_true',
+        help='Recreate the indices and re-embed everything, ignoring the index manifest'
+    )
     
     args = parser.parse_args()
     
     try:
-        run_pipeline(args.config, simple_mode=args.simple)
+        run_pipeline(args.config, simple_mode=args.simple, full_rebuild=args.full_rebuild)
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
         sys.exit(1)
@@ -0,0 +1,246 @@
+"""
+Offline LLM Precomputation: Warm the intent and tag caches from query logs.
+Reads a query log, runs Feature 5 intent extraction and Feature 6 tag
+generation for head and torso queries, and writes a versioned warm-cache
+artifact that ClaudeLLMService and TagIndexService load at startup.
+
+Usage:
+    python precompute_llm_cache.py --log logs/queries.csv
+"""
+
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add current directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from pipeline import load_config
+from unit_4_search_query.llm_service import (
+    ClaudeLLMService,
+    WARM_CACHE_FORMAT_VERSION,
+    normalize_query,
+)
+from unit_4_search_query.tag_index_service import TagIndexService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting Bedrock calls per second."""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def read_query_log(log_path: str) -> Counter:
+    """
+    Read a query log and count normalized queries.
+
+    Supported formats:
+        .txt   - one query per line
+        .csv   - 'query' column (or first column), optional 'count' column
+        .jsonl - one {"query": ..., "count": ...} object per line
+    """
+    counts = Counter()
+    suffix = Path(log_path).suffix.lower()
+
+    with open(log_path, 'r', newline='') as f:
+        if suffix == '.csv':
+            reader = csv.DictReader(f)
+            query_field = 'query' if 'query' in reader.fieldnames else reader.fieldnames[0]
+            rows = ((row.get(query_field), row.get('count')) for row in reader)
+        elif suffix == '.jsonl':
+            records = (json.loads(line) for line in f if line.strip())
+            rows = ((r.get('query'), r.get('count')) for r in records)
+        else:
+            rows = ((line, None) for line in f)
+
+        for query, count in rows:
+            normalized = normalize_query(query or '')
+            if normalized:
+                counts[normalized] += int(count) if count else 1
+
+    logger.info(f"Read {sum(counts.values())} queries ({len(counts)} unique) from {log_path}")
+    return counts
+
+
+def select_queries(counts: Counter, min_count: int, max_queries: Optional[int]) -> List[str]:
+    """Select head and torso queries: frequent enough, most frequent first."""
+    selected = [q for q, c in counts.most_common(max_queries) if c >= min_count]
+    logger.info(f"Selected {len(selected)} queries (min_count={min_count}, max={max_queries})")
+    return selected
+
+
+def precompute(
+    config: Dict,
+    queries: List[str],
+    max_workers: int,
+    requests_per_second: float
+) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+    """
+    Run intent extraction and tag generation for queries.
+
+    Tags are only generated for queries the Tier-1 index does not cover.
+    Failed intent extractions (the pass-through default) are not stored,
+    so a transient Bedrock error never pins a useless entry.
+
+    Returns:
+        (intents, tags) dicts keyed by normalized query
+    """
+    # Start from an empty warm cache so every entry is regenerated
+    config = dict(config)
+    config['llm_precompute'] = {}
+    config['llm_fallback'] = dict(config.get('llm_fallback', {}), cache_enabled=False)
+    config['related_tags'] = dict(config.get('related_tags', {}), cache_enabled=False)
+    # Offline runs are paced by the rate limiter below, not shed
+    config['llm_concurrency'] = {'enabled': False}
+
+    llm_service = ClaudeLLMService(config)
+    tag_index = TagIndexService(config)
+    rate_limiter = RateLimiter(requests_per_second, burst=max_workers)
+
+    intents: Dict[str, Dict] = {}
+    tags: Dict[str, List[Dict]] = {}
+
+    def process(query: str) -> Tuple[str, Optional[Dict], Optional[List[Dict]]]:
+        rate_limiter.acquire()
+        intent = llm_service.extract_intents(query)
+        if intent['enhanced_query'] == query and not intent['abstract_terms']:
+            intent = None
+
+        query_tags = None
+        if not tag_index.has_tags_for_query(query):
+            rate_limiter.acquire()
+            query_tags = llm_service._generate_tags_with_llm(query) or None
+
+        return query, intent, query_tags
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(process, q) for q in queries]
+
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                query, intent, query_tags = future.result()
+                if intent:
+                    intents[query] = intent
+                if query_tags:
+                    tags[query] = query_tags
+            except Exception as e:
+                logger.error(f"Precomputation failed: {str(e)}")
+
+            if done % 50 == 0:
+                logger.info(f"Processed {done}/{len(queries)} queries")
+
+    logger.info(f"Precomputed {len(intents)} intents and {len(tags)} tag sets")
+    return intents, tags
+
+
+def write_warm_cache(
+    output_path: str,
+    intents: Dict[str, Dict],
+    tags: Dict[str, List[Dict]],
+    source: str
+) -> str:
+    """Write the versioned warm-cache artifact atomically. Returns the version."""
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    artifact = {
+        'format_version': WARM_CACHE_FORMAT_VERSION,
+        'version': version,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'source': source,
+        'intents': intents,
+        'tags': tags
+    }
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_suffix(output.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(artifact, f, separators=(',', ':'))
+    os.replace(tmp_path, output)
+
+    logger.info(f"✓ Wrote warm cache version {version} to {output}")
+    return version
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompute LLM intents and tags from query logs')
+    parser.add_argument('--config', type=str, default='config.yaml',
+                        help='Path to configuration file (default: config.yaml)')
+    parser.add_argument('--log', type=str, required=True,
+                        help='Query log (.txt, .csv or .jsonl)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output path (default: llm_precompute.warm_cache_path)')
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='Concurrent Bedrock requests')
+    parser.add_argument('--rps', type=float, default=None,
+                        help='Maximum Bedrock requests per second')
+    parser.add_argument('--min-count', type=int, default=None,
+                        help='Minimum query frequency to precompute')
+    parser.add_argument('--max-queries', type=int, default=None,
+                        help='Maximum number of queries to precompute')
+
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    precompute_config = config.get('llm_precompute', {})
+
+    output = args.output or precompute_config.get('warm_cache_path', 'llm_warm_cache.json')
+    max_workers = args.max_workers or precompute_config.get('max_workers', 4)
+    rps = args.rps if args.rps is not None else precompute_config.get('requests_per_second', 2.0)
+    min_count = args.min_count or precompute_config.get('min_query_count', 2)
+    max_queries = args.max_queries or precompute_config.get('max_queries', 5000)
+
+    try:
+        counts = read_query_log(args.log)
+        queries = select_queries(counts, min_count, max_queries)
+        intents, tags = precompute(config, queries, max_workers, rps)
+        write_warm_cache(output, intents, tags, source=os.path.basename(args.log))
+    except Exception as e:
+        logger.error(f"Precomputation failed: {str(e)}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
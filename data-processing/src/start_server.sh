@@ -1,12 +1,15 @@
 #!/bin/bash
 
 # Simple script to start the Semantic Search API server on EC2
-# Usage: ./start_server.sh [port]
+# Usage: ./start_server.sh [port] [--dev]
+#   Default: gunicorn with pre-forked workers (see server section of config.yaml)
+#   --dev:   single-process Flask development server
 
 set -e
 
 # Default port
 PORT=${1:-5000}
+MODE=${2:-}
 
 echo "=========================================="
 echo "Semantic Search API - Starting Server"
@@ -62,4 +65,8 @@ echo "=========================================="
 echo ""
 
 # Start server
-python app.py --host 0.0.0.0 --port $PORT
+if [ "$MODE" = "--dev" ]; then
+    python app.py --host 0.0.0.0 --port $PORT
+else
+    PORT=$PORT exec gunicorn -c gunicorn.conf.py "app:create_app()"
+fi
@@ -0,0 +1,114 @@
+"""
+Unit tests for the compiled catalog shared by Unit 4 services.
+"""
+
+import unittest
+import tempfile
+import os
+import re
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.catalog import (
+    CONFIG_DIR,
+    CompiledCatalog,
+    catalog_snapshot_path,
+    catalog_version,
+    get_compiled_catalog,
+    save_catalog_snapshot,
+)
+
+
+class TestCompiledCatalog(unittest.TestCase):
+    """Test CompiledCatalog."""
+
+    def setUp(self):
+        """Set up test catalog."""
+        self.catalog = {
+            'categories': ['Sofas', 'Coffee Tables', 'Chair'],
+            'materials': ['Oak', 'Leather', 'Walnut'],
+            'styles': ['Modern', 'Mid-Century'],
+            'colors': ['Grey', 'Walnut'],
+            'sizes': ['2-Seater', 'King'],
+            'price_ranges': ['Under $500', '$500-$1,000']
+        }
+        self.compiled = CompiledCatalog.compile(self.catalog)
+
+    def test_lookups(self):
+        """Test membership, canonical spelling and tag types."""
+        self.assertTrue(self.compiled.contains('categories', 'sofas'))
+        self.assertEqual(self.compiled.canonicalize('categories', 'COFFEE TABLES'), 'Coffee Tables')
+        self.assertIsNone(self.compiled.canonicalize('categories', 'Lamps'))
+        self.assertTrue(self.compiled.is_valid_tag('under $500', 'price_range'))
+        self.assertFalse(self.compiled.is_valid_tag('Leather', 'color'))
+
+        # Materials take priority over colors
+        self.assertEqual(self.compiled.tag_type_of('walnut'), 'material')
+        self.assertEqual(self.compiled.tag_type_of('Grey'), 'color')
+        self.assertIsNone(self.compiled.tag_type_of('Unknown'))
+
+    def test_match_values_word_boundaries(self):
+        """Test matching is equivalent to word boundary regex matching."""
+        queries = [
+            'grey oak sofas', 'soaking tub', 'mid-century 2-seater', 'oakland chair',
+            'chairs', 'king size', 'walnut_oak', 'leather, oak.'
+        ]
+        for query in queries:
+            for key, values in self.catalog.items():
+                expected = [
+                    v for v in values
+                    if re.search(r'\b' + re.escape(v.lower()) + r'\b', query, re.IGNORECASE)
+                ]
+                self.assertEqual(self.compiled.match_values(key, query), expected, (query, key))
+
+    def test_snapshot_round_trip(self):
+        """Test binary snapshot save and load with version check."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.bin')
+            self.compiled.save_snapshot(path)
+
+            loaded = CompiledCatalog.load_snapshot(path, expected_version=self.compiled.version)
+            self.assertEqual(loaded, self.compiled)
+
+            self.assertIsNone(CompiledCatalog.load_snapshot(path, expected_version='other'))
+            self.assertIsNone(CompiledCatalog.load_snapshot(os.path.join(tmpdir, 'missing.bin')))
+
+            # Unique temporary files are renamed into place, none are left behind
+            self.compiled.save_snapshot(path)
+            self.assertEqual(os.listdir(tmpdir), ['catalog.bin'])
+
+    def test_get_compiled_catalog_shared(self):
+        """Test one compiled catalog per catalog version; only the builder writes the snapshot."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot', 'catalog.bin')
+            config = {'catalog': self.catalog, 'catalog_snapshot': {'path': path}}
+
+            first = get_compiled_catalog(config)
+            second = get_compiled_catalog({'catalog': dict(self.catalog)})
+
+            self.assertIs(first, second)
+            self.assertEqual(first.version, catalog_version(self.catalog))
+            self.assertFalse(os.path.exists(path))
+
+            self.assertEqual(save_catalog_snapshot(config), CONFIG_DIR / path)
+            self.assertEqual(CompiledCatalog.load_snapshot(path, expected_version=first.version), first)
+
+    def test_snapshot_path_relative_to_config_dir(self):
+        """Test relative snapshot paths do not depend on the working directory."""
+        config = {'catalog_snapshot': {'path': 'warm_cache/catalog_snapshot.bin'}}
+
+        self.assertEqual(catalog_snapshot_path(config), CONFIG_DIR / 'warm_cache' / 'catalog_snapshot.bin')
+        self.assertTrue((CONFIG_DIR / 'config.yaml').exists())
+        self.assertIsNone(catalog_snapshot_path({}))
+
+    def test_legacy_catalog_values(self):
+        """Test fallback to related_tags.catalog_values."""
+        config = {'related_tags': {'catalog_values': {'categories': ['Beds']}}}
+        compiled = get_compiled_catalog(config)
+
+        self.assertEqual(compiled.get('categories'), ('Beds',))
+
+
+if __name__ == '__main__':
+    unittest.main()
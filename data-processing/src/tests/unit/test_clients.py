@@ -0,0 +1,82 @@
+"""
+Unit tests for the shared AWS client registry (connection pool sizing and stats).
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.clients import ClientRegistry, PoolStats, pool_sizes
+
+
+class TestPoolSizing(unittest.TestCase):
+    """Test pool sizes derived from concurrency settings."""
+
+    def setUp(self):
+        """Set up a config with server threads and batch fan-out."""
+        self.config = {
+            'aws': {
+                'region': 'ap-southeast-1',
+                'bedrock_region': 'us-east-1',
+                'opensearch': {'endpoint': 'https://test-domain.es.amazonaws.com'}
+            },
+            'server': {'threads': 16},
+            'search_query': {'batch': {'embedding_concurrency': 8}}
+        }
+
+    def test_derived_and_explicit_sizes(self):
+        """Test sizes follow threads (+ fan-out for Bedrock) unless set explicitly."""
+        self.assertEqual(pool_sizes(self.config), {'opensearch': 16, 'bedrock': 24})
+        # Lambda: one request per container, minimum pool of 10
+        self.assertEqual(pool_sizes(self.config, concurrency=1), {'opensearch': 10, 'bedrock': 10})
+
+        self.config['connection_pools'] = {'opensearch_pool_size': 32}
+        self.assertEqual(pool_sizes(self.config)['opensearch'], 32)
+
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_bedrock_client_config(self, mock_boto_client):
+        """Test the Bedrock client gets the derived pool size and keep-alive."""
+        registry = ClientRegistry(self.config)
+
+        self.assertIs(registry.bedrock_client(), registry.bedrock_client())
+        mock_boto_client.assert_called_once()
+        boto_config = mock_boto_client.call_args[1]['config']
+        self.assertEqual(boto_config.max_pool_connections, 24)
+        self.assertTrue(boto_config.tcp_keepalive)
+
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_reset_closes_clients(self, mock_boto_client):
+        """Test reset() closes pooled connections before dropping the clients."""
+        registry = ClientRegistry(self.config)
+        bedrock = registry.bedrock_client()
+
+        registry.reset()
+
+        bedrock.close.assert_called_once()
+        self.assertIsNone(registry._bedrock_client)
+
+
+class TestPoolStats(unittest.TestCase):
+    """Test PoolStats."""
+
+    def test_checkouts_beyond_size_count_as_exhausted(self):
+        """Test utilization, exhaustion and wait time gauges."""
+        stats = PoolStats('opensearch', size=2)
+        for wait_ms in (0.0, 1.0, 5.0):
+            stats.checkout(wait_ms)
+        stats.checkin()
+
+        values = stats.snapshot()
+        self.assertEqual(values['pool_opensearch_in_use'], 2)
+        self.assertEqual(values['pool_opensearch_peak_in_use'], 3)
+        self.assertEqual(values['pool_opensearch_exhausted'], 1)
+        self.assertEqual(values['pool_opensearch_utilization'], 1.5)
+        self.assertEqual(values['pool_opensearch_wait_ms_mean'], 2.0)
+        self.assertEqual(values['pool_opensearch_wait_ms_max'], 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
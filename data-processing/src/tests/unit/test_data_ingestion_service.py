@@ -4,7 +4,7 @@ Tests all data loading and enrichment functions.
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, ANY
 import pandas as pd
 from io import BytesIO
 import sys
@@ -40,13 +40,13 @@ class TestDataIngestionService(unittest.TestCase):
         
         self.assertEqual(service.bucket, 'test-bucket')
         self.assertEqual(service.prefix, 'data/active_only/')
-        mock_boto_client.assert_called_once_with('s3', region_name='ap-southeast-1')
+        mock_boto_client.assert_called_once_with('s3', region_name='ap-southeast-1', config=ANY)
     
     @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
     def test_load_csv_from_s3_success(self, mock_boto_client):
         """Test successful CSV loading from S3."""
         # Mock S3 response
-        csv_data = "id,name,price\n1,Sofa,999\n2,Chair,299"
+        csv_data = "variant_id,variant_name,sale_price,currency,internal_notes\n1,Sofa,999,SGD,x\n2,Chair,299,SGD,y"
         mock_s3 = Mock()
         mock_s3.get_object.return_value = {
             'Body': BytesIO(csv_data.encode('utf-8'))
@@ -57,8 +57,11 @@ class TestDataIngestionService(unittest.TestCase):
         df = service.load_csv_from_s3('variant.csv')
         
         self.assertEqual(len(df), 2)
-        self.assertEqual(list(df.columns), ['id', 'name', 'price'])
-        self.assertEqual(df.iloc[0]['name'], 'Sofa')
+        # Only schema columns are parsed, with declared dtypes
+        self.assertEqual(list(df.columns), ['variant_id', 'variant_name', 'sale_price', 'currency'])
+        self.assertEqual(df.iloc[0]['variant_name'], 'Sofa')
+        self.assertEqual(df['sale_price'].dtype, 'float64')
+        self.assertEqual(df['currency'].dtype, 'category')
         mock_s3.get_object.assert_called_once_with(
             Bucket='test-bucket',
             Key='data/active_only/variant.csv'
@@ -84,7 +87,7 @@ class TestDataIngestionService(unittest.TestCase):
         # Mock S3 responses for all files
         mock_s3 = Mock()
         
-        def mock_get_object(Bucket, Key):
+        def mock_get_object(Bucket, Key, **kwargs):
             # Return different CSV data based on filename
             if 'variant.csv' in Key:
                 csv_data = "variant_id,product_id,variant_name\n1,100,Test Sofa"
@@ -229,6 +232,47 @@ class TestDataIngestionService(unittest.TestCase):
         self.assertEqual(enriched[0]['variant_name'], 'Sofa')
         self.assertEqual(enriched[1]['variant_name'], 'Chair')
     
+    @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
+    def test_enrich_variant_data_interleaved_rows(self, mock_boto_client):
+        """Test related rows are grouped per variant in table order."""
+        mock_boto_client.return_value = Mock()
+        service = DataIngestionService(self.config)
+        
+        dataframes = {
+            'variant': pd.DataFrame([
+                {'variant_id': 1, 'variant_name': 'Sofa', 'product_name': 'Madison', 'description': None,
+                 'frontend_category': 'Sofas', 'backend_category': 'Living', 'sale_price': 999},
+                {'variant_id': 2, 'variant_name': 'Chair', 'product_name': 'Hudson', 'description': 'Oak',
+                 'frontend_category': 'Chairs', 'backend_category': None, 'sale_price': 299}
+            ]),
+            'variant_image': pd.DataFrame([
+                {'variant_id': 2, 'image_type': 'product', 'image_url': 'c1.jpg', 'image_position': 0, 'default_image': True},
+                {'variant_id': 1, 'image_type': 'product', 'image_url': 's1.jpg', 'image_position': 0, 'default_image': True},
+                {'variant_id': 2, 'image_type': 'lifestyle', 'image_url': 'c2.jpg', 'image_position': 1, 'default_image': False}
+            ]),
+            'variant_property': pd.DataFrame([
+                {'variant_id': 2, 'property_category': 'Material', 'property_type': 'Wood', 'property_value': 'Oak'},
+                {'variant_id': 1, 'property_category': 'Material', 'property_type': 'Fabric', 'property_value': 'Linen'},
+                {'variant_id': 2, 'property_category': 'Care', 'property_type': 'Cleaning', 'property_value': ''}
+            ]),
+            'variant_option': pd.DataFrame(columns=['variant_id', 'option_type', 'option_value']),
+            'variant_affinity': pd.DataFrame([
+                {'variant_id': 1, 'affinity_type': 'similar', 'affinity_group_variant_id': 2}
+            ]),
+            'variant_file': pd.DataFrame(columns=['variant_id', 'file_type', 'file_url'])
+        }
+        
+        sofa, chair = service.enrich_variant_data(dataframes)
+        
+        self.assertEqual([img['url'] for img in chair['images']], ['c1.jpg', 'c2.jpg'])
+        self.assertEqual([img['url'] for img in sofa['images']], ['s1.jpg'])
+        self.assertEqual(chair['properties'], {'Material': {'Wood': 'Oak'}, 'Care': {'Cleaning': ''}})
+        self.assertEqual(sofa['affinity'], [{'type': 'similar', 'related_variant_id': '2'}])
+        self.assertEqual(chair['affinity'], [])
+        # Missing values are skipped, empty property values left out
+        self.assertEqual(sofa['aggregated_text'], 'Sofa Madison Sofas Living Fabric: Linen')
+        self.assertEqual(chair['aggregated_text'], 'Chair Hudson Oak Chairs Wood: Oak')
+    
     @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
     def test_enrich_variant_data_missing_price(self, mock_boto_client):
         """Test enrichment handles missing prices correctly."""
@@ -255,6 +299,74 @@ class TestDataIngestionService(unittest.TestCase):
         # Should use original_price when sale_price is None
         self.assertEqual(enriched[0]['price'], 500.0)
     
+    @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
+    def test_iter_enriched_batches(self, mock_boto_client):
+        """Test variants are streamed in batches joined with their related rows."""
+        csv_files = {
+            'variant.csv': "variant_id,product_id,variant_name,product_name,description,sale_price,currency,"
+                           "frontend_category,backend_category\n"
+                           "1,100,Sofa,Madison,,999,SGD,Sofas,Living\n2,101,Chair,Hudson,,299,SGD,Chairs,Dining",
+            'variant_image.csv': "variant_id,image_type,image_url,image_position,default_image\n"
+                                 "2,product,c1.jpg,0,True\n1,product,s1.jpg,0,True\n2,lifestyle,c2.jpg,1,False",
+            'variant_property.csv': "variant_id,property_category,property_type,property_value\n2,Material,Wood,Oak",
+            'variant_option.csv': "variant_id,option_type,option_value\n1,Color,Grey",
+            'variant_affinity.csv': "variant_id,affinity_type,affinity_group_variant_id\n1,similar,2",
+            'variant_file.csv': "variant_id,file_type,file_url"
+        }
+        mock_s3 = Mock()
+        mock_s3.get_object.side_effect = lambda Bucket, Key, **kwargs: {
+            'Body': BytesIO(csv_files[Key.split('/')[-1]].encode('utf-8'))
+        }
+        mock_boto_client.return_value = mock_s3
+        
+        service = DataIngestionService(self.config)
+        batches = list(service.iter_enriched_batches(batch_rows=1))
+        
+        self.assertEqual([[p['variant_id'] for p in batch] for batch in batches], [['1'], ['2']])
+        sofa, chair = batches[0][0], batches[1][0]
+        self.assertEqual(sofa['product_id'], '100')
+        self.assertEqual(sofa['options'], [{'type': 'Color', 'value': 'Grey'}])
+        self.assertEqual(sofa['affinity'], [{'type': 'similar', 'related_variant_id': '2'}])
+        self.assertEqual([img['url'] for img in chair['images']], ['c1.jpg', 'c2.jpg'])
+        self.assertEqual(chair['aggregated_text'], 'Chair Hudson Chairs Dining Wood: Oak')
+        self.assertEqual(chair['files'], [])
+    
+    @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
+    def test_missing_ids_and_numeric_sku(self, mock_boto_client):
+        """Test blank ids in the typed columns and numeric SKUs, loaded whole and streamed."""
+        csv_files = {
+            'variant.csv': "variant_id,product_id,sku,variant_name\n1,100,4711,Sofa\n2,,,Chair",
+            'variant_image.csv': "variant_id,image_type,image_url,image_position,default_image\n"
+                                 ",product,orphan.jpg,0,True\n2,product,c1.jpg,0,True",
+            'variant_property.csv': "variant_id,property_category,property_type,property_value\n"
+                                    ",Material,Wood,Teak\n1,Material,Fabric,Linen",
+            'variant_option.csv': "variant_id,option_type,option_value",
+            'variant_affinity.csv': "variant_id,affinity_type,affinity_group_variant_id\n"
+                                    "1,similar,2\n1,similar,\n,similar,1",
+            'variant_file.csv': "variant_id,file_type,file_url"
+        }
+        mock_s3 = Mock()
+        mock_s3.get_object.side_effect = lambda Bucket, Key, **kwargs: {
+            'Body': BytesIO(csv_files[Key.split('/')[-1]].encode('utf-8'))
+        }
+        mock_boto_client.return_value = mock_s3
+        
+        service = DataIngestionService(self.config)
+        loaded = service.ingest_data()
+        streamed = [p for batch in service.iter_enriched_batches(batch_rows=1) for p in batch]
+        
+        for sofa, chair in (loaded, streamed):
+            self.assertEqual((sofa['product_id'], chair['product_id']), ('100', 'nan'))
+            self.assertEqual(sofa['sku'], '4711')
+            self.assertTrue(pd.isna(chair['sku']))
+            self.assertEqual(sofa['affinity'], [{'type': 'similar', 'related_variant_id': '2'},
+                                                {'type': 'similar', 'related_variant_id': 'nan'}])
+            # Rows with a blank variant_id belong to no variant
+            self.assertEqual([img['url'] for img in chair['images']], ['c1.jpg'])
+            self.assertEqual(sofa['images'], [])
+            self.assertEqual(sofa['aggregated_text'], 'Sofa     Fabric: Linen')
+            self.assertEqual(chair['affinity'], [])
+    
     @patch.object(DataIngestionService, 'load_all_data')
     @patch.object(DataIngestionService, 'enrich_variant_data')
     @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
@@ -0,0 +1,117 @@
+"""
+Unit tests for DataIngestionServiceLocal (Unit 1).
+"""
+
+import unittest
+from unittest.mock import patch
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pandas as pd
+
+from unit_1_data_ingestion.data_ingestion_service_local import DataIngestionServiceLocal
+
+
+class TestIngestDataSimple(unittest.TestCase):
+    """Test ingest_data_simple record construction."""
+
+    def setUp(self):
+        """Local data directory with a variant.csv."""
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.config = {'aws': {'bedrock': {'text_model_id': 'amazon.titan-embed-text-v2:0'}}}
+
+    @patch('unit_1_data_ingestion.data_ingestion_service_local.boto3.client')
+    def test_missing_values_and_aggregated_text(self, mock_boto_client):
+        """Test NaN defaults, skipped blank/falsy text parts and absent columns."""
+        Path(self.data_dir, 'variant.csv').write_text(
+            'variant_id,product_id,variant_name,product_name,description,sale_price,currency,'
+            'frontend_category,review_count,review_rating,material\n'
+            '1,10,Grey Sofa,Madison,Soft linen,999.5,SGD,Sofas,12,4.5,0\n'
+            '2,,Oak Table,,  ,,,Tables,,,Oak\n'
+        )
+        service = DataIngestionServiceLocal(self.config, data_dir=self.data_dir)
+
+        products = service.ingest_data_simple()
+
+        self.assertEqual(len(products), 2)
+        first, second = products
+        self.assertEqual(first['variant_id'], '1')
+        self.assertEqual(first['aggregated_text'], 'Grey Sofa Madison Soft linen Sofas 0')
+        self.assertEqual((first['price'], first['review_count'], first['review_rating']), (999.5, 12, 4.5))
+        self.assertEqual(first['backend_category'], 'Sofas')
+
+        self.assertEqual(second['product_id'], '')
+        self.assertEqual(second['product_name'], '')
+        self.assertEqual(second['description'], '  ')
+        self.assertEqual(second['aggregated_text'], 'Oak Table Tables Oak')
+        self.assertEqual((second['price'], second['review_count'], second['review_rating']), (0.0, 0, 0.0))
+        self.assertEqual(second['currency'], 'SGD')
+
+        # Columns absent from the CSV default to ''
+        self.assertEqual((second['collection'], second['variant_url']), ('', ''))
+        self.assertEqual(list(first)[-2:], ['stock_status', 'lifecycle_status'])
+        self.assertIsInstance(first['review_count'], int)
+
+
+
+class TestImageStreaming(unittest.TestCase):
+    """Test streaming image rows into embedding batches."""
+
+    def setUp(self):
+        """Three image CSVs in nested batch directories."""
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.config = {'aws': {'bedrock': {'text_model_id': 'text', 'image_model_id': 'image'}}}
+        for name, ids in [('b/batch_10.csv', [5]), ('a/batch_2.csv', [3, 4]), ('a/batch_1.csv', [1, 2])]:
+            path = Path(self.data_dir, 'image_base64', name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text('variant_id_image_id,filename,image_base64,variant_id\n' + ''.join(
+                f'{i}_1,{i}.jpg,QUJD{i},{i}\n' for i in ids
+            ))
+
+    @patch('unit_1_data_ingestion.data_ingestion_service_local.boto3.client')
+    def test_iter_image_rows_across_files(self, mock_boto_client):
+        """Test every matching file is read, in natural order, chunk by chunk."""
+        service = DataIngestionServiceLocal(self.config, data_dir=self.data_dir)
+
+        with patch('unit_1_data_ingestion.data_ingestion_service_local.pd.read_csv',
+                   wraps=pd.read_csv) as mock_read_csv:
+            rows = list(service.iter_image_rows(chunk_rows=1))
+
+        self.assertEqual([row['variant_id'] for row in rows], ['1', '2', '3', '4', '5'])
+        self.assertEqual(rows[0]['image_base64'], 'QUJD1')
+        self.assertTrue(all(c[1]['chunksize'] == 1 for c in mock_read_csv.call_args_list))
+        self.assertRaises(FileNotFoundError, service.image_csv_paths, 'missing/*.csv')
+
+    @patch('unit_1_data_ingestion.data_ingestion_service_local.boto3.client')
+    def test_generate_embeddings_from_streamed_rows(self, mock_boto_client):
+        """Test streamed rows are saved in batch_size batches, skipping failed images."""
+        service = DataIngestionServiceLocal(self.config, data_dir=self.data_dir)
+
+        def embed(image_base64):
+            if image_base64 == 'QUJD4':
+                raise Exception("Bedrock error")
+            return [0.5]
+
+        with patch.object(service, 'generate_image_embedding', side_effect=embed):
+            service.generate_embeddings_for_images_batch(service.iter_image_rows(), batch_size=2,
+                                                         output_dir='out')
+
+        output = Path(self.data_dir, 'out')
+        batches = [json.loads((output / f'image_embeddings_batch_{n:03d}.json').read_text()) for n in (1, 2, 3)]
+        self.assertEqual([[image['image_id'] for image in batch] for batch in batches],
+                         [['1_1', '2_1'], ['3_1'], ['5_1']])
+        self.assertEqual(batches[0][0], {'image_id': '1_1', 'variant_id': '1', 'filename': '1.jpg',
+                                         'image_embedding': [0.5]})
+        self.assertEqual(len(list(output.iterdir())), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ Tests all embedding generation functions.
 import unittest
 from unittest.mock import Mock, patch, MagicMock, call
 import json
+import time
 import sys
 from pathlib import Path
 from io import BytesIO
@@ -225,7 +226,7 @@ class TestEmbeddingServiceComplete(unittest.TestCase):
         # Should have 3 results total
         self.assertEqual(len(embeddings), 3)
         
-        # Due to as_completed, order is not preserved, but we should have:
+        # Should have:
         # - 2 successful embeddings (1024 dimensions each)
         # - 1 failed embedding (empty list)
         successful = [e for e in embeddings if len(e) == 1024]
@@ -235,6 +236,24 @@ class TestEmbeddingServiceComplete(unittest.TestCase):
         self.assertEqual(len(failed), 1, "Should have 1 failed embedding")
         self.assertEqual(failed[0], [], "Failed embedding should be empty list")
     
+    @patch('unit_2_embedding_generation.embedding_service.boto3.client')
+    def test_generate_text_embeddings_batch_preserves_order(self, mock_boto_client):
+        """Test embeddings line up with their texts even when calls finish out of order."""
+        def mock_invoke(*args, **kwargs):
+            text = json.loads(kwargs['body'])['inputText']
+            if text == 'first':
+                time.sleep(0.05)  # Completes after the others
+            return {'body': BytesIO(json.dumps({'embedding': [float(len(text))]}).encode())}
+        
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model.side_effect = mock_invoke
+        mock_boto_client.return_value = mock_bedrock
+        
+        service = EmbeddingService(self.config)
+        embeddings = service.generate_text_embeddings_batch(['first', 'ab', 'abc'])
+        
+        self.assertEqual(embeddings, [[5.0], [2.0], [3.0]])
+    
     # =========================================================================
     # Image Embedding Tests
     # =========================================================================
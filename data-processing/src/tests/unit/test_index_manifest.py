@@ -0,0 +1,114 @@
+"""
+Unit tests for the index manifest and incremental pipeline runs (Unit 3).
+"""
+
+import unittest
+from unittest.mock import Mock
+import os
+import shutil
+import tempfile
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_1_data_ingestion.fingerprint import add_fingerprints
+from unit_3_search_index.index_manifest import IndexManifest
+from pipeline import run_delta
+
+
+def make_products(**overrides):
+    """Three fingerprinted products; overrides map variant_id -> changed fields."""
+    products = [
+        {'variant_id': str(i), 'aggregated_text': f'Sofa {i}', 'price': 100.0 * i}
+        for i in (1, 2, 3)
+    ]
+    for product in products:
+        product.update(overrides.get(product['variant_id'], {}))
+    return add_fingerprints(products)
+
+
+class TestIndexManifest(unittest.TestCase):
+    """Test IndexManifest."""
+
+    def setUp(self):
+        """Manifest in a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'index_manifest.json')
+        self.manifest = IndexManifest(self.path, 'products', 'titan-v2', 1024)
+
+    def test_fingerprints_ignore_embedding(self):
+        """Test the embedding does not change either fingerprint."""
+        product = make_products()[0]
+        fingerprints = (product['text_fingerprint'], product['content_fingerprint'])
+        product['text_embedding'] = [0.1] * 4
+        add_fingerprints([product])
+        self.assertEqual((product['text_fingerprint'], product['content_fingerprint']), fingerprints)
+
+    def test_plan(self):
+        """Test adds, text changes, content-only changes and deletes are told apart."""
+        self.manifest.record(make_products())
+        self.manifest.entries['9'] = ['old', 'old']
+
+        plan = self.manifest.plan(make_products(**{
+            '1': {'aggregated_text': 'Grey sofa 1'},
+            '2': {'price': 150.0}
+        }) + add_fingerprints([{'variant_id': '4', 'aggregated_text': 'Chair'}]))
+
+        self.assertEqual([p['variant_id'] for p in plan.text_changed], ['1'])
+        self.assertEqual([p['variant_id'] for p in plan.content_changed], ['2'])
+        self.assertEqual([p['variant_id'] for p in plan.added], ['4'])
+        self.assertEqual(plan.deleted, ['9'])
+        self.assertEqual(plan.unchanged, 1)
+        self.assertEqual([p['variant_id'] for p in plan.to_embed], ['4', '1'])
+
+    def test_load_requires_matching_index_and_model(self):
+        """Test a saved manifest is only trusted for the same index UUID and model."""
+        self.manifest.reset('uuid-1')
+        self.manifest.record(make_products())
+        self.manifest.save()
+
+        self.assertTrue(IndexManifest(self.path, 'products', 'titan-v2', 1024).load('uuid-1'))
+        self.assertFalse(IndexManifest(self.path, 'products', 'titan-v2', 1024).load('uuid-2'))
+        self.assertFalse(IndexManifest(self.path, 'products', 'titan-v2', 1024).load(None))
+        self.assertFalse(IndexManifest(self.path, 'products', 'titan-v3', 1024).load('uuid-1'))
+
+        loaded = IndexManifest(self.path, 'products', 'titan-v2', 1024)
+        loaded.load('uuid-1')
+        self.assertEqual(loaded.plan(make_products()).unchanged, 3)
+
+    def test_run_delta(self):
+        """Test only changed texts are embedded and only successful operations are recorded."""
+        self.manifest.reset('uuid-1')
+        self.manifest.record(make_products())
+        self.manifest.entries['9'] = ['old', 'old']
+
+        products = make_products(**{
+            '1': {'aggregated_text': 'Grey sofa 1'},
+            '2': {'price': 150.0},
+            '3': {'aggregated_text': 'Blue sofa 3'}
+        })
+        embedding_service = Mock()
+        embedding_service.enrich_products_with_embeddings.side_effect = lambda batch: [
+            p.update(text_embedding=[0.1] * 4) for p in batch
+        ]
+        index_service = Mock()
+        index_service.apply_text_delta.return_value = ['3']
+
+        run_delta(products, embedding_service, index_service, self.manifest)
+
+        embedded = embedding_service.enrich_products_with_embeddings.call_args[0][0]
+        self.assertEqual([p['variant_id'] for p in embedded], ['1', '3'])
+        upserts, updates, deletes = index_service.apply_text_delta.call_args[0]
+        self.assertEqual([p['variant_id'] for p in upserts], ['1', '3'])
+        self.assertEqual([p['variant_id'] for p in updates], ['2'])
+        self.assertEqual(deletes, ['9'])
+
+        # The failed upsert is forgotten so the next run re-embeds it
+        self.assertEqual(sorted(self.manifest.entries), ['1', '2'])
+        self.assertEqual(self.manifest.entries['1'][0], products[0]['text_fingerprint'])
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
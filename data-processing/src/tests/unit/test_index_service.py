@@ -190,10 +190,42 @@ class TestSearchIndexService(unittest.TestCase):
             {'variant_id': '2', 'text_embedding': [0.2] * 1024, 'images': []}
         ]
         
-        # Should not raise exception, just log errors
-        service.index_products(products)
+        # Should not raise exception, just log errors and report the failed ids
+        failed_ids = service.index_products(products)
         
         mock_client.bulk.assert_called_once()
+        self.assertEqual(failed_ids, ['2'])
+    
+    @patch('unit_3_search_index.index_service.OpenSearch')
+    def test_apply_text_delta(self, mock_opensearch):
+        """Test upserts, partial updates and deletes are sent as targeted bulk actions."""
+        mock_client = Mock()
+        mock_client.bulk.return_value = {
+            'errors': True,
+            'items': [
+                {'index': {'status': 201}},
+                {'update': {'status': 404, 'error': 'document_missing_exception'}},
+                {'delete': {'status': 404}}
+            ]
+        }
+        mock_opensearch.return_value = mock_client
+        
+        service = SearchIndexService(self.config)
+        
+        upsert = {'variant_id': '1', 'text_embedding': [0.1] * 1024, 'price': 10.0}
+        update = {'variant_id': '2', 'text_embedding': [0.2] * 1024, 'price': 20.0}
+        failed_ids = service.apply_text_delta([upsert], [update], ['3'])
+        
+        body = mock_client.bulk.call_args[1]['body']
+        self.assertEqual(body, [
+            {'index': {'_index': 'product-text-embeddings', '_id': '1'}}, upsert,
+            {'update': {'_index': 'product-text-embeddings', '_id': '2'}},
+            {'doc': {'variant_id': '2', 'price': 20.0}},
+            {'delete': {'_index': 'product-text-embeddings', '_id': '3'}}
+        ])
+        # Missing documents on delete are fine; a failed update is reported
+        self.assertEqual(failed_ids, ['2'])
+        mock_client.indices.refresh.assert_called_once_with(index='product-text-embeddings')
     
     @patch('unit_3_search_index.index_service.OpenSearch')
     def test_get_index_stats(self, mock_opensearch):
@@ -4,16 +4,20 @@ Tests Claude LLM integration for intent extraction and tag generation.
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, ANY
 from io import BytesIO
 import json
+import tempfile
 from datetime import datetime, timedelta
 
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from unit_4_search_query.llm_service import ClaudeLLMService, LLMCache
+from unit_4_search_query.llm_service import (
+    ClaudeLLMService, LLMCache, LLMConcurrencyLimiter, IncrementalJSONParser,
+    SemanticIntentCache
+)
 
 
 class TestLLMCache(unittest.TestCase):
@@ -78,6 +82,92 @@ class TestLLMCache(unittest.TestCase):
         self.assertIsNone(self.cache.get("key2"))
 
 
+class TestSemanticIntentCache(unittest.TestCase):
+    """Test embedding-keyed intent cache."""
+    
+    def test_similar_embedding_hits(self):
+        """Test a near-duplicate embedding reuses the cached value."""
+        cache = SemanticIntentCache(max_entries=4, similarity_threshold=0.9)
+        cache.set("cozy reading chair", [1.0, 0.0, 0.1], {'enhanced_query': 'soft armchair'})
+        
+        match = cache.get([0.98, 0.02, 0.12])
+        
+        self.assertIsNotNone(match)
+        self.assertEqual(match[0], "cozy reading chair")
+        self.assertEqual(match[1], {'enhanced_query': 'soft armchair'})
+    
+    def test_dissimilar_embedding_misses(self):
+        """Test embeddings below the threshold miss and are counted."""
+        cache = SemanticIntentCache(max_entries=4, similarity_threshold=0.9)
+        cache.set("cozy reading chair", [1.0, 0.0, 0.0], {'enhanced_query': 'soft armchair'})
+        
+        self.assertIsNone(cache.get([0.0, 1.0, 0.0]))
+        cache.get([1.0, 0.0, 0.0])
+        
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+    
+    def test_ring_buffer_evicts_oldest(self):
+        """Test the oldest entry is overwritten when the cache is full."""
+        cache = SemanticIntentCache(max_entries=2, similarity_threshold=0.99)
+        cache.set("a", [1.0, 0.0, 0.0], {'q': 'a'})
+        cache.set("b", [0.0, 1.0, 0.0], {'q': 'b'})
+        cache.set("c", [0.0, 0.0, 1.0], {'q': 'c'})
+        
+        self.assertIsNone(cache.get([1.0, 0.0, 0.0]))
+        self.assertEqual(cache.get([0.0, 0.0, 1.0])[1], {'q': 'c'})
+        self.assertEqual(cache.stats()['entries'], 2)
+    
+    def test_expired_entry_misses(self):
+        """Test entries past their TTL are not reused."""
+        cache = SemanticIntentCache(max_entries=2, similarity_threshold=0.9, ttl_seconds=0)
+        cache.set("a", [1.0, 0.0], {'q': 'a'})
+        
+        self.assertIsNone(cache.get([1.0, 0.0]))
+    
+    def test_recached_query_hits_after_expiry(self):
+        """Test an expired slot does not shadow the same query cached again."""
+        cache = SemanticIntentCache(max_entries=4, similarity_threshold=0.9, ttl_seconds=0)
+        cache.set("a", [1.0, 0.0], {'q': 'old'})
+        self.assertIsNone(cache.get([1.0, 0.0]))
+        
+        cache.ttl_seconds = 3600
+        cache.set("a", [1.0, 0.0], {'q': 'new'})
+        
+        self.assertEqual(cache.get([1.0, 0.0])[1], {'q': 'new'})
+        self.assertEqual(cache.get([0.98, 0.05])[1], {'q': 'new'})
+
+
+class TestLLMConcurrencyLimiter(unittest.TestCase):
+    """Test LLM concurrency limiting and shedding."""
+    
+    def test_sheds_when_saturated(self):
+        """Test calls beyond the limit are shed after the bounded wait."""
+        limiter = LLMConcurrencyLimiter(max_concurrent=1, max_waiting=1, wait_timeout_seconds=0.01)
+        
+        self.assertTrue(limiter.acquire('intent'))
+        self.assertFalse(limiter.acquire('tags'))
+        
+        limiter.release()
+        self.assertTrue(limiter.acquire('tags'))
+        limiter.release()
+        
+        stats = limiter.stats()
+        self.assertEqual(stats['llm_shed_tags'], 1)
+        self.assertEqual(stats['llm_admitted_intent'], 1)
+        self.assertEqual(stats['llm_in_flight'], 0)
+    
+    def test_no_wait_queue_sheds_immediately(self):
+        """Test max_waiting=0 sheds without waiting."""
+        limiter = LLMConcurrencyLimiter(max_concurrent=1, max_waiting=0, wait_timeout_seconds=10)
+        limiter.acquire('intent')
+        
+        self.assertFalse(limiter.acquire('intent'))
+        self.assertEqual(limiter.stats()['llm_shed_intent'], 1)
+
+
 class TestClaudeLLMService(unittest.TestCase):
     """Test Claude LLM Service."""
     
@@ -119,7 +209,7 @@ class TestClaudeLLMService(unittest.TestCase):
         # Clear caches before each test
         LLMCache().clear()
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_init(self, mock_boto_client):
         """Test service initialization."""
         service = ClaudeLLMService(self.config)
@@ -127,7 +217,8 @@ class TestClaudeLLMService(unittest.TestCase):
         # Check Bedrock client created with correct region
         mock_boto_client.assert_called_with(
             'bedrock-runtime',
-            region_name='us-east-1'
+            region_name='us-east-1',
+            config=ANY
         )
         
         # Check configuration loaded
@@ -137,7 +228,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_should_trigger_fallback_below_threshold(self):
         """Test fallback triggers when score is below threshold."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             # Score below threshold should trigger
@@ -146,7 +237,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_should_trigger_fallback_above_threshold(self):
         """Test fallback doesn't trigger when score is above threshold."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             # Score above threshold should not trigger
@@ -159,13 +250,13 @@ class TestClaudeLLMService(unittest.TestCase):
         config = self.config.copy()
         config['llm_fallback']['enabled'] = False
         
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(config)
             
             # Should not trigger even with low score
             self.assertFalse(service.should_trigger_fallback(0.1))
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_invoke_claude_success(self, mock_boto_client):
         """Test successful Claude invocation."""
         mock_response = {
@@ -187,7 +278,7 @@ class TestClaudeLLMService(unittest.TestCase):
         call_args = mock_bedrock.invoke_model.call_args
         self.assertEqual(call_args[1]['modelId'], 'anthropic.claude-sonnet-4-5-20250929-v1:0')
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_invoke_claude_error(self, mock_boto_client):
         """Test Claude invocation error handling."""
         mock_bedrock = Mock()
@@ -203,7 +294,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_extract_json_valid(self):
         """Test JSON extraction from text."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             text = 'Here is the result: {"key": "value"} and more text'
@@ -213,7 +304,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_extract_json_no_json(self):
         """Test JSON extraction when no JSON present."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             text = 'No JSON here'
@@ -221,7 +312,7 @@ class TestClaudeLLMService(unittest.TestCase):
             
             self.assertEqual(result, text)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_intents_success(self, mock_boto_client):
         """Test successful intent extraction."""
         claude_response = json.dumps({
@@ -251,7 +342,7 @@ class TestClaudeLLMService(unittest.TestCase):
         self.assertIn('modern', result['concrete_attributes'])
         self.assertIn('elegant', result['concrete_attributes']['royal'])
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_intents_cache_hit(self, mock_boto_client):
         """Test intent extraction uses cache on second call."""
         claude_response = json.dumps({
@@ -283,7 +374,7 @@ class TestClaudeLLMService(unittest.TestCase):
         # Results should be identical
         self.assertEqual(result1, result2)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_intents_error_handling(self, mock_boto_client):
         """Test intent extraction handles errors gracefully."""
         mock_bedrock = Mock()
@@ -298,7 +389,7 @@ class TestClaudeLLMService(unittest.TestCase):
         self.assertEqual(result['concrete_attributes'], {})
         self.assertEqual(result['enhanced_query'], "test query")
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_with_llm(self, mock_boto_client):
         """Test tag generation with LLM."""
         claude_response = json.dumps({
@@ -327,7 +418,7 @@ class TestClaudeLLMService(unittest.TestCase):
         self.assertEqual(tags[0]['type'], 'category')
         self.assertEqual(tags[1]['tag'], 'Fabric')
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_with_search_results(self, mock_boto_client):
         """Test tag generation includes search results context."""
         claude_response = json.dumps({
@@ -361,7 +452,7 @@ class TestClaudeLLMService(unittest.TestCase):
         prompt = body['messages'][0]['content']
         self.assertIn('Grey Sofa', prompt)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_respects_max_tags(self, mock_boto_client):
         """Test that tag generation respects max_tags limit."""
         # Generate more tags than max_tags
@@ -388,7 +479,7 @@ class TestClaudeLLMService(unittest.TestCase):
         # Should be limited to max_tags (10)
         self.assertLessEqual(len(tags), 10)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_validates_against_catalog(self, mock_boto_client):
         """Test that generated tags are validated against catalog."""
         # Include both valid and invalid tags
@@ -419,7 +510,7 @@ class TestClaudeLLMService(unittest.TestCase):
         self.assertIn('Wood', tag_names)
         self.assertNotIn('InvalidCategory', tag_names)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_cache(self, mock_boto_client):
         """Test that tag generation uses cache."""
         claude_response = json.dumps({
@@ -439,16 +530,75 @@ class TestClaudeLLMService(unittest.TestCase):
         service = ClaudeLLMService(self.config)
         
         # First call
-        tags1 = service._generate_tags_with_llm("sofa")
+        tags1 = service.generate_related_tags("sofa")
         self.assertEqual(mock_bedrock.invoke_model.call_count, 1)
         
         # Second call - should use cache
-        tags2 = service._generate_tags_with_llm("sofa")
+        tags2 = service.generate_related_tags("sofa")
         self.assertEqual(mock_bedrock.invoke_model.call_count, 1)  # No additional call
         
         self.assertEqual(tags1, tags2)
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_generate_related_tags_uses_facet_tags(self, mock_boto_client):
+        """Test enough facet tags replace the LLM tier."""
+        mock_bedrock = Mock()
+        mock_boto_client.return_value = mock_bedrock
+        tag_index = Mock()
+        tag_index.has_tags_for_query.return_value = False
+        facet_tags = [
+            {'tag': name, 'type': 'category', 'relevance_score': 0.5, 'count': 4}
+            for name in ('Sofas', 'Tables', 'Chairs')
+        ]
+        
+        service = ClaudeLLMService(self.config)
+        tags = service.generate_related_tags("unique query", [], tag_index, facet_tags=facet_tags)
+        
+        self.assertEqual(tags, facet_tags)
+        mock_bedrock.invoke_model.assert_not_called()
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_generate_related_tags_records_tier2_results(self, mock_boto_client):
+        """Test Tier-2 results are reported to the tag index for promotion."""
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({
+                'content': [{'text': json.dumps({'tags': [
+                    {'tag': 'Sofas', 'type': 'category', 'relevance': 0.9}
+                ]})}]
+            }).encode())
+        }
+        mock_boto_client.return_value = mock_bedrock
+        tag_index = Mock()
+        tag_index.has_tags_for_query.return_value = False
+        
+        config = dict(self.config, related_tags=dict(self.config['related_tags'],
+                                                     cache_enabled=False, streaming=False))
+        service = ClaudeLLMService(config)
+        tags = service.generate_related_tags("plush lounging piece", [], tag_index)
+        
+        tag_index.record_llm_tags.assert_called_once_with("plush lounging piece", tags)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_llm_work_skipped_when_shed(self, mock_boto_client):
+        """Test saturated limiter skips intents and tags without caching the skip."""
+        mock_bedrock = Mock()
+        mock_boto_client.return_value = mock_bedrock
+        
+        config = dict(self.config, llm_concurrency={'max_concurrent': 1, 'max_waiting': 0})
+        service = ClaudeLLMService(config)
+        service.limiter.acquire('intent')
+        
+        intents = service.extract_intents("cozy reading nook chair")
+        tags = service.generate_related_tags("cozy reading nook chair", [])
+        
+        self.assertEqual(intents['enhanced_query'], "cozy reading nook chair")
+        self.assertEqual(tags, [])
+        mock_bedrock.invoke_model.assert_not_called()
+        self.assertIsNone(service.tag_cache.get(service._cache_key('tags', "cozy reading nook chair")))
+        self.assertEqual(service.get_limiter_stats()['llm_shed_tags'], 1)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_disabled(self, mock_boto_client):
         """Test that tag generation returns empty when disabled."""
         config = self.config.copy()
@@ -459,7 +609,7 @@ class TestClaudeLLMService(unittest.TestCase):
         
         self.assertEqual(tags, [])
     
-    @patch('unit_4_search_query.llm_service.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_related_tags_error_handling(self, mock_boto_client):
         """Test tag generation handles errors gracefully."""
         mock_bedrock = Mock()
@@ -474,7 +624,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_is_valid_tag_category(self):
         """Test tag validation for categories."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             self.assertTrue(service._is_valid_tag('Sofas', 'category'))
@@ -483,7 +633,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_is_valid_tag_material(self):
         """Test tag validation for materials."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             self.assertTrue(service._is_valid_tag('Wood', 'material'))
@@ -492,7 +642,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_build_catalog_context(self):
         """Test catalog context building for prompts."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             context = service._build_catalog_context()
@@ -504,7 +654,7 @@ class TestClaudeLLMService(unittest.TestCase):
     
     def test_build_tag_catalog_context(self):
         """Test tag catalog context building."""
-        with patch('unit_4_search_query.llm_service.boto3.client'):
+        with patch('unit_4_search_query.clients.boto3.client'):
             service = ClaudeLLMService(self.config)
             
             context = service._build_tag_catalog_context()
@@ -512,6 +662,225 @@ class TestClaudeLLMService(unittest.TestCase):
             self.assertIn('Categories:', context)
             self.assertIn('Price Ranges:', context)
             self.assertIn('Under $1,000', context)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_intent_and_tag_caches_do_not_collide(self, mock_boto_client):
+        """Test cached intents are never returned as tags for the same query."""
+        intent_response = json.dumps({
+            'abstract_terms': ['cozy'],
+            'concrete_attributes': {'cozy': ['soft']},
+            'enhanced_query': 'soft sofa'
+        })
+        tag_response = json.dumps({'tags': []})
+        
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model.side_effect = [
+            {'body': BytesIO(json.dumps({'content': [{'text': intent_response}]}).encode())},
+            {'body': BytesIO(json.dumps({'content': [{'text': tag_response}]}).encode())}
+        ]
+        mock_boto_client.return_value = mock_bedrock
+        
+        service = ClaudeLLMService(self.config)
+        service.extract_intents("cozy sofa")
+        tags = service.generate_related_tags("cozy sofa")
+        
+        self.assertEqual(tags, [])
+        self.assertEqual(mock_bedrock.invoke_model.call_count, 2)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_extract_intents_semantic_cache_hit(self, mock_boto_client):
+        """Test near-duplicate queries reuse intents via their embeddings."""
+        claude_response = json.dumps({
+            'abstract_terms': ['cozy'],
+            'concrete_attributes': {'cozy': ['soft', 'plush']},
+            'enhanced_query': 'soft plush reading armchair'
+        })
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model.return_value = {
+            'body': BytesIO(json.dumps({'content': [{'text': claude_response}]}).encode())
+        }
+        mock_boto_client.return_value = mock_bedrock
+        
+        config = self.config.copy()
+        config['llm_fallback'] = dict(config['llm_fallback'], semantic_cache={
+            'enabled': True, 'similarity_threshold': 0.95, 'max_entries': 10
+        })
+        service = ClaudeLLMService(config)
+        
+        result1 = service.extract_intents("cozy reading chair", [0.6, 0.8, 0.0])
+        result2 = service.extract_intents("cosy reading chairs", [0.61, 0.79, 0.01])
+        
+        self.assertEqual(result1, result2)
+        self.assertEqual(mock_bedrock.invoke_model.call_count, 1)
+        self.assertEqual(service.get_cache_stats()['semantic_cache']['hits'], 1)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_extract_intents_uses_warm_cache(self, mock_boto_client):
+        """Test precomputed intents are served without calling Claude."""
+        intent = {
+            'abstract_terms': ['royal'],
+            'concrete_attributes': {'royal': ['ornate']},
+            'enhanced_query': 'ornate dining table'
+        }
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({
+                'format_version': 1,
+                'version': 'test',
+                'intents': {'royal dining table': intent},
+                'tags': {}
+            }, f)
+            warm_path = f.name
+        
+        try:
+            mock_bedrock = Mock()
+            mock_boto_client.return_value = mock_bedrock
+            
+            config = dict(self.config, llm_precompute={'warm_cache_path': warm_path})
+            service = ClaudeLLMService(config)
+            result = service.extract_intents("  Royal   Dining Table ")
+            
+            self.assertEqual(result, intent)
+            mock_bedrock.invoke_model.assert_not_called()
+        finally:
+            os.remove(warm_path)
+
+
+class TestIncrementalJSONParser(unittest.TestCase):
+    """Test incremental parsing of streamed JSON."""
+    
+    def test_fields_complete_across_chunks(self):
+        """Test fields become available as soon as their value closes."""
+        parser = IncrementalJSONParser()
+        
+        parser.feed('Here you go: {"abstract_terms": ["ro')
+        self.assertEqual(parser.fields, {})
+        
+        parser.feed('yal"], "enhanced_query": "elegant ta')
+        self.assertEqual(parser.fields, {'abstract_terms': ['royal']})
+        
+        parser.feed('ble"')
+        self.assertEqual(parser.fields['enhanced_query'], 'elegant table')
+        self.assertFalse(parser.done)
+        
+        parser.feed('}')
+        self.assertTrue(parser.done)
+    
+    def test_array_elements_reported_individually(self):
+        """Test elements of top-level arrays are reported as they close."""
+        parser = IncrementalJSONParser()
+        
+        completed = parser.feed('{"tags": [{"tag": "Sofa", "relevance": 0.9}, {"tag": "Wo')
+        self.assertEqual(completed, [('tags', {'tag': 'Sofa', 'relevance': 0.9})])
+        
+        completed = parser.feed('od", "relevance": 0.8}]}')
+        self.assertEqual(completed, [('tags', {'tag': 'Wood', 'relevance': 0.8})])
+        self.assertEqual(len(parser.fields['tags']), 2)
+    
+    def test_escaped_quotes_and_primitives(self):
+        """Test escaped quotes and numeric/boolean values split across chunks."""
+        text = '{"q": "say \\"hi\\"", "n": 12.5, "ok": true}'
+        parser = IncrementalJSONParser()
+        for ch in text:
+            parser.feed(ch)
+        
+        self.assertEqual(parser.fields, json.loads(text))
+
+
+class TestClaudeLLMServiceStreaming(unittest.TestCase):
+    """Test streaming Claude responses."""
+    
+    def setUp(self):
+        """Set up streaming configuration."""
+        self.config = {
+            'aws': {'region': 'ap-southeast-1', 'bedrock_region': 'us-east-1'},
+            'llm_fallback': {'enabled': True, 'cache_enabled': False, 'streaming': True},
+            'related_tags': {'enabled': True, 'cache_enabled': False, 'streaming': True, 'max_tags': 2},
+            'catalog': {
+                'categories': ['Sofa', 'Dining Table'],
+                'materials': ['Wood', 'Fabric'],
+                'styles': ['Modern'],
+                'colors': ['Grey'],
+                'price_ranges': ['Under $1,000']
+            }
+        }
+        LLMCache().clear()
+    
+    def _stream_response(self, text, chunk_size=5):
+        """Build a Bedrock response stream that delivers text in small deltas."""
+        events = [{'chunk': {'bytes': json.dumps({'type': 'message_start'}).encode()}}]
+        for i in range(0, len(text), chunk_size):
+            events.append({'chunk': {'bytes': json.dumps({
+                'type': 'content_block_delta',
+                'delta': {'type': 'text_delta', 'text': text[i:i + chunk_size]}
+            }).encode()}})
+        events.append({'chunk': {'bytes': json.dumps({'type': 'message_stop'}).encode()}})
+        
+        stream = MagicMock()
+        consumed = []
+        
+        def iterate():
+            for event in events:
+                consumed.append(event)
+                yield event
+        
+        stream.__iter__.side_effect = iterate
+        return {'body': stream}, consumed, len(events)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_extract_intents_returns_on_enhanced_query(self, mock_boto_client):
+        """Test intent extraction stops reading once enhanced_query is complete."""
+        text = json.dumps({
+            'abstract_terms': ['cozy'],
+            'concrete_attributes': {'cozy': ['soft']},
+            'enhanced_query': 'soft sofa'
+        }) + ' ' + 'x' * 200
+        response, consumed, total = self._stream_response(text)
+        
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model_with_response_stream.return_value = response
+        mock_boto_client.return_value = mock_bedrock
+        
+        service = ClaudeLLMService(self.config)
+        result = service.extract_intents("cozy sofa")
+        
+        self.assertEqual(result['enhanced_query'], 'soft sofa')
+        self.assertEqual(result['abstract_terms'], ['cozy'])
+        self.assertLess(len(consumed), total)
+        response['body'].close.assert_called_once()
+        mock_bedrock.invoke_model.assert_not_called()
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_stream_tags_validates_and_stops_at_max(self, mock_boto_client):
+        """Test streamed tags are validated and the stream stops at max_tags."""
+        text = json.dumps({'tags': [
+            {'tag': 'Sofa', 'type': 'category', 'relevance': 0.9},
+            {'tag': 'Plasma', 'type': 'material', 'relevance': 0.8},
+            {'tag': 'Wood', 'type': 'material', 'relevance': 0.7},
+            {'tag': 'Modern', 'type': 'style', 'relevance': 0.6}
+        ]})
+        response, consumed, total = self._stream_response(text)
+        
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model_with_response_stream.return_value = response
+        mock_boto_client.return_value = mock_bedrock
+        
+        service = ClaudeLLMService(self.config)
+        tags = service._generate_tags_with_llm("grey sofa")
+        
+        self.assertEqual([t['tag'] for t in tags], ['Sofa', 'Wood'])
+        self.assertLess(len(consumed), total)
+    
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_stream_error_falls_back_to_query(self, mock_boto_client):
+        """Test streaming failures return the default intent structure."""
+        mock_bedrock = Mock()
+        mock_bedrock.invoke_model_with_response_stream.side_effect = Exception("stream error")
+        mock_boto_client.return_value = mock_bedrock
+        
+        service = ClaudeLLMService(self.config)
+        result = service.extract_intents("cozy sofa")
+        
+        self.assertEqual(result['enhanced_query'], 'cozy sofa')
 
 
 if __name__ == '__main__':
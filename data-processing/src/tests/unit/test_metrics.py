@@ -0,0 +1,111 @@
+"""
+Unit tests for search metrics (latency histograms and stage timers).
+"""
+
+import unittest
+from unittest.mock import patch
+import io
+import json
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.clients import POOL_COUNTER_KEYS
+from unit_4_search_query.llm_service import LIMITER_COUNTER_KEYS
+from unit_4_search_query.metrics import LatencyHistogram, MetricsRegistry
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test LatencyHistogram."""
+
+    def test_percentiles(self):
+        """Test percentile estimates are bucket upper bounds capped at max."""
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(8.0)
+        for _ in range(10):
+            histogram.observe(420.0)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['p50_ms'], 10.0)
+        self.assertEqual(snapshot['p95_ms'], 420.0)
+        self.assertEqual(snapshot['max_ms'], 420.0)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test MetricsRegistry."""
+
+    def test_request_stages(self):
+        """Test stages accumulate per request and feed per-operation histograms."""
+        metrics = MetricsRegistry()
+
+        with metrics.request('text_search') as timer:
+            with metrics.stage('knn'):
+                pass
+            with metrics.stage('knn'):
+                pass
+            with metrics.stage('tags'):
+                pass
+
+        self.assertEqual(set(timer.breakdown()), {'knn', 'tags'})
+        latency = metrics.snapshot()['latency']
+        self.assertEqual(latency['text_search.knn']['count'], 2)
+        self.assertEqual(latency['search_latency']['count'], 1)
+
+        # Stages outside a request are recorded under their own name
+        with metrics.stage('warmup'):
+            pass
+        self.assertIn('warmup', metrics.snapshot()['latency'])
+
+    def test_prometheus_and_counters(self):
+        """Test Prometheus text output includes buckets, counters and gauges."""
+        metrics = MetricsRegistry()
+        metrics.observe('search_latency', 12.0)
+        metrics.increment('search_errors')
+        metrics.register_source('llm_concurrency', lambda: {'llm_shed_intent': 3})
+
+        text = metrics.prometheus()
+        self.assertIn('search_stage_latency_ms_bucket{name="search_latency",le="20"} 1', text)
+        self.assertIn('search_stage_latency_ms_count{name="search_latency"} 1', text)
+        self.assertIn('search_errors_total 1', text)
+        self.assertIn('llm_shed_intent 3', text)
+        self.assertEqual(metrics.snapshot()['gauges']['llm_concurrency'], {'llm_shed_intent': 3})
+
+    def test_prometheus_source_counters(self):
+        """Test source keys matching the counter pattern are typed as counters."""
+        metrics = MetricsRegistry()
+        metrics.register_source('connection_pools', lambda: {
+            'pool_bedrock_checkouts': 7, 'pool_bedrock_exhausted': 1, 'pool_bedrock_in_use': 2
+        }, counters=POOL_COUNTER_KEYS)
+        metrics.register_source('llm_concurrency', lambda: {
+            'llm_shed_tags': 3, 'llm_admitted_tags': 9, 'llm_in_flight': 1
+        }, counters=LIMITER_COUNTER_KEYS)
+
+        lines = metrics.prometheus().splitlines()
+        for name in ('pool_bedrock_checkouts', 'pool_bedrock_exhausted', 'llm_shed_tags', 'llm_admitted_tags'):
+            self.assertIn(f'# TYPE {name}_total counter', lines)
+        self.assertIn('pool_bedrock_checkouts_total 7', lines)
+        self.assertIn('# TYPE pool_bedrock_in_use gauge', lines)
+        self.assertIn('# TYPE llm_in_flight gauge', lines)
+        self.assertEqual(metrics.snapshot()['gauges']['connection_pools']['pool_bedrock_checkouts'], 7)
+
+    def test_emf_line(self):
+        """Test an EMF record is written per request when enabled."""
+        metrics = MetricsRegistry({'monitoring': {'emf': {'enabled': True, 'namespace': 'Test'}}})
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with metrics.request('image_search'):
+                with metrics.stage('embedding'):
+                    pass
+
+        record = json.loads(stdout.getvalue())
+        self.assertEqual(record['Operation'], 'image_search')
+        self.assertEqual(record['_aws']['CloudWatchMetrics'][0]['Namespace'], 'Test')
+        self.assertIn('embedding_ms', record)
+        self.assertIn('search_latency_ms', record)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit tests for query frequency tracking (count-min sketch + top-k).
+"""
+
+import unittest
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.query_frequency import CountMinSketch, QueryFrequencyTracker
+
+
+class TestCountMinSketch(unittest.TestCase):
+    """Test CountMinSketch."""
+
+    def test_never_undercounts(self):
+        """Test estimates are at least the true counts."""
+        sketch = CountMinSketch(width=64, depth=4)
+        true_counts = {f"query {i}": i % 7 + 1 for i in range(200)}
+        for query, count in true_counts.items():
+            for _ in range(count):
+                sketch.add(query)
+
+        for query, count in true_counts.items():
+            self.assertGreaterEqual(sketch.estimate(query), count)
+
+    def test_decay_halves_counts(self):
+        """Test decay halves estimates."""
+        sketch = CountMinSketch()
+        for _ in range(8):
+            sketch.add("sofa")
+        sketch.decay()
+
+        self.assertEqual(sketch.estimate("sofa"), 4)
+
+
+class TestQueryFrequencyTracker(unittest.TestCase):
+    """Test QueryFrequencyTracker."""
+
+    def test_top_k_replaces_coldest(self):
+        """Test a query more frequent than the coldest heavy hitter replaces it."""
+        tracker = QueryFrequencyTracker(top_k=2)
+        tracker.add("a")
+        tracker.add("a")
+        tracker.add("b")
+
+        count, is_heavy = tracker.add("c")
+        self.assertEqual(count, 1)
+        self.assertFalse(is_heavy)
+
+        count, is_heavy = tracker.add("c")
+        self.assertEqual(count, 2)
+        self.assertTrue(is_heavy)
+        self.assertEqual([q for q, _ in tracker.top()], ["a", "c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
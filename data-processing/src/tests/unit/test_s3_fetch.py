@@ -0,0 +1,208 @@
+"""
+Unit tests for the concurrent S3 fetch layer (Unit 1).
+"""
+
+import unittest
+from unittest.mock import patch
+import hashlib
+import json
+import threading
+import time
+from io import BytesIO
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from botocore.exceptions import ClientError
+
+from unit_1_data_ingestion.s3_fetch import S3Fetcher
+
+
+class FakeS3:
+    """In-memory S3 with ranged and conditional GETs, paged listings and in-flight tracking."""
+
+    def __init__(self, objects, page_size=1000, delay=0.0):
+        self.objects = objects
+        self.page_size = page_size
+        self.delay = delay
+        self.requests = []
+        self.if_match = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def etag(self, key):
+        return '"%s"' % hashlib.md5(self.objects[key]).hexdigest()
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        with self.lock:
+            self.requests.append((Key, Range))
+            self.if_match[(Key, Range)] = IfMatch
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            data = self.objects[Key]
+            etag = self.etag(Key)
+            if IfMatch is not None and IfMatch != etag:
+                raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'GetObject')
+            if Range is None:
+                return {'Body': BytesIO(data), 'ETag': etag}
+            first, last = (int(n) for n in Range[len('bytes='):].split('-'))
+            if first >= len(data):
+                raise ClientError({'Error': {'Code': 'InvalidRange'}}, 'GetObject')
+            last = min(last, len(data) - 1)
+            return {'Body': BytesIO(data[first:last + 1]), 'ETag': etag,
+                    'ContentRange': f'bytes {first}-{last}/{len(data)}'}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for k in fake.objects if k.startswith(Prefix))
+                for i in range(0, len(keys), fake.page_size):
+                    yield {'Contents': [{'Key': k, 'Size': len(fake.objects[k]), 'ETag': fake.etag(k)}
+                                        for k in keys[i:i + fake.page_size]]}
+
+        return Paginator()
+
+
+def fetch_config(max_concurrency=4, part_size_mb=1 / 1024):
+    """Config with 1 KiB parts by default."""
+    return {'aws': {'s3': {'fetch': {'max_concurrency': max_concurrency, 'part_size_mb': part_size_mb}}}}
+
+
+class TestS3Fetcher(unittest.TestCase):
+    """Test S3Fetcher."""
+
+    def test_large_object_ranged_parts(self):
+        """Test an object of unknown size is probed, then fetched in parallel parts."""
+        data = bytes(range(256)) * 20  # 5120 bytes = 5 parts of 1 KiB
+        s3 = FakeS3({'big.json': data, 'small.csv': b'a,b\n1,2\n'})
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config())
+
+        bodies = fetcher.fetch_many(['small.csv', 'big.json'])
+
+        self.assertEqual(list(bodies), ['small.csv', 'big.json'])
+        self.assertEqual(bodies['big.json'], data)
+        self.assertEqual(bodies['small.csv'], b'a,b\n1,2\n')
+        big_ranges = sorted(r for k, r in s3.requests if k == 'big.json')
+        self.assertEqual(len(big_ranges), 5)
+        self.assertIn('bytes=0-1023', big_ranges)
+
+        timings = {t['key']: t for t in fetcher.timings}
+        self.assertEqual(timings['big.json']['parts'], 5)
+        self.assertEqual(timings['big.json']['bytes'], 5120)
+        self.assertEqual(timings['small.csv']['parts'], 1)
+
+    def test_known_sizes_and_empty_object(self):
+        """Test listed sizes skip the probe and empty objects come back empty."""
+        s3 = FakeS3({'a.json': b'x' * 100, 'empty.json': b''})
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config())
+
+        bodies = fetcher.fetch_many(['a.json', 'empty.json'], sizes={'a.json': 100})
+
+        self.assertEqual(bodies, {'a.json': b'x' * 100, 'empty.json': b''})
+        self.assertIn(('a.json', None), s3.requests)
+
+    def test_parts_pinned_to_first_part_etag(self):
+        """Test ranged parts require the probed ETag and an overwrite mid-download fails."""
+        data = b'x' * 3000
+        s3 = FakeS3({'big.json': data})
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config())
+
+        self.assertEqual(fetcher.fetch('big.json'), data)
+        self.assertEqual(s3.if_match, {
+            ('big.json', 'bytes=0-1023'): None,
+            ('big.json', 'bytes=1024-2047'): s3.etag('big.json'),
+            ('big.json', 'bytes=2048-2999'): s3.etag('big.json')
+        })
+
+        class OverwrittenS3(FakeS3):
+            def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+                response = super().get_object(Bucket, Key, Range, IfMatch)
+                self.objects[Key] = b'y' * len(self.objects[Key])
+                return response
+
+        fetcher = S3Fetcher(OverwrittenS3({'big.json': data}), 'bucket', fetch_config())
+        with self.assertRaises(ClientError) as context:
+            fetcher.fetch('big.json')
+        self.assertEqual(context.exception.response['Error']['Code'], 'PreconditionFailed')
+
+    def test_listed_etags_skip_the_probe(self):
+        """Test listed sizes and ETags request every part at once, each pinned to the ETag."""
+        s3 = FakeS3({'big.json': b'x' * 3000}, delay=0.02)
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config(max_concurrency=3))
+        listing = fetcher.list_objects('')
+
+        fetcher.fetch_many(['big.json'], sizes={o['Key']: o['Size'] for o in listing},
+                           etags={o['Key']: o['ETag'] for o in listing})
+
+        self.assertEqual(set(s3.if_match.values()), {s3.etag('big.json')})
+        self.assertEqual(s3.max_in_flight, 3)
+
+    def test_iter_fetch_yields_objects_as_they_complete(self):
+        """Test a small object is handed out before a multi-part one finishes."""
+        data = b'x' * 5120
+        s3 = FakeS3({'big.json': data, 'small.csv': b'a,b\n'}, delay=0.02)
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config())
+
+        fetched = list(fetcher.iter_fetch(['big.json', 'small.csv']))
+
+        self.assertEqual(fetched, [('small.csv', b'a,b\n'), ('big.json', data)])
+        self.assertEqual(len(fetcher.timings), 2)
+
+    def test_bounded_concurrency(self):
+        """Test requests run in parallel but never above max_concurrency."""
+        s3 = FakeS3({f'batch_{i}.json': b'{}' for i in range(12)}, delay=0.02)
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config(max_concurrency=3))
+
+        fetcher.fetch_many(sorted(s3.objects))
+
+        self.assertEqual(s3.max_in_flight, 3)
+
+    def test_list_objects_paginates(self):
+        """Test every listing page is read."""
+        s3 = FakeS3({f'emb/batch_{i:04d}.json': b'[]' for i in range(2500)}, page_size=1000)
+        fetcher = S3Fetcher(s3, 'bucket', fetch_config())
+
+        self.assertEqual(len(fetcher.list_objects('emb/')), 2500)
+
+
+class TestS3EmbeddingLoader(unittest.TestCase):
+    """Test image embeddings are loaded past the first listing page."""
+
+    @patch('unit_3_search_index.index_from_s3.boto3.client')
+    def test_load_image_embeddings_all_pages(self, mock_boto_client):
+        """Test all batch files are fetched, in key order."""
+        from unit_3_search_index.index_from_s3 import S3EmbeddingLoader
+
+        objects = {f'img/image_embeddings_batch_{i:04d}.json': json.dumps([{'id': i}]).encode()
+                   for i in range(1005)}
+        objects['img/README.txt'] = b'not a batch'
+        mock_boto_client.return_value = FakeS3(objects, page_size=1000)
+        config = {
+            'aws': {
+                'region': 'ap-southeast-1',
+                's3': {
+                    'bucket': 'bucket',
+                    'embeddings': {
+                        'image_embeddings_prefix': 'img/',
+                        'image_embeddings_pattern': 'image_embeddings_batch_*.json'
+                    }
+                }
+            }
+        }
+
+        images = S3EmbeddingLoader(config).load_image_embeddings()
+
+        self.assertEqual([image['id'] for image in images], list(range(1005)))
+
+
+if __name__ == '__main__':
+    unittest.main()
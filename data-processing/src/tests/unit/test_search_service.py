@@ -3,7 +3,7 @@ Unit tests for SearchQueryService (Unit 4)
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, ANY
 import json
 import sys
 from pathlib import Path
@@ -65,9 +65,9 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
-    @patch('unit_4_search_query.search_service.boto3.Session')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.Session')
     def test_init(self, mock_session, mock_boto_client, mock_opensearch, 
                   mock_llm_service, mock_tag_service):
         """Test service initialization."""
@@ -76,7 +76,8 @@ class TestSearchQueryService(unittest.TestCase):
         # Verify Bedrock client uses correct region
         mock_boto_client.assert_called_with(
             'bedrock-runtime',
-            region_name='us-east-1'
+            region_name='us-east-1',
+            config=ANY
         )
         
         # Verify LLM and Tag services initialized
@@ -85,9 +86,51 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
-    @patch('unit_4_search_query.search_service.boto3.Session')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.Session')
+    def test_reset_clients(self, mock_session, mock_boto_client, mock_opensearch,
+                           mock_llm_service, mock_tag_service):
+        """Test forked workers get new clients but keep shared state."""
+        service = SearchQueryService(self.config)
+        tag_index = service.tag_index
+        catalog = service.catalog
+        mock_opensearch.return_value = Mock(name='worker_client')
+        
+        service.reset_clients()
+        
+        self.assertIs(service.opensearch_client, mock_opensearch.return_value)
+        self.assertEqual(mock_opensearch.call_count, 2)
+        self.assertIs(service.tag_index, tag_index)
+        self.assertIs(service.catalog, catalog)
+        service.llm_service.reset_clients.assert_called_once()
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.Session')
+    def test_lazy_components_share_clients(self, mock_session, mock_boto_client, mock_opensearch,
+                                           mock_llm_service, mock_tag_service):
+        """Test lazy init defers LLM/tag services and all services share one client set."""
+        service = SearchQueryService(self.config, lazy=True)
+        
+        mock_llm_service.assert_not_called()
+        mock_tag_service.assert_not_called()
+        
+        self.assertIs(service.llm_service, mock_llm_service.return_value)
+        self.assertIs(service.tag_index, mock_tag_service.return_value)
+        mock_llm_service.assert_called_once_with(self.config, clients=service.clients)
+        
+        # One Bedrock client and one session for the whole process
+        mock_boto_client.assert_called_once()
+        mock_session.assert_called_once()
+        
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    @patch('unit_4_search_query.clients.boto3.Session')
     def test_extract_filters_price(self, mock_session, mock_boto_client, 
                                    mock_opensearch, mock_llm_service, mock_tag_service):
         """Test price filter extraction from query."""
@@ -4,7 +4,7 @@ Tests all search functionality including KNN, BM25, hybrid search, and image sea
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, ANY
 from io import BytesIO
 import json
 import base64
@@ -89,8 +89,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_init_with_iam_auth(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test service initialization with IAM auth."""
         config = self.config.copy()
@@ -101,7 +101,8 @@ class TestSearchQueryService(unittest.TestCase):
         # Verify Bedrock client created with correct region
         mock_boto_client.assert_called_with(
             'bedrock-runtime',
-            region_name='us-east-1'
+            region_name='us-east-1',
+            config=ANY
         )
         
         # Verify OpenSearch client created
@@ -109,8 +110,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_init_with_basic_auth(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test service initialization with basic auth."""
         service = SearchQueryService(self.config)
@@ -121,8 +122,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_price_under(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting 'under' price filter."""
         service = SearchQueryService(self.config)
@@ -134,8 +135,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_price_between(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting 'between' price filter."""
         service = SearchQueryService(self.config)
@@ -149,8 +150,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_colors(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting color filters."""
         service = SearchQueryService(self.config)
@@ -163,8 +164,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_materials(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting material filters."""
         service = SearchQueryService(self.config)
@@ -177,8 +178,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_categories(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting category filters."""
         service = SearchQueryService(self.config)
@@ -191,8 +192,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_extract_filters_sizes(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test extracting size filters."""
         service = SearchQueryService(self.config)
@@ -204,8 +205,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_query_embedding_success(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test successful query embedding generation."""
         mock_response = {
@@ -224,8 +225,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_generate_query_embedding_error(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test query embedding generation error handling."""
         mock_bedrock = Mock()
@@ -239,8 +240,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_knn_search_success(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test successful KNN search."""
         mock_os_response = {
@@ -271,8 +272,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_knn_search_with_price_filter(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test KNN search with price filter."""
         mock_os_client = Mock()
@@ -291,8 +292,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_knn_search_error(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test KNN search error handling."""
         mock_os_client = Mock()
@@ -306,8 +307,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_bm25_search_success(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test successful BM25 search."""
         mock_os_response = {
@@ -338,8 +339,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_bm25_search_with_field_boosts(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test BM25 search applies field boosts."""
         mock_os_client = Mock()
@@ -360,8 +361,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_reciprocal_rank_fusion(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test Reciprocal Rank Fusion combines results correctly."""
         service = SearchQueryService(self.config)
@@ -393,8 +394,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_reciprocal_rank_fusion_no_overlap(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test RRF with no overlapping results."""
         service = SearchQueryService(self.config)
@@ -414,8 +415,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_format_results(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test result formatting."""
         service = SearchQueryService(self.config)
@@ -456,8 +457,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_format_results_no_default_image(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test result formatting when no default image."""
         service = SearchQueryService(self.config)
@@ -481,8 +482,8 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_get_text_results_empty_query(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test text search with empty query."""
         service = SearchQueryService(self.config)
@@ -494,8 +495,190 @@ class TestSearchQueryService(unittest.TestCase):
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_fallback_reuses_query_embedding(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test LLM fallback receives the embedding computed for the search."""
+        service = SearchQueryService(self.config)
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        service.knn_search = Mock(return_value=[{'variant_id': '1', 'score': 0.1}])
+        service.bm25_search = Mock(return_value=[])
+        service.llm_service.should_trigger_fallback.return_value = True
+        service.llm_service.extract_intents.return_value = {'enhanced_query': 'cozy reading chair'}
+        service.llm_service.generate_related_tags.return_value = []
+        
+        result = service.get_text_results("cozy reading chair")
+        
+        self.assertEqual(result['status'], 'success')
+        service.llm_service.extract_intents.assert_called_once_with(
+            "cozy reading chair", self.mock_embedding
+        )
+        self.assertEqual(service.generate_query_embedding.call_count, 1)
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_facet_tags(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test facet aggregations ride on the KNN request and feed related tags."""
+        aggregations = {'category': {'buckets': [{'key': 'Sofas', 'doc_count': 12}]}}
+        mock_os_client = Mock()
+        mock_os_client.search.return_value = {
+            'hits': {
+                'total': {'value': 20, 'relation': 'eq'},
+                'hits': [{'_source': {'variant_id': '1', 'product_name': 'Grey Sofa'}, '_score': 0.9}]
+            },
+            'aggregations': aggregations
+        }
+        mock_opensearch.return_value = mock_os_client
+        
+        config = dict(self.config)
+        config['related_tags'] = dict(self.config['related_tags'], facet_tags={'enabled': True})
+        config['search_query'] = dict(self.config['search_query'], default_search_mode='knn')
+        
+        service = SearchQueryService(config)
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        service.llm_service.should_trigger_fallback.return_value = False
+        service.llm_service.generate_related_tags.return_value = []
+        facet_tags = [{'tag': 'Sofas', 'type': 'category', 'relevance_score': 0.6, 'count': 12}]
+        service.tag_index.get_facet_tags.return_value = facet_tags
+        
+        result = service.get_text_results("grey couch")
+        
+        self.assertEqual(result['status'], 'success')
+        body = mock_os_client.search.call_args[1]['body']
+        self.assertIn('price', body['aggs'])
+        self.assertEqual(body['aggs']['category']['terms']['field'], 'frontend_category')
+        service.tag_index.get_facet_tags.assert_called_once_with(
+            "grey couch", aggregations, 20, min_count=2
+        )
+        self.assertEqual(
+            service.llm_service.generate_related_tags.call_args[1]['facet_tags'], facet_tags
+        )
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_stage_timings(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test stages are timed and the breakdown is returned in debug mode."""
+        config = dict(self.config, monitoring={'debug_timings': True})
+        service = SearchQueryService(config)
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        service.knn_search = Mock(return_value=[{'variant_id': '1', 'score': 0.9}])
+        service.bm25_search = Mock(return_value=[{'variant_id': '2', 'score': 4.0}])
+        service.llm_service.should_trigger_fallback.return_value = False
+        service.llm_service.generate_related_tags.return_value = []
+        
+        result = service.get_text_results("grey sofa")
+        
+        timings = result['search_metadata']['stage_timings_ms']
+        self.assertEqual(
+            set(timings), {'filters', 'embedding', 'knn', 'bm25', 'fusion', 'formatting', 'tags'}
+        )
+        snapshot = service.metrics.snapshot()
+        self.assertEqual(snapshot['latency']['text_search.knn']['count'], 1)
+        self.assertEqual(snapshot['counters']['tag_generation_count'], 1)
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_batch(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test batch search sends every leg in one msearch and keeps query order."""
+        def leg(variant_id, score):
+            return {'hits': {'total': {'value': 1}, 'hits': [
+                {'_source': {'variant_id': variant_id}, '_score': score}
+            ]}}
+        
+        mock_os_client = Mock()
+        mock_os_client.msearch.return_value = {'responses': [
+            leg('a', 0.9), leg('a', 12.0),
+            {'error': {'type': 'search_phase_execution_exception'}}, leg('b', 5.0)
+        ]}
+        mock_opensearch.return_value = mock_os_client
+        
+        service = SearchQueryService(self.config)
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        
+        result = service.get_text_results_batch(
+            ["grey sofa", "", "oak table"], llm_fallback=False, include_tags=False
+        )
+        
+        self.assertEqual(result['status'], 'success')
+        mock_os_client.msearch.assert_called_once()
+        mock_os_client.search.assert_not_called()
+        body = mock_os_client.msearch.call_args[1]['body']
+        self.assertEqual(len(body), 8)
+        self.assertIn('knn', body[1]['query'])
+        self.assertIn('multi_match', body[3]['query'])
+        self.assertEqual(service.generate_query_embedding.call_count, 2)
+        
+        first, empty, failed = result['responses']
+        self.assertEqual(first['status'], 'success')
+        self.assertEqual(first['results'][0]['variant_id'], 'a')
+        self.assertEqual(first['related_tags'], [])
+        self.assertEqual(empty['error_code'], 'EMPTY_QUERY')
+        self.assertEqual(failed['error_code'], 'SEARCH_FAILED')
+        service.llm_service.should_trigger_fallback.assert_not_called()
+        service.llm_service.generate_related_tags.assert_not_called()
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_batch_embedding_error(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test a failed embedding fails only its query; the others still go to msearch."""
+        def leg(variant_id, score):
+            return {'hits': {'total': {'value': 1}, 'hits': [
+                {'_source': {'variant_id': variant_id}, '_score': score}
+            ]}}
+        
+        mock_os_client = Mock()
+        mock_os_client.msearch.return_value = {'responses': [
+            leg('a', 0.9), leg('a', 12.0), leg('c', 0.8), leg('c', 9.0)
+        ]}
+        mock_opensearch.return_value = mock_os_client
+        
+        def embed(query):
+            if query == "oak table":
+                raise Exception("ThrottlingException")
+            return self.mock_embedding
+        
+        service = SearchQueryService(self.config)
+        service.generate_query_embedding = Mock(side_effect=embed)
+        
+        result = service.get_text_results_batch(
+            ["grey sofa", "oak table", "linen chair"], llm_fallback=False, include_tags=False
+        )
+        
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(service.generate_query_embedding.call_count, 3)
+        self.assertEqual(len(mock_os_client.msearch.call_args[1]['body']), 8)
+        first, failed, third = result['responses']
+        self.assertEqual(first['results'][0]['variant_id'], 'a')
+        self.assertEqual(failed, {'status': 'error', 'error_code': 'SEARCH_FAILED',
+                                  'message': 'ThrottlingException'})
+        self.assertEqual(third['results'][0]['variant_id'], 'c')
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_get_text_results_batch_too_large(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test batches over max_batch_size are rejected."""
+        config = dict(self.config)
+        config['search_query'] = dict(self.config['search_query'], batch={'max_batch_size': 2})
+        service = SearchQueryService(config)
+        
+        result = service.get_text_results_batch(["a", "b", "c"])
+        
+        self.assertEqual(result['error_code'], 'BATCH_TOO_LARGE')
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_get_image_match_result_invalid_image(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
         """Test image search with invalid image."""
         service = SearchQueryService(self.config)
@@ -505,40 +688,124 @@ class TestSearchQueryService(unittest.TestCase):
         self.assertEqual(result['status'], 'error')
         self.assertEqual(result['error_code'], 'INVALID_IMAGE')
     
+    def _search_with_candidates(self, config=None):
+        """Build a service and run a text search that caches its candidates."""
+        service = SearchQueryService(config or self.config)
+        candidates = [
+            {'variant_id': str(i), 'score': 1.0 - i / 100, 'price': 400 + 100 * i,
+             'frontend_category': 'Sofas' if i % 2 else 'Sectionals',
+             'material': 'Performance Fabric' if i < 6 else 'Top Grain Leather'}
+            for i in range(12)
+        ]
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        service.knn_search = Mock(return_value=candidates)
+        service.bm25_search = Mock(return_value=[])
+        service.llm_service.should_trigger_fallback.return_value = False
+        service.llm_service.generate_related_tags.return_value = []
+        service.tag_index.has_tags_for_query.return_value = False
+        service.get_text_results("sofa")
+        return service
+    
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
     def test_refine_search_by_tag_category(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
-        """Test refining search by category tag."""
-        # Mock get_text_results
+        """Test refining by category filters cached candidates without a new search."""
+        config = dict(self.config)
+        config['search_query'] = dict(self.config['search_query'], refine={'min_results': 3})
+        service = self._search_with_candidates(config)
+        service.knn_search.reset_mock()
+        service.generate_query_embedding.reset_mock()
+        
+        result = service.refine_search_by_tag("sofa", "Sectionals", "category")
+        
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['total_results'], 6)
+        self.assertTrue(all(r['frontend_category'] == 'Sectionals' for r in result['results']))
+        self.assertEqual([r['rank'] for r in result['results']], list(range(1, 7)))
+        self.assertFalse(result['search_metadata']['re_retrieved'])
+        service.knn_search.assert_not_called()
+        service.generate_query_embedding.assert_not_called()
+        service.llm_service.generate_related_tags.assert_called_once()
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_refine_search_by_tag_price_range(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test too few matching candidates re-retrieve with a price filter and cached embedding."""
+        service = self._search_with_candidates()
+        service.generate_query_embedding.reset_mock()
+        service.knn_search.return_value = [{'variant_id': 'x', 'score': 0.8, 'price': 650}]
+        
+        result = service.refine_search_by_tag("sofa", "Under $700", "price_range")
+        
+        self.assertEqual(result['status'], 'success')
+        self.assertTrue(result['search_metadata']['re_retrieved'])
+        self.assertEqual(result['search_metadata']['filters_applied']['price_max'], 700.0)
+        knn_args = service.knn_search.call_args[0]
+        self.assertEqual(knn_args[0], self.mock_embedding)
+        self.assertEqual(knn_args[1]['price_max'], 700.0)
+        service.generate_query_embedding.assert_not_called()
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_refine_search_by_tag_price_band_is_half_open(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test a product priced at a band's upper edge belongs to the next band only."""
+        config = dict(self.config)
+        config['search_query'] = dict(self.config['search_query'], refine={'min_results': 3})
+        service = self._search_with_candidates(config)
+        
+        result = service.refine_search_by_tag("sofa", "$500-$1,000", "price_range")
+        
+        self.assertFalse(result['search_metadata']['re_retrieved'])
+        self.assertEqual(sorted(r['price'] for r in result['results']), [500, 600, 700, 800, 900])
+        
+        body = service._knn_query_body(self.mock_embedding, {'price_min': 500.0, 'price_max': 1000.0,
+                                                             'price_max_exclusive': True}, 10)
+        self.assertIn({"range": {"price": {"lt": 1000.0}}}, body['query']['bool']['filter'])
+        self.assertEqual(body['_source'], {"excludes": ["text_embedding"]})
+    
+    @patch('unit_4_search_query.search_service.TagIndexService')
+    @patch('unit_4_search_query.search_service.ClaudeLLMService')
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_refine_search_by_tag_material_clause(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test material tags become a keyword filter clause in the OpenSearch query."""
+        mock_os_client = Mock()
+        mock_os_client.search.return_value = {'hits': {'hits': [
+            {'_source': {'variant_id': '1', 'material': 'Top Grain Leather'}, '_score': 0.9}
+        ]}}
+        mock_opensearch.return_value = mock_os_client
         service = SearchQueryService(self.config)
-        service.get_text_results = Mock(return_value={'status': 'success'})
+        service.generate_query_embedding = Mock(return_value=self.mock_embedding)
+        service.tag_index.has_tags_for_query.return_value = False
         
-        result = service.refine_search_by_tag("sofa", "Dining Chairs", "category")
+        result = service.refine_search_by_tag("sofa", "Leather", "material")
         
-        # Should call get_text_results with refined query
-        service.get_text_results.assert_called_once()
-        call_args = service.get_text_results.call_args[0][0]
-        self.assertIn("Dining Chairs", call_args)
-        self.assertIn("sofa", call_args)
+        self.assertEqual(result['status'], 'success')
+        self.assertFalse(result['search_metadata']['candidate_cache_hit'])
+        body = mock_os_client.search.call_args_list[0][1]['body']
+        self.assertIn(
+            {"wildcard": {"material": {"value": "*Leather*", "case_insensitive": True}}},
+            body['query']['bool']['filter']
+        )
     
     @patch('unit_4_search_query.search_service.TagIndexService')
     @patch('unit_4_search_query.search_service.ClaudeLLMService')
-    @patch('unit_4_search_query.search_service.OpenSearch')
-    @patch('unit_4_search_query.search_service.boto3.client')
-    def test_refine_search_by_tag_price_range(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
-        """Test refining search by price range tag."""
+    @patch('unit_4_search_query.clients.OpenSearch')
+    @patch('unit_4_search_query.clients.boto3.client')
+    def test_refine_search_by_unknown_tag_type(self, mock_boto_client, mock_opensearch, mock_llm, mock_tag_index):
+        """Test tags without a structured filter search the combined query."""
         service = SearchQueryService(self.config)
-        service.get_text_results = Mock(return_value={'status': 'success'})
+        service._text_results = Mock(return_value={'status': 'success'})
         
-        result = service.refine_search_by_tag("sofa", "Under $1,000", "price_range")
+        service.refine_search_by_tag("sofa", "Outdoor", "room")
         
-        # Should call get_text_results with price in query
-        service.get_text_results.assert_called_once()
-        call_args = service.get_text_results.call_args[0][0]
-        self.assertIn("Under $1,000", call_args)
-
+        service._text_results.assert_called_once_with("sofa Outdoor")
 
 if __name__ == '__main__':
     unittest.main()
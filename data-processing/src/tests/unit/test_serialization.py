@@ -0,0 +1,76 @@
+"""
+Unit tests for API response serialization and compression.
+"""
+
+import unittest
+from unittest.mock import patch
+import gzip
+import json
+import os
+
+import numpy as np
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query import serialization
+from unit_4_search_query.serialization import ResponseEncoder, parse_accept_encoding
+
+
+class TestResponseEncoder(unittest.TestCase):
+    """Test ResponseEncoder."""
+
+    def setUp(self):
+        """Set up a response with NumPy values."""
+        self.result = {
+            'status': 'success',
+            'results': [
+                {'variant_id': str(i), 'score': np.float32(0.5), 'description': 'Grey sofa ' * 20}
+                for i in range(20)
+            ],
+            'embedding': np.array([0.25, 0.5])
+        }
+
+    def test_numpy_values_with_both_serializers(self):
+        """Test NumPy scalars and arrays serialize with orjson and json."""
+        for serializer in ('auto', 'json'):
+            encoder = ResponseEncoder({'api_response': {'serializer': serializer}})
+            decoded = json.loads(encoder.dumps(self.result))
+            self.assertEqual(decoded['results'][0]['score'], 0.5)
+            self.assertEqual(decoded['embedding'], [0.25, 0.5])
+
+    def test_gzip_when_accepted_and_large(self):
+        """Test large bodies are gzip-compressed when the client accepts gzip."""
+        encoder = ResponseEncoder()
+
+        body, headers = encoder.encode(self.result, 'gzip, deflate')
+
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(body))['status'], 'success')
+
+    def test_small_or_unaccepted_bodies_not_compressed(self):
+        """Test bodies under the threshold or without Accept-Encoding stay plain."""
+        encoder = ResponseEncoder()
+
+        _, headers = encoder.encode({'status': 'ok'}, 'gzip')
+        self.assertNotIn('Content-Encoding', headers)
+
+        body, headers = encoder.encode(self.result, None)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(json.loads(body)['status'], 'success')
+
+    def test_choose_encoding_respects_q_values(self):
+        """Test q=0 excludes an encoding and brotli is used only when installed."""
+        encoder = ResponseEncoder()
+        self.assertIsNone(encoder.choose_encoding('gzip;q=0, identity'))
+        self.assertEqual(encoder.choose_encoding('*'), encoder.encodings[0])
+
+        with patch.object(serialization, 'brotli', None):
+            self.assertEqual(ResponseEncoder().choose_encoding('br, gzip;q=0.5'), 'gzip')
+
+        self.assertEqual(parse_accept_encoding('br;q=0.8, GZIP'), {'br': 0.8, 'gzip': 1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the ingestion snapshot cache (Unit 1).
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+import pandas as pd
+
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
+from unit_1_data_ingestion.data_ingestion_service import DataIngestionService, _as_text
+
+
+class TestSnapshotCache(unittest.TestCase):
+    """Test SnapshotCache."""
+
+    def setUp(self):
+        """Create a temporary cache directory."""
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = SnapshotCache(self.cache_dir)
+
+    def test_round_trip_and_stale_key(self):
+        """Test a snapshot is returned for its key only, with dtypes kept."""
+        df = pd.DataFrame({'variant_id': [1, 2], 'currency': pd.Categorical(['SGD', 'SGD'])})
+        self.cache.store('data/variant.csv', 'etag:abc|schema', df, source_bytes=1000)
+
+        loaded = self.cache.load('data/variant.csv', 'etag:abc|schema')
+        pd.testing.assert_frame_equal(loaded, df)
+        self.assertIsNone(self.cache.load('data/variant.csv', 'etag:def|schema'))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes_saved']), (1, 1, 1000))
+
+    def test_round_trip_keeps_missing_values(self):
+        """Test missing values come back as NaN in their original dtypes, so warm runs match cold runs."""
+        df = pd.DataFrame({
+            'variant_id': [1, 2],
+            'description': pd.Series(['Soft', np.nan], dtype=object),
+            'variant_name': pd.Series(['Sofa', np.nan], dtype='str'),
+            'product_id': pd.array([10, None], dtype='Int64')
+        })
+        self.cache.store('data/variant.csv', 'etag:abc|schema', df)
+
+        loaded = self.cache.load('data/variant.csv', 'etag:abc|schema')
+
+        pd.testing.assert_frame_equal(loaded, df)
+        self.assertIsInstance(loaded['description'][1], float)
+        self.assertEqual(_as_text(loaded['description']).tolist(), ['Soft', 'nan'])
+        self.assertEqual(_as_text(loaded['variant_name']).tolist(), _as_text(df['variant_name']).tolist())
+
+    def test_local_source_key_survives_touch(self):
+        """Test a touched but unchanged file still hits; an edited file misses."""
+        path = Path(self.cache_dir) / 'variant.csv'
+        path.write_text('variant_id\n1\n')
+        source = self.cache.local_source_key(path)
+        self.cache.store(str(path), source['source_key'], pd.DataFrame({'variant_id': [1]}), extra=source)
+
+        later = time.time() + 10
+        os.utime(path, (later, later))
+        self.assertIsNotNone(self.cache.load(str(path), self.cache.local_source_key(path)['source_key']))
+
+        path.write_text('variant_id\n2\n')
+        self.assertIsNone(self.cache.load(str(path), self.cache.local_source_key(path)['source_key']))
+
+    def test_disabled(self):
+        """Test a disabled cache neither stores nor loads."""
+        cache = SnapshotCache(self.cache_dir, enabled=False)
+        cache.store('x', 'k', pd.DataFrame({'a': [1]}))
+        self.assertIsNone(cache.load('x', 'k'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class TestLoadAllDataSnapshots(unittest.TestCase):
+    """Test DataIngestionService.load_all_data with snapshots enabled."""
+
+    def setUp(self):
+        """Config with two files and a temporary snapshot directory."""
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.config = {
+            'aws': {
+                'region': 'ap-southeast-1',
+                's3': {
+                    'bucket': 'test-bucket',
+                    'data_prefix': 'data/',
+                    'files': ['variant.csv', 'variant_option.csv']
+                }
+            },
+            'data_ingestion': {'snapshot_cache': {'enabled': True, 'dir': self.cache_dir}}
+        }
+        self.objects = {
+            'data/variant.csv': b'variant_id,variant_name,currency\n1,Sofa,SGD\n',
+            'data/variant_option.csv': b'variant_id,option_type,option_value\n1,Color,Grey\n'
+        }
+        self.etags = {'data/variant.csv': '"v1"', 'data/variant_option.csv': '"o1"'}
+
+    def make_s3(self):
+        """Mock S3 serving self.objects with self.etags in the listing."""
+        s3 = Mock()
+        s3.get_object.side_effect = lambda Bucket, Key, **kwargs: {'Body': BytesIO(self.objects[Key])}
+        s3.get_paginator.return_value.paginate.side_effect = lambda Bucket, Prefix: [{
+            'Contents': [{'Key': k, 'Size': len(v), 'ETag': self.etags[k]} for k, v in self.objects.items()]
+        }]
+        return s3
+
+    @patch('unit_1_data_ingestion.data_ingestion_service.boto3.client')
+    def test_only_changed_files_are_fetched(self, mock_boto_client):
+        """Test a re-run loads unchanged files from snapshots and fetches changed ones."""
+        mock_boto_client.side_effect = lambda *args, **kwargs: self.make_s3()
+
+        first = DataIngestionService(self.config).load_all_data()
+        self.assertEqual(first['variant']['variant_name'].tolist(), ['Sofa'])
+
+        self.objects['data/variant.csv'] = b'variant_id,variant_name,currency\n1,Grey Sofa,SGD\n'
+        self.etags['data/variant.csv'] = '"v2"'
+        service = DataIngestionService(self.config)
+        second = service.load_all_data()
+
+        fetched = {c[1]['Key'] for c in service.s3_client.get_object.call_args_list}
+        self.assertEqual(fetched, {'data/variant.csv'})
+        self.assertEqual(second['variant']['variant_name'].tolist(), ['Grey Sofa'])
+        self.assertEqual(second['variant_option']['option_value'].tolist(), ['Grey'])
+        self.assertEqual(list(second), ['variant', 'variant_option'])
+        self.assertEqual(service.snapshots.stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
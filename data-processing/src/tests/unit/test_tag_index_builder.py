@@ -0,0 +1,135 @@
+"""
+Unit tests for the data-driven tag index builder (Feature 6 Tier 1).
+"""
+
+import unittest
+from unittest.mock import Mock
+import json
+import tempfile
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.catalog import CompiledCatalog
+from unit_4_search_query.tag_index_builder import (
+    TAG_INDEX_FORMAT_VERSION,
+    build_aggregation_query,
+    build_from_aggregations,
+    build_from_products,
+    write_tag_index,
+)
+from unit_4_search_query.tag_index_service import TagIndexService
+
+
+class TestTagIndexBuilder(unittest.TestCase):
+    """Test building tags from product co-occurrence."""
+
+    def setUp(self):
+        """Set up catalog and products."""
+        self.catalog_values = {
+            'categories': ['Sofas', 'Sectionals', 'Coffee Tables'],
+            'materials': ['Fabric', 'Leather', 'Oak', 'Marble'],
+            'styles': ['Modern', 'Traditional'],
+            'colors': ['Grey', 'Brown', 'White'],
+            'price_ranges': ['Under $500', 'Under $1,000', '$1,000-$2,000']
+        }
+        self.catalog = CompiledCatalog.compile(self.catalog_values)
+        self.products = (
+            [{'frontend_category': 'Sofas', 'frontend_subcategory': 'Sectionals',
+              'material': 'Performance Fabric', 'color_tone': 'Grey',
+              'product_name': 'Madison Modern Sectional', 'price': 1299.0}] * 4 +
+            [{'frontend_category': 'Sofas', 'frontend_subcategory': None,
+              'material': 'Top Grain Leather', 'color_tone': 'Brown',
+              'product_name': 'Hamilton Sofa', 'price': float('nan')}] * 2 +
+            [{'frontend_category': 'Coffee Tables', 'frontend_subcategory': 'nan',
+              'material': 'Oak, Marble', 'color_tone': 'White',
+              'product_name': 'Modern Oak Coffee Table', 'price': 450}] * 3
+        )
+
+    def test_build_from_products(self):
+        """Test category and attribute anchors with counts."""
+        index = build_from_products(self.products, self.catalog).to_index(min_count=2)
+
+        sofa_tags = {t['tag']: t for t in index['category_tags']['sofas']}
+        self.assertEqual(sofa_tags['Sectionals']['count'], 4)
+        self.assertEqual(sofa_tags['Fabric']['type'], 'material')
+        self.assertAlmostEqual(sofa_tags['Fabric']['relevance_score'], 4 / 6, places=3)
+        self.assertEqual(sofa_tags['$1,000-$2,000']['type'], 'price_range')
+        self.assertIn('Leather', sofa_tags)
+
+        # Subcategories are category anchors too
+        self.assertIn('sectionals', index['category_tags'])
+
+        # Attribute anchors go to query patterns
+        oak_tags = {t['tag']: t for t in index['query_pattern_tags']['oak']}
+        self.assertEqual(oak_tags['Coffee Tables']['count'], 3)
+        self.assertEqual(oak_tags['Marble']['type'], 'material')
+        self.assertEqual(oak_tags['Under $500']['type'], 'price_range')
+        self.assertEqual(oak_tags['Modern']['type'], 'style')
+
+        self.assertIn('Sectionals', index['term_to_tags']['sofas'])
+
+    def test_min_count_filters_rare_tags(self):
+        """Test tags below min_count are dropped."""
+        index = build_from_products(self.products, self.catalog).to_index(min_count=3)
+
+        sofa_tags = {t['tag'] for t in index['category_tags']['sofas']}
+        self.assertNotIn('Leather', sofa_tags)
+
+    def test_build_from_aggregations(self):
+        """Test counting from OpenSearch aggregation buckets."""
+        segments = {f'{low}-{high}': label for low, high, label in self.catalog.price_segments()}
+        price_key = next(k for k, label in segments.items() if label == '$1,000-$2,000')
+
+        client = Mock()
+        client.search.return_value = {
+            'hits': {'total': {'value': 6}},
+            'aggregations': {
+                'by_category': {'buckets': [{
+                    'key': 'Sofas',
+                    'doc_count': 6,
+                    'subcategory': {'buckets': [{'key': 'Sectionals', 'doc_count': 4}]},
+                    'material': {'buckets': [{'key': 'Performance Fabric', 'doc_count': 4}]},
+                    'color': {'buckets': [{'key': 'Grey', 'doc_count': 4}]},
+                    'price': {'buckets': [{'key': price_key, 'doc_count': 4}]}
+                }]}
+            }
+        }
+
+        index = build_from_aggregations(client, 'products', self.catalog).to_index(min_count=2)
+
+        sofa_tags = {t['tag']: t for t in index['category_tags']['sofas']}
+        self.assertEqual(sofa_tags['Sectionals']['count'], 4)
+        self.assertEqual(sofa_tags['Fabric']['count'], 4)
+        self.assertEqual(sofa_tags['$1,000-$2,000']['count'], 4)
+
+        body = client.search.call_args[1]['body']
+        self.assertEqual(body, build_aggregation_query(self.catalog))
+        self.assertEqual(body['size'], 0)
+
+    def test_tag_index_service_loads_artifact(self):
+        """Test TagIndexService uses the built artifact when configured."""
+        index = build_from_products(self.products, self.catalog).to_index(min_count=2)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tag_index.json')
+            write_tag_index(path, index, self.catalog, 9, source='test')
+
+            with open(path) as f:
+                artifact = json.load(f)
+            self.assertEqual(artifact['format_version'], TAG_INDEX_FORMAT_VERSION)
+            self.assertEqual(artifact['product_count'], 9)
+
+            service = TagIndexService({
+                'catalog': self.catalog_values,
+                'related_tags': {'tag_index_path': path}
+            })
+
+            self.assertIn('sofas', service.category_tags)
+            tags = {t['tag']: t for t in service.get_tags_for_query('sofas')}
+            self.assertEqual(tags['Sectionals']['count'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
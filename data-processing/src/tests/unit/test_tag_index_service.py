@@ -5,14 +5,18 @@ Tests pre-computed tag index for fast tag retrieval.
 
 import unittest
 from unittest.mock import Mock, patch
+import gzip
 import json
 import tempfile
+import time
 import os
 
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from unit_4_search_query.tag_index_service import TagIndexService, TagType, SearchTag
+from unit_4_search_query.tag_index_service import (
+    PromotedTagOverlay, TagIndexService, TagType, SearchTag, stem_term
+)
 
 
 class TestTagIndexService(unittest.TestCase):
@@ -270,6 +274,262 @@ class TestTagIndexService(unittest.TestCase):
             if os.path.exists(temp_file):
                 os.remove(temp_file)
     
+    def test_warm_cache_query_tags(self):
+        """Test whole-query tags from the warm cache are served as Tier 1."""
+        precomputed = [
+            {'tag': 'Velvet', 'type': 'material', 'relevance_score': 0.9},
+            {'tag': 'Glam', 'type': 'style', 'relevance_score': 0.8}
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({
+                'format_version': 1,
+                'version': 'test',
+                'intents': {},
+                'tags': {'royal elegant furniture': precomputed}
+            }, f)
+            warm_path = f.name
+        
+        try:
+            config = dict(self.config, llm_precompute={'warm_cache_path': warm_path})
+            service = TagIndexService(config)
+            
+            self.assertTrue(service.has_tags_for_query("Royal Elegant Furniture"))
+            self.assertFalse(service.should_use_llm_fallback("royal elegant furniture"))
+            self.assertEqual(service.get_tags_for_query("royal elegant furniture", max_tags=1),
+                             precomputed[:1])
+        finally:
+            os.remove(warm_path)
+    
+    def test_stem_term(self):
+        """Test light stemming with plural folding."""
+        self.assertEqual(stem_term('sofas'), 'sofa')
+        self.assertEqual(stem_term('benches'), 'bench')
+        self.assertEqual(stem_term('shelves'), 'shelf')
+        self.assertEqual(stem_term('accessories'), 'accessory')
+        self.assertEqual(stem_term('glass'), 'glass')
+        self.assertEqual(stem_term('leather'), 'leather')
+    
+    def test_phrase_and_plural_matching(self):
+        """Test multi-word keys and plurals match by longest phrase."""
+        service = TagIndexService(self.config)
+        
+        # Multi-word category key wins over the single-word "tables" key
+        self.assertEqual(service._match_keys("walnut coffee table"),
+                         (('category', 'coffee tables'),))
+        
+        # Plural query matches singular pattern and plural category
+        keys = service._match_keys("sofa")
+        self.assertIn(('category', 'sofas'), keys)
+        self.assertIn(('pattern', 'sofa'), keys)
+        self.assertTrue(service.has_tags_for_query("Dining Chairs"))
+        self.assertFalse(service.should_use_llm_fallback("leathers"))
+        
+        # Merged lists are memoized per key set
+        tags = service.get_tags_for_query("grey sofas", max_tags=10)
+        self.assertIs(service._tags_for_keys(service._match_keys("grey sofas")),
+                      service._tags_for_keys(service._match_keys("grey  sofa")))
+        self.assertEqual(len(tags), len({t['tag'] for t in tags}))
+    
+    def test_get_facet_tags(self):
+        """Test tags built from result-set aggregation buckets."""
+        service = TagIndexService(self.config)
+        aggregations = {
+            'category': {'buckets': [{'key': 'Sofas', 'doc_count': 30},
+                                     {'key': 'Armchairs', 'doc_count': 8}]},
+            'material': {'buckets': [{'key': 'Top Grain Leather', 'doc_count': 15},
+                                     {'key': 'Fabric', 'doc_count': 1}]},
+            'color': {'buckets': [{'key': 'Brown', 'doc_count': 12}]}
+        }
+        
+        tags = service.get_facet_tags("leather sofa", aggregations, total=40, min_count=2)
+        by_name = {t['tag']: t for t in tags}
+        
+        # Tags already in the query are skipped, rare buckets dropped
+        self.assertNotIn('Sofas', by_name)
+        self.assertNotIn('Leather', by_name)
+        self.assertNotIn('Fabric', by_name)
+        self.assertEqual(by_name['Armchairs']['count'], 8)
+        self.assertEqual(by_name['Brown']['type'], 'color')
+        self.assertAlmostEqual(by_name['Brown']['relevance_score'], 0.3)
+    
+    def test_export_compressed_versioned_snapshot(self):
+        """Test gzip snapshot export keeps version and loads back."""
+        service = TagIndexService(self.config)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tag_index.json.gz')
+            service.export_index(path)
+            
+            with gzip.open(path, 'rt') as f:
+                data = json.load(f)
+            self.assertEqual(data['version'], service.get_snapshot_info()['version'])
+            self.assertIn('format_version', data)
+            
+            new_service = TagIndexService(self.config)
+            new_service.load_index(path)
+            self.assertEqual(new_service.get_snapshot_info()['version'], data['version'])
+            self.assertEqual(new_service.category_tags, service.category_tags)
+    
+    def test_reload_swaps_snapshot(self):
+        """Test reload installs a new snapshot and keeps the old one on failure."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tag_index.json')
+            config = dict(self.config, related_tags=dict(self.config['related_tags'],
+                                                         tag_index_path=path))
+            service = TagIndexService(config)
+            self.assertEqual(service.get_snapshot_info()['source'], 'seed')
+            old_state = service._state
+            
+            with open(path, 'w') as f:
+                json.dump({
+                    'format_version': 1,
+                    'version': 'v2',
+                    'category_tags': {'ottomans': [
+                        {'tag': 'Poufs', 'type': 'category', 'relevance_score': 0.9}
+                    ]},
+                    'query_pattern_tags': {},
+                    'term_to_tags': {'ottomans': ['Poufs']}
+                }, f)
+            
+            self.assertTrue(service.reload())
+            self.assertIsNot(service._state, old_state)
+            self.assertEqual(service.get_snapshot_info()['version'], 'v2')
+            self.assertEqual(service.get_tags_for_query("ottoman")[0]['tag'], 'Poufs')
+            
+            # A broken file leaves the current snapshot serving
+            with open(path, 'w') as f:
+                f.write('{not json')
+            self.assertFalse(service.reload())
+            self.assertEqual(service.get_snapshot_info()['version'], 'v2')
+    
+    def test_watcher_reloads_on_change(self):
+        """Test the file watcher picks up a rewritten index file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tag_index.json')
+            config = dict(self.config, related_tags=dict(self.config['related_tags'],
+                                                         tag_index_path=path))
+            service = TagIndexService(config)
+            service.reload = Mock(return_value=True)
+            
+            service.start_watcher(poll_interval_seconds=0.01)
+            try:
+                service.export_index(path)
+                for _ in range(200):
+                    if service.reload.called:
+                        break
+                    time.sleep(0.01)
+            finally:
+                service.stop_watcher()
+            
+            self.assertTrue(service.reload.called)
+    
+    def test_promote_frequent_llm_tags(self):
+        """Test popular Tier-2 queries are promoted into a persistent LRU overlay."""
+        llm_tags = [{'tag': 'Velvet', 'type': 'material', 'relevance_score': 0.9}]
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            overlay_path = os.path.join(tmpdir, 'promoted.json')
+            config = dict(self.config, related_tags=dict(
+                self.config['related_tags'],
+                promotion={'enabled': True, 'min_count': 3, 'max_entries': 2,
+                           'overlay_path': overlay_path}
+            ))
+            service = TagIndexService(config)
+            
+            self.assertFalse(service.record_llm_tags("royal elegant furniture", llm_tags))
+            self.assertFalse(service.record_llm_tags("Royal  Elegant Furniture", llm_tags))
+            self.assertTrue(service.should_use_llm_fallback("royal elegant furniture"))
+            
+            self.assertTrue(service.record_llm_tags("royal elegant furniture", llm_tags))
+            self.assertFalse(service.should_use_llm_fallback("royal elegant furniture"))
+            self.assertEqual(service.get_tags_for_query("royal elegant furniture"), llm_tags)
+            
+            # Persisted overlay is merged by another worker on reload
+            other = TagIndexService(config)
+            self.assertTrue(other.has_tags_for_query("royal elegant furniture"))
+            
+            # Size cap evicts the least recently used entry
+            for query in ("gilded mirror", "boho rug"):
+                for _ in range(3):
+                    service.record_llm_tags(query, llm_tags)
+            self.assertEqual(len(service.promoted), 2)
+            self.assertNotIn("royal elegant furniture", service.promoted)
+    
+    def test_overlay_saves_merge_across_workers(self):
+        """Test each worker's save keeps the promotions other workers saved."""
+        tags = [{'tag': 'Velvet', 'type': 'material', 'relevance_score': 0.9}]
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'promoted.json')
+            first = PromotedTagOverlay(path=path)
+            second = PromotedTagOverlay(path=path)
+            
+            first.put('gilded mirror', tags, 5)
+            first.save()
+            second.put('boho rug', tags, 5)
+            second.save()
+            
+            self.assertEqual(set(PromotedTagOverlay(path=path).entries), {'gilded mirror', 'boho rug'})
+            self.assertEqual(sorted(os.listdir(tmpdir)), ['promoted.json', 'promoted.json.lock'])
+    
+    def test_watcher_skips_own_overlay_saves(self):
+        """Test a worker's own promotion does not trigger a reload; another worker's is merged."""
+        tags = [{'tag': 'Velvet', 'type': 'material', 'relevance_score': 0.9}]
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            overlay_path = os.path.join(tmpdir, 'promoted.json')
+            config = dict(self.config, related_tags=dict(
+                self.config['related_tags'],
+                promotion={'enabled': True, 'min_count': 1, 'overlay_path': overlay_path}
+            ))
+            service = TagIndexService(config)
+            service.reload = Mock(return_value=True)
+            
+            service.start_watcher(poll_interval_seconds=0.01)
+            try:
+                service.record_llm_tags("gilded mirror", tags)
+                time.sleep(0.1)
+                service.reload.assert_not_called()
+                
+                other = PromotedTagOverlay(path=overlay_path)
+                other.put('boho rug', tags, 5)
+                other.save()
+                for _ in range(200):
+                    if 'boho rug' in service.promoted:
+                        break
+                    time.sleep(0.01)
+            finally:
+                service.stop_watcher()
+            
+            self.assertIn('boho rug', service.promoted)
+            service.reload.assert_not_called()
+    
+    def test_reload_rejects_unknown_format_version(self):
+        """Test an artifact in an unknown format is not installed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tag_index.json')
+            config = dict(self.config, related_tags=dict(self.config['related_tags'],
+                                                         tag_index_path=path))
+            service = TagIndexService(config)
+            
+            with open(path, 'w') as f:
+                json.dump({'format_version': 99, 'version': 'future', 'category_tags': {},
+                           'query_pattern_tags': {}, 'term_to_tags': {}}, f)
+            
+            self.assertFalse(service.reload())
+            self.assertEqual(service.get_snapshot_info()['source'], 'seed')
+            self.assertRaises(ValueError, service.load_index, path)
+    
+    def test_promotion_disabled_by_default(self):
+        """Test nothing is promoted without promotion.enabled."""
+        service = TagIndexService(self.config)
+        
+        for _ in range(10):
+            self.assertFalse(service.record_llm_tags("royal elegant furniture",
+                                                     [{'tag': 'Velvet', 'type': 'material',
+                                                       'relevance_score': 0.9}]))
+        self.assertTrue(service.should_use_llm_fallback("royal elegant furniture"))
+    
     def test_build_query_pattern_index(self):
         """Test building query pattern index."""
         service = TagIndexService(self.config)
@@ -0,0 +1,82 @@
+"""
+Unit tests for search node warm-up and readiness.
+"""
+
+import unittest
+from unittest.mock import Mock
+import os
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unit_4_search_query.metrics import MetricsRegistry
+from unit_4_search_query.warmup import SearchWarmer, load_head_queries
+
+
+class TestSearchWarmer(unittest.TestCase):
+    """Test SearchWarmer."""
+
+    def setUp(self):
+        """Set up a mock search service with real metrics."""
+        self.service = Mock()
+        self.service.text_index = 'product-text-embeddings'
+        self.service.image_index = 'product-image-embeddings'
+        self.service.metrics = MetricsRegistry()
+        self.service.opensearch_client.transport.perform_request.return_value = {
+            '_shards': {'total': 2, 'successful': 2, 'failed': 0}
+        }
+        self.service._text_results.return_value = {'status': 'success'}
+        self.config = {
+            'warmup': {
+                'head_queries': ['sofa', 'grey sofa', 'sofa'],
+                'replay_concurrency': 2
+            }
+        }
+
+    def test_run_all_steps(self):
+        """Test connections, k-NN warmup for both indices and head-query replay."""
+        warmer = SearchWarmer(self.service, self.config)
+        self.assertFalse(warmer.status()['ready'])
+
+        report = warmer.run()
+
+        self.assertTrue(warmer.ready)
+        self.service.clients.warm_up.assert_called_once()
+        self.service.generate_query_embedding.assert_called_once_with('sofa')
+        urls = [c[0][1] for c in self.service.opensearch_client.transport.perform_request.call_args_list]
+        self.assertEqual(urls, ['/_plugins/_knn/warmup/product-text-embeddings',
+                                '/_plugins/_knn/warmup/product-image-embeddings'])
+        self.assertEqual(report['steps']['head_queries']['replayed'], 2)
+
+        # Replayed queries are timed as 'warmup', not as search traffic
+        latency = self.service.metrics.snapshot()['latency']
+        self.assertEqual(latency['warmup.total']['count'], 2)
+        self.assertNotIn('search_latency', latency)
+
+    def test_failed_step_still_ready(self):
+        """Test a failing step is reported without blocking readiness."""
+        self.service.opensearch_client.transport.perform_request.side_effect = Exception('timeout')
+        warmer = SearchWarmer(self.service, self.config)
+
+        report = warmer.run(steps=['knn'])
+
+        self.assertTrue(warmer.ready)
+        self.assertEqual(len(report['errors']), 1)
+        self.service._text_results.assert_not_called()
+
+    def test_disabled_is_ready(self):
+        """Test a disabled warm-up reports ready without running anything."""
+        warmer = SearchWarmer(self.service, {'warmup': {'enabled': False}})
+
+        self.assertTrue(warmer.ready)
+        warmer.run()
+        self.service.clients.warm_up.assert_not_called()
+
+    def test_load_head_queries(self):
+        """Test head queries are deduplicated and capped."""
+        queries = load_head_queries({'head_queries': ['a', 'b', 'a', '', 'c'], 'max_head_queries': 2})
+        self.assertEqual(queries, ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
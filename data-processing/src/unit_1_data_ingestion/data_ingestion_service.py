@@ -4,136 +4,352 @@ Loads CSV files from S3 and enriches product data for search indexing.
 """
 
 import boto3
+import hashlib
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List
 import logging
-from io import StringIO
+import sys
+from io import BytesIO
+from pathlib import Path
+
+# Add parent directory to path (this module is also run as a script)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from unit_1_data_ingestion.fingerprint import add_fingerprints
+from unit_1_data_ingestion.s3_fetch import S3Fetcher, s3_client_config
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
 
 logger = logging.getLogger(__name__)
 
+# Variant columns at the start of aggregated_text (before property texts)
+AGGREGATED_TEXT_COLUMNS = (
+    'variant_name', 'product_name', 'description', 'frontend_category', 'backend_category'
+)
+
+# Read schemas for the S3 CSV exports (file name without .csv). Only these
+# columns are parsed; repeated labels are categorical, ids and prices get
+# fixed numeric dtypes, and columns mapped to None keep pandas' inference.
+#
+# Missing values:
+# - variant.variant_id is the key of every product and must be present.
+# - variant_id in the related tables is float64: blank ids parse as NaN and
+#   those rows join to no variant (int variant_ids match float keys).
+# - product_id and affinity_group_variant_id are nullable Int64 and are
+#   rendered with _as_text: '100' (not '100.0' as when a blank made pandas
+#   infer float) and 'nan' when missing.
+# - sku is read as str, so numeric SKUs stay strings whichever chunk they
+#   are parsed in; a missing sku is NaN.
+CSV_SCHEMAS = {
+    'variant': {
+        'variant_id': 'int64',
+        'product_id': 'Int64',
+        'sku': str,
+        'variant_name': str,
+        'product_name': str,
+        'description': str,
+        'sale_price': 'float64',
+        'original_price': 'float64',
+        'currency': 'category',
+        'lifecycle_status': 'category',
+        'product_type': 'category',
+        'frontend_category': 'category',
+        'backend_category': 'category',
+        'review_count': 'float64',
+        'review_rating': 'float64',
+        'stock_status': 'category',
+        'market': 'category',
+        'url': str,
+        'delivery_time': 'category'
+    },
+    'variant_image': {
+        'variant_id': 'float64',
+        'image_type': 'category',
+        'image_url': str,
+        'image_position': None,
+        'default_image': None
+    },
+    'variant_property': {
+        'variant_id': 'float64',
+        'property_category': 'category',
+        'property_type': 'category',
+        'property_value': str
+    },
+    'variant_option': {
+        'variant_id': 'float64',
+        'option_type': 'category',
+        'option_value': 'category'
+    },
+    'variant_affinity': {
+        'variant_id': 'float64',
+        'affinity_type': 'category',
+        'affinity_group_variant_id': 'Int64'
+    },
+    'variant_file': {
+        'variant_id': 'float64',
+        'file_type': 'category',
+        'file_url': str
+    }
+}
+
+
+def csv_read_options(filename: str) -> Dict[str, Any]:
+    """usecols/dtype arguments for pd.read_csv (empty for files without a schema)."""
+    schema = CSV_SCHEMAS.get(filename.replace('.csv', ''))
+    if not schema:
+        return {}
+    return {
+        # A callable tolerates schema columns missing from the file
+        'usecols': lambda column: column in schema,
+        'dtype': {column: dtype for column, dtype in schema.items() if dtype is not None}
+    }
+
+
+def schema_digest(filename: str) -> str:
+    """Short digest of a file's read schema (part of snapshot cache keys)."""
+    schema = CSV_SCHEMAS.get(filename.replace('.csv', ''))
+    return hashlib.sha256(repr(schema).encode('utf-8')).hexdigest()[:16]
+
+
+def read_csv_chunks(body, filename: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parse a CSV byte stream in chunks with the file's CSV_SCHEMAS options."""
+    with pd.read_csv(body, chunksize=chunk_rows, encoding='utf-8', **csv_read_options(filename)) as reader:
+        yield from reader
+
+
+def concat_chunks(chunks: List[pd.DataFrame], filename: str) -> pd.DataFrame:
+    """Join parsed chunks into one DataFrame, keeping categorical columns categorical."""
+    if len(chunks) == 1:
+        return chunks[0]
+    
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks with different category sets concatenate to object dtype
+    categorical = [column for column, dtype in csv_read_options(filename).get('dtype', {}).items()
+                   if dtype == 'category' and column in df]
+    return df.astype({column: 'category' for column in categorical})
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """
+    str() of every value as an object Series. Missing values become
+    'nan' ('None' for None), including pd.NA in nullable Int64 columns.
+    """
+    text = values.astype(str).astype(object)
+    missing = values.isna()
+    if missing.any():
+        text[missing] = values[missing].astype(object).map(lambda value: 'nan' if value is pd.NA else str(value))
+    return text
+
+
+def _ids_as_text(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """df with a nullable id column replaced by its _as_text rendering."""
+    if column not in df:
+        return df
+    return df.assign(**{column: _as_text(df[column])})
+
 
 class DataIngestionService:
     """Service for loading and enriching product data from S3."""
     
     def __init__(self, config: Dict):
         self.config = config
-        self.s3_client = boto3.client('s3', region_name=config['aws']['region'])
+        self.s3_client = boto3.client('s3', region_name=config['aws']['region'],
+                                      config=s3_client_config(config))
         self.bucket = config['aws']['s3']['bucket']
         self.prefix = config['aws']['s3']['data_prefix']
+        self.fetcher = S3Fetcher(self.s3_client, self.bucket, config)
+        self.snapshots = SnapshotCache.from_config(config)
         
-    def load_csv_from_s3(self, filename: str) -> pd.DataFrame:
-        """Load a CSV file from S3 into a pandas DataFrame."""
+    def iter_csv_chunks_from_s3(self, filename: str, chunk_rows: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream a CSV file from S3 as DataFrame chunks.
+        
+        The S3 body is handed to the CSV parser as a file object, so parsing
+        starts with the first bytes received and the raw object is never
+        held in memory as one string. Known files are read with their
+        CSV_SCHEMAS columns and dtypes.
+        
+        Args:
+            filename: File name under the configured data prefix
+            chunk_rows: Rows per chunk (default: data_ingestion.csv_chunk_rows)
+        
+        Yields:
+            DataFrame chunks in file order
+        """
+        chunk_rows = chunk_rows or self.config.get('data_ingestion', {}).get('csv_chunk_rows', 100000)
+        key = f"{self.prefix}{filename}"
         try:
-            key = f"{self.prefix}{filename}"
-            logger.info(f"Loading {key} from S3 bucket {self.bucket}")
+            logger.info(f"Streaming {key} from S3 bucket {self.bucket}")
             
             response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
-            csv_content = response['Body'].read().decode('utf-8')
-            df = pd.read_csv(StringIO(csv_content))
+            rows = 0
+            for chunk in read_csv_chunks(response['Body'], filename, chunk_rows):
+                rows += len(chunk)
+                yield chunk
             
-            logger.info(f"Loaded {len(df)} rows from {filename}")
-            return df
+            logger.info(f"Loaded {rows} rows from {filename}")
             
         except Exception as e:
             logger.error(f"Error loading {filename} from S3: {str(e)}")
             raise
     
-    def load_all_data(self) -> Dict[str, pd.DataFrame]:
-        """Load all CSV files from S3."""
+    def load_csv_from_s3(self, filename: str) -> pd.DataFrame:
+        """Load a CSV file from S3 into a pandas DataFrame (parsed in chunks)."""
+        return concat_chunks(list(self.iter_csv_chunks_from_s3(filename)), filename)
+    
+    def load_all_data(self, files: List[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Load CSV files from S3 (default: all of aws.s3.files).
+        
+        Files whose ETag matches a local snapshot are loaded from it; the
+        rest are downloaded concurrently by the S3 fetcher and each is
+        parsed in chunks with its CSV_SCHEMAS and snapshotted as soon as
+        its download completes.
+        """
         dataframes = {}
-        files = self.config['aws']['s3']['files']
+        files = files if files is not None else self.config['aws']['s3']['files']
+        chunk_rows = self.config.get('data_ingestion', {}).get('csv_chunk_rows', 100000)
         
-        for filename in files:
-            df = self.load_csv_from_s3(filename)
-            key = filename.replace('.csv', '')
-            dataframes[key] = df
+        keys = [f"{self.prefix}{filename}" for filename in files]
+        source_keys = self._snapshot_source_keys(files, keys)
+        for filename, key in zip(files, keys):
+            if key in source_keys:
+                df = self.snapshots.load(key, source_keys[key])
+                if df is not None:
+                    dataframes[filename.replace('.csv', '')] = df
         
+        filenames = {key: filename for filename, key in zip(files, keys)
+                     if filename.replace('.csv', '') not in dataframes}
+        if filenames:
+            logger.info(f"Fetching {len(filenames)} files from S3 bucket {self.bucket}")
+            try:
+                # Each file is parsed as soon as its download completes, while the
+                # others are still in flight; only unparsed bodies are held
+                for key, body in self.fetcher.iter_fetch(list(filenames)):
+                    filename = filenames[key]
+                    df = concat_chunks(list(read_csv_chunks(BytesIO(body), filename, chunk_rows)), filename)
+                    logger.info(f"Loaded {len(df)} rows from {filename}")
+                    dataframes[filename.replace('.csv', '')] = df
+                    if key in source_keys:
+                        self.snapshots.store(key, source_keys[key], df, source_bytes=len(body))
+            except Exception as e:
+                logger.error(f"Error loading data files from S3: {str(e)}")
+                raise
+        
+        self.snapshots.log_summary()
         logger.info(f"Loaded {len(dataframes)} data files")
-        return dataframes
-
+        # Keep the order of files
+        return {filename.replace('.csv', ''): dataframes[filename.replace('.csv', '')] for filename in files}
+    
+    def _snapshot_source_keys(self, files: List[str], keys: List[str]) -> Dict[str, str]:
+        """
+        Snapshot cache keys (ETag + read schema) for the given objects,
+        from one paginated listing of the data prefix.
+        """
+        if not self.snapshots.enabled:
+            return {}
+        try:
+            listing = {obj['Key']: obj for obj in self.fetcher.list_objects(self.prefix)}
+        except Exception as e:
+            logger.warning(f"Could not list s3://{self.bucket}/{self.prefix}, skipping snapshots: {str(e)}")
+            return {}
+        
+        source_keys = {}
+        for filename, key in zip(files, keys):
+            etag = listing.get(key, {}).get('ETag', '').strip('"')
+            if etag:
+                source_keys[key] = f"etag:{etag}|{schema_digest(filename)}"
+        return source_keys
+    
+    def iter_enriched_batches(self, batch_rows: int = None) -> Iterator[List[Dict]]:
+        """
+        Stream enriched products in batches for the embedding stage.
+        
+        The related tables are loaded and grouped by variant_id once; the
+        variant table is then parsed from S3 batch by batch and each batch
+        is enriched and yielded. The related tables stay in their typed
+        frames; only one batch of variant rows and enriched products is
+        built at a time.
+        
+        Args:
+            batch_rows: Variants per batch (default: data_ingestion.enriched_batch_rows)
+        
+        Yields:
+            Lists of enriched product dictionaries
+        """
+        batch_rows = batch_rows or self.config.get('data_ingestion', {}).get('enriched_batch_rows', 5000)
+        
+        related = self.load_all_data(
+            [filename for filename in self.config['aws']['s3']['files'] if filename != 'variant.csv']
+        )
+        # Row positions per variant_id; enriched dicts are only built per batch
+        positions = {
+            name: df.groupby('variant_id', sort=False).indices if not df.empty else {}
+            for name, df in related.items()
+        }
+        
+        total = 0
+        for variants_df in self.iter_csv_chunks_from_s3('variant.csv', chunk_rows=batch_rows):
+            keys = variants_df['variant_id'].unique()
+            batch_related = {
+                name: self._rows_for_variants(df, positions[name], keys)
+                for name, df in related.items()
+            }
+            batch = self._enrich_variants(variants_df, batch_related)
+            total += len(batch)
+            yield batch
+        
+        logger.info(f"Enriched {total} products")
     
     def enrich_variant_data(self, dataframes: Dict[str, pd.DataFrame]) -> List[Dict]:
         """
         Enrich variant data by joining with related tables.
         Returns a list of enriched product dictionaries.
+        
+        Each related table is grouped by variant_id once (hash join), so
+        the cost is linear in the total number of rows instead of one
+        full-table scan per variant and table.
         """
-        variants_df = dataframes['variant']
-        images_df = dataframes['variant_image']
-        properties_df = dataframes['variant_property']
-        options_df = dataframes['variant_option']
-        affinity_df = dataframes['variant_affinity']
-        files_df = dataframes['variant_file']
+        enriched_products = self._enrich_variants(dataframes['variant'], dataframes)
+        
+        logger.info(f"Enriched {len(enriched_products)} products")
+        return enriched_products
+    
+    def _enrich_variants(self, variants_df: pd.DataFrame, related: Dict[str, pd.DataFrame]) -> List[Dict]:
+        """Build enriched product dictionaries for a frame of variants and their related rows."""
+        properties_df = related['variant_property']
+        # Nullable ids are rendered column-wise so missing ones read 'nan', not '<NA>'
+        variants_df = _ids_as_text(variants_df, 'product_id')
+        affinity_df = _ids_as_text(related['variant_affinity'], 'affinity_group_variant_id')
+        
+        # Nested lists: one groupby pass per related table
+        images = self._group_rows(related['variant_image'], lambda img: {
+            'type': img.get('image_type', ''),
+            'url': img.get('image_url', ''),
+            'position': img.get('image_position', 0),
+            'is_default': img.get('default_image', False)
+        })
+        options = self._group_rows(related['variant_option'], lambda opt: {
+            'type': opt.get('option_type', ''),
+            'value': opt.get('option_value', '')
+        })
+        affinity = self._group_rows(affinity_df, lambda aff: {
+            'type': aff.get('affinity_type', ''),
+            'related_variant_id': str(aff.get('affinity_group_variant_id', ''))
+        })
+        files = self._group_rows(related['variant_file'], lambda f: {
+            'type': f.get('file_type', ''),
+            'url': f.get('file_url', '')
+        })
+        properties = self._group_properties(properties_df)
+        
+        aggregated_texts = self._aggregated_texts(variants_df, self._property_texts(properties_df))
         
         enriched_products = []
         
-        for _, variant in variants_df.iterrows():
+        for variant, aggregated_text in zip(variants_df.to_dict('records'), aggregated_texts):
             variant_id = str(variant['variant_id'])
-            
-            # Get images
-            variant_images = images_df[images_df['variant_id'] == int(variant_id)]
-            images = []
-            for _, img in variant_images.iterrows():
-                images.append({
-                    'type': img.get('image_type', ''),
-                    'url': img.get('image_url', ''),
-                    'position': img.get('image_position', 0),
-                    'is_default': img.get('default_image', False)
-                })
-            
-            # Get properties
-            variant_props = properties_df[properties_df['variant_id'] == int(variant_id)]
-            properties = {}
-            property_texts = []
-            for _, prop in variant_props.iterrows():
-                cat = prop.get('property_category', '')
-                ptype = prop.get('property_type', '')
-                pval = prop.get('property_value', '')
-                
-                if cat not in properties:
-                    properties[cat] = {}
-                properties[cat][ptype] = pval
-                
-                # Collect for aggregated text
-                if pval:
-                    property_texts.append(f"{ptype}: {pval}")
-            
-            # Get options
-            variant_opts = options_df[options_df['variant_id'] == int(variant_id)]
-            options = []
-            for _, opt in variant_opts.iterrows():
-                options.append({
-                    'type': opt.get('option_type', ''),
-                    'value': opt.get('option_value', '')
-                })
-            
-            # Get affinity (related products)
-            variant_aff = affinity_df[affinity_df['variant_id'] == int(variant_id)]
-            affinity = []
-            for _, aff in variant_aff.iterrows():
-                affinity.append({
-                    'type': aff.get('affinity_type', ''),
-                    'related_variant_id': str(aff.get('affinity_group_variant_id', ''))
-                })
-            
-            # Get files
-            variant_files = files_df[files_df['variant_id'] == int(variant_id)]
-            files = []
-            for _, f in variant_files.iterrows():
-                files.append({
-                    'type': f.get('file_type', ''),
-                    'url': f.get('file_url', '')
-                })
-            
-            # Create aggregated searchable text
-            aggregated_text_parts = [
-                variant.get('variant_name', ''),
-                variant.get('product_name', ''),
-                variant.get('description', ''),
-                variant.get('frontend_category', ''),
-                variant.get('backend_category', ''),
-            ]
-            aggregated_text_parts.extend(property_texts)
-            aggregated_text = ' '.join([str(p) for p in aggregated_text_parts if pd.notna(p)])
+            key = variant['variant_id']
             
             # Build enriched product
             enriched_product = {
@@ -154,11 +370,11 @@ class DataIngestionService:
                 'review_count': int(variant.get('review_count', 0) or 0),
                 'review_rating': float(variant.get('review_rating', 0) or 0),
                 'stock_status': variant.get('stock_status', ''),
-                'images': images,
-                'properties': properties,
-                'options': options,
-                'affinity': affinity,
-                'files': files,
+                'images': images.get(key, []),
+                'properties': properties.get(key, {}),
+                'options': options.get(key, []),
+                'affinity': affinity.get(key, []),
+                'files': files.get(key, []),
                 'metadata': {
                     'market': variant.get('market', ''),
                     'url': variant.get('url', ''),
@@ -168,8 +384,87 @@ class DataIngestionService:
             
             enriched_products.append(enriched_product)
         
-        logger.info(f"Enriched {len(enriched_products)} products")
-        return enriched_products
+        # Change detection for incremental indexing
+        return add_fingerprints(enriched_products)
+    
+    @staticmethod
+    def _group_rows(df: pd.DataFrame, build: Callable[[Dict], Dict]) -> Dict[Any, List[Dict]]:
+        """
+        Group a related table by variant_id, building one dict per row.
+        
+        Rows keep their table order within a variant. Keys are the raw
+        variant_id values; lookups with an int id match int or float keys.
+        """
+        if df.empty:
+            return {}
+        rows = df.to_dict('records')
+        return {
+            key: [build(rows[i]) for i in positions]
+            for key, positions in df.groupby('variant_id', sort=False).indices.items()
+        }
+    
+    @staticmethod
+    def _rows_for_variants(df: pd.DataFrame, positions: Dict[Any, np.ndarray], keys) -> pd.DataFrame:
+        """Rows of a related table belonging to the given variant_ids, in table order."""
+        if df.empty:
+            return df
+        selected = [positions[key] for key in keys if key in positions]
+        if not selected:
+            return df.iloc[:0]
+        return df.take(np.sort(np.concatenate(selected)))
+    
+    @staticmethod
+    def _group_properties(properties_df: pd.DataFrame) -> Dict[Any, Dict[str, Dict]]:
+        """Group properties by variant_id into {category: {type: value}}."""
+        if properties_df.empty:
+            return {}
+        rows = properties_df.to_dict('records')
+        grouped = {}
+        for key, positions in properties_df.groupby('variant_id', sort=False).indices.items():
+            properties = {}
+            for i in positions:
+                prop = rows[i]
+                cat = prop.get('property_category', '')
+                properties.setdefault(cat, {})[prop.get('property_type', '')] = prop.get('property_value', '')
+            grouped[key] = properties
+        return grouped
+    
+    @staticmethod
+    def _property_texts(properties_df: pd.DataFrame) -> pd.Series:
+        """
+        Property part of aggregated_text per variant_id: " type: value"
+        for each property with a value, in table order.
+        """
+        if properties_df.empty:
+            return pd.Series(dtype=object)
+        ptype = properties_df.get('property_type', pd.Series('', index=properties_df.index))
+        pval = properties_df.get('property_value', pd.Series('', index=properties_df.index))
+        # Python truthiness: empty strings and None are skipped, NaN is not
+        with_value = pval.astype(object).astype(bool)
+        property_text = (' ' + _as_text(ptype) + ': ' + _as_text(pval))[with_value]
+        return property_text.groupby(properties_df['variant_id'][with_value], sort=False).agg(''.join)
+    
+    @staticmethod
+    def _aggregated_texts(variants_df: pd.DataFrame, property_texts: pd.Series) -> List[str]:
+        """
+        Searchable text per variant, built with vectorized string operations.
+        
+        Name, product name, description and categories (missing values
+        skipped) followed by the variant's property texts, space separated.
+        """
+        # ' ' + part for each present part; the leading space is dropped at the end
+        text = pd.Series('', index=variants_df.index, dtype=object)
+        for column in AGGREGATED_TEXT_COLUMNS:
+            if column not in variants_df:
+                text = text + ' '
+                continue
+            values = variants_df[column]
+            text = text + (' ' + _as_text(values)).where(values.notna(), '')
+        
+        if not property_texts.empty:
+            text = text + variants_df['variant_id'].map(property_texts).fillna('')
+        
+        return text.str[1:].tolist()
     
     def ingest_data(self) -> List[Dict]:
         """
@@ -6,18 +6,40 @@ and saves embeddings locally.
 
 import boto3
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Union
 import logging
 import json
 import os
+import re
 from pathlib import Path
+import sys
 from dotenv import load_dotenv
 
+# Add parent directory to path (this module is also run as a script)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from unit_1_data_ingestion.data_ingestion_service import _as_text
+from unit_1_data_ingestion.snapshot_cache import SnapshotCache
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# variant.csv columns joined (in order) into aggregated_text by ingest_data_simple
+SIMPLE_TEXT_COLUMNS = [
+    'variant_name', 'product_name', 'description', 'frontend_category', 'frontend_subcategory',
+    'collection', 'color_tone', 'material', 'other_properties'
+]
+
+# Image CSVs (variant_id_image_id, filename, image_base64, variant_id) under data_dir
+IMAGE_CSV_PATTERN = 'image_base64/**/*batch_*.csv'
+
+
+def _natural_key(path: Path) -> List:
+    """Sort key that orders batch_2 before batch_10."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', str(path))]
+
 
 class DataIngestionServiceLocal:
     """Service for loading product data from local files and generating embeddings."""
@@ -35,16 +57,31 @@ class DataIngestionServiceLocal:
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
         )
         self.text_model_id = config['aws']['bedrock']['text_model_id']
+        self.snapshots = SnapshotCache.from_config(config)
         
     def load_csv_from_local(self, filename: str) -> pd.DataFrame:
-        """Load a CSV file from local filesystem into a pandas DataFrame."""
+        """
+        Load a CSV file from local filesystem into a pandas DataFrame.
+        Unchanged files (same mtime/size, or same content hash) are loaded
+        from their snapshot instead of being parsed again.
+        """
         try:
             filepath = self.data_dir / filename
             logger.info(f"Loading {filepath}")
             
+            source = None
+            if self.snapshots.enabled:
+                source = self.snapshots.local_source_key(filepath, schema_digest='inferred')
+                df = self.snapshots.load(str(filepath), source['source_key'])
+                if df is not None:
+                    return df
+            
             df = pd.read_csv(filepath)
             
             logger.info(f"Loaded {len(df)} rows from {filename}")
+            if source:
+                self.snapshots.store(str(filepath), source['source_key'], df,
+                                     source_bytes=source['source_bytes'], extra=source)
             return df
             
         except Exception as e:
@@ -100,76 +137,95 @@ class DataIngestionServiceLocal:
         """
         Simplified ingestion from local variant.csv file.
         Returns minimal structure with only fields from CSV.
+        
+        Built column-wise: missing values are replaced with typed defaults,
+        aggregated_text is concatenated with vectorized string operations and
+        the records are zipped from per-column lists in one pass (like
+        to_dict('records'), without boxing every value separately).
         """
         logger.info("Starting simple data ingestion from local files...")
         
         # Load only variant.csv
         variant_df = self.load_csv_from_local('variant.csv')
+        index = variant_df.index
+        
+        def column(key, default=''):
+            # Values with NaN (or the whole column, if absent) replaced by default
+            if key not in variant_df:
+                return pd.Series(default, index=index, dtype=object)
+            values = variant_df[key]
+            return values.astype(object).where(values.notna(), default)
+        
+        def number(key):
+            # float(value or 0) for every row
+            return column(key, 0).astype(float)
+        
+        def text(key):
+            # str(value), '' where missing
+            if key not in variant_df:
+                return pd.Series('', index=index, dtype=object)
+            values = variant_df[key]
+            return _as_text(values).where(values.notna(), '')
+        
+        # Create aggregated searchable text from all available fields:
+        # ' ' + str(value) for every truthy, non-blank value; the leading space is dropped
+        aggregated_text = pd.Series('', index=index, dtype=object)
+        for key in SIMPLE_TEXT_COLUMNS:
+            if key not in variant_df:
+                continue
+            values = variant_df[key]
+            # Falsy/blank test once per distinct value rather than once per row
+            skipped = [value for value in values.dropna().unique() if not value or not str(value).strip()]
+            present = values.notna() & ~values.isin(skipped)
+            aggregated_text = aggregated_text + (' ' + _as_text(values)).where(present, '')
         
-        enriched_products = []
+        # str() of every id, as in the row-by-row version (a missing id becomes 'nan')
+        variant_ids = _as_text(variant_df['variant_id']) if 'variant_id' in variant_df else text('variant_id')
         
-        for _, variant in variant_df.iterrows():
-            variant_id = str(variant.get('variant_id', ''))
+        # Build minimal product records - ONLY fields from CSV
+        # All NaN values are replaced with appropriate defaults
+        columns = {
+            # Core IDs
+            'variant_id': variant_ids,
+            'product_id': text('product_id'),
             
-            # Helper function to safely get values, replacing NaN with default
-            def safe_get(key, default=''):
-                value = variant.get(key, default)
-                return value if pd.notna(value) else default
+            # Names and description
+            'variant_name': column('variant_name'),
+            'product_name': column('product_name'),
+            'description': column('description'),
+            'aggregated_text': aggregated_text.str[1:],
             
-            # Create aggregated searchable text from all available fields
-            aggregated_text_parts = [
-                safe_get('variant_name'),
-                safe_get('product_name'),
-                safe_get('description'),
-                safe_get('frontend_category'),
-                safe_get('frontend_subcategory'),
-                safe_get('collection'),
-                safe_get('color_tone'),
-                safe_get('material'),
-                safe_get('other_properties'),
-            ]
-            aggregated_text = ' '.join([str(p) for p in aggregated_text_parts if p and str(p).strip()])
+            # Pricing
+            'price': number('sale_price'),
+            'currency': column('currency', 'SGD'),
             
-            # Build minimal product dict - ONLY fields from CSV
-            # All NaN values are replaced with appropriate defaults
-            enriched_product = {
-                # Core IDs
-                'variant_id': variant_id,
-                'product_id': str(safe_get('product_id')),
-                
-                # Names and description
-                'variant_name': safe_get('variant_name'),
-                'product_name': safe_get('product_name'),
-                'description': safe_get('description'),
-                'aggregated_text': aggregated_text,
-                
-                # Pricing
-                'price': float(safe_get('sale_price', 0) or 0),
-                'currency': safe_get('currency', 'SGD'),
-                
-                # Categories
-                'product_type': safe_get('product_type'),
-                'frontend_category': safe_get('frontend_category'),
-                'frontend_subcategory': safe_get('frontend_subcategory'),
-                'backend_category': safe_get('frontend_category'),
-                
-                # Reviews (handle NaN values)
-                'review_count': int(safe_get('review_count', 0) or 0),
-                'review_rating': float(safe_get('review_rating', 0) or 0),
-                
-                # Additional CSV fields
-                'collection': safe_get('collection'),
-                'color_tone': safe_get('color_tone'),
-                'material': safe_get('material'),
-                'other_properties': safe_get('other_properties'),
-                'variant_url': safe_get('variant_url'),
-                
-                # Minimal metadata
-                'stock_status': 'in_stock',
-                'lifecycle_status': 'active',
-            }
+            # Categories
+            'product_type': column('product_type'),
+            'frontend_category': column('frontend_category'),
+            'frontend_subcategory': column('frontend_subcategory'),
+            'backend_category': column('frontend_category'),
+            
+            # Reviews (handle NaN values)
+            'review_count': number('review_count').astype(int),
+            'review_rating': number('review_rating'),
             
-            enriched_products.append(enriched_product)
+            # Additional CSV fields
+            'collection': column('collection'),
+            'color_tone': column('color_tone'),
+            'material': column('material'),
+            'other_properties': column('other_properties'),
+            'variant_url': column('variant_url'),
+            
+            # Minimal metadata
+            'stock_status': pd.Series('in_stock', index=index, dtype=object),
+            'lifecycle_status': pd.Series('active', index=index, dtype=object),
+        }
+        
+        # tolist() yields Python scalars (int/float/str), as the JSON output needs
+        keys = list(columns)
+        enriched_products = [
+            dict(zip(keys, row)) for row in zip(*(values.tolist() for values in columns.values()))
+        ]
         
         logger.info(f"Simple data ingestion complete: {len(enriched_products)} products ready")
         return enriched_products
@@ -198,7 +254,10 @@ class DataIngestionServiceLocal:
         return products
     
     def load_image_data(self, image_csv_path: str = 'image_base64/batch_1.csv') -> pd.DataFrame:
-        """Load image base64 data from CSV."""
+        """
+        Load image base64 data from CSV.
+        Reads the whole file; use iter_image_rows for embedding jobs.
+        """
         try:
             filepath = self.data_dir / image_csv_path
             logger.info(f"Loading image data from {filepath}")
@@ -211,13 +270,55 @@ class DataIngestionServiceLocal:
             logger.error(f"Error loading image data: {str(e)}")
             raise
     
-    def generate_embeddings_for_images_batch(self, image_df: pd.DataFrame, batch_size: int = 100, 
+    def image_csv_paths(self, pattern: str = IMAGE_CSV_PATTERN) -> List[Path]:
+        """Image CSVs under data_dir matching a glob pattern, in natural order."""
+        paths = sorted((path for path in self.data_dir.glob(pattern) if path.is_file()), key=_natural_key)
+        if not paths:
+            raise FileNotFoundError(f"No image CSVs match {self.data_dir / pattern}")
+        return paths
+    
+    def iter_image_rows(self, pattern: str = IMAGE_CSV_PATTERN, chunk_rows: int = None) -> Iterator[Dict]:
+        """
+        Stream image rows from every CSV matching pattern.
+        
+        Files are parsed chunk_rows rows at a time (data_ingestion.image_chunk_rows),
+        so only one chunk of base64 payloads is in memory however many images
+        there are. The base64 text is not decoded here: it is passed as is to
+        Bedrock when the row is embedded.
+        
+        Args:
+            pattern: Glob relative to data_dir (e.g. 'image_base64/batch_*.csv')
+            chunk_rows: Rows parsed per chunk
+        
+        Yields:
+            One dict per image row
+        """
+        chunk_rows = chunk_rows or self.config.get('data_ingestion', {}).get('image_chunk_rows', 50)
+        
+        for path in self.image_csv_paths(pattern):
+            logger.info(f"Streaming image data from {path}")
+            rows = 0
+            try:
+                for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype={'variant_id': str}):
+                    rows += len(chunk)
+                    yield from chunk.to_dict('records')
+            except Exception as e:
+                logger.error(f"Error reading image data from {path}: {str(e)}")
+                raise
+            logger.info(f"Read {rows} images from {path.name}")
+    
+    def generate_embeddings_for_images_batch(self, images: Union[pd.DataFrame, Iterable[Dict]],
+                                             batch_size: int = 100,
                                              output_dir: str = 'image_embeddings') -> None:
         """
         Generate embeddings for images in batches and save incrementally.
         
+        Rows are consumed one at a time, so with iter_image_rows the job runs
+        in constant memory: only the embeddings of the current batch are kept.
+        
         Args:
-            image_df: DataFrame with columns: variant_id_image_id, filename, image_base64, variant_id
+            images: Rows with keys variant_id_image_id, filename, image_base64,
+                variant_id (iter_image_rows output, or a DataFrame)
             batch_size: Number of images to process before saving
             output_dir: Directory to save batch files (relative to data_dir)
         """
@@ -226,64 +327,70 @@ class DataIngestionServiceLocal:
         output_path.mkdir(parents=True, exist_ok=True)
         logger.info(f"Output directory: {output_path}")
         
-        total_images = len(image_df)
-        logger.info(f"Processing {total_images} images in batches of {batch_size}...")
+        total_images = len(images) if isinstance(images, pd.DataFrame) else None
+        if total_images is not None:
+            images = images.to_dict('records')
+        count = total_images if total_images is not None else 'streamed'
+        logger.info(f"Processing {count} images in batches of {batch_size}...")
         
         batch_num = 1
+        processed = 0
+        image_embeddings = []
         
-        for start_idx in range(0, total_images, batch_size):
-            end_idx = min(start_idx + batch_size, total_images)
-            batch_df = image_df.iloc[start_idx:end_idx]
-            
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processing batch {batch_num}: images {start_idx+1} to {end_idx}")
-            logger.info(f"{'='*60}")
-            
-            image_embeddings = []
-            
-            for idx, row in batch_df.iterrows():
-                try:
-                    # Generate embedding for image
-                    embedding = self.generate_image_embedding(row['image_base64'])
-                    
-                    image_data = {
-                        'image_id': row['variant_id_image_id'],
-                        'variant_id': str(row['variant_id']),
-                        'filename': row['filename'],
-                        'image_embedding': embedding
-                    }
-                    
-                    image_embeddings.append(image_data)
+        for row in images:
+            processed += 1
+            try:
+                # Generate embedding for image
+                embedding = self.generate_image_embedding(row['image_base64'])
+                
+                image_embeddings.append({
+                    'image_id': row['variant_id_image_id'],
+                    'variant_id': str(row['variant_id']),
+                    'filename': row['filename'],
+                    'image_embedding': embedding
+                })
+                
+                # Log progress within batch
+                batch_progress = len(image_embeddings)
+                if batch_progress % 10 == 0:
+                    logger.info(f"  Batch progress: {batch_progress}/{batch_size} images")
                     
-                    # Log progress within batch
-                    batch_progress = len(image_embeddings)
-                    if batch_progress % 10 == 0:
-                        logger.info(f"  Batch progress: {batch_progress}/{len(batch_df)} images")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to generate embedding for image {row['variant_id_image_id']}: {e}")
-                    # Skip failed images
-            
-            # Save batch
-            batch_filename = f"image_embeddings_batch_{batch_num:03d}.json"
-            batch_filepath = output_path / batch_filename
-            
-            with open(batch_filepath, 'w') as f:
-                json.dump(image_embeddings, f, indent=2)
-            
-            logger.info(f"✓ Saved batch {batch_num} ({len(image_embeddings)} images) to {batch_filename}")
-            logger.info(f"  Overall progress: {end_idx}/{total_images} images ({end_idx*100//total_images}%)")
+            except Exception as e:
+                logger.error(f"Failed to generate embedding for image {row['variant_id_image_id']}: {e}")
+                # Skip failed images
             
+            if processed % batch_size == 0:
+                self._save_image_batch(output_path, batch_num, image_embeddings, processed, total_images)
+                batch_num += 1
+                image_embeddings = []
+        
+        if processed % batch_size:
+            self._save_image_batch(output_path, batch_num, image_embeddings, processed, total_images)
             batch_num += 1
         
         logger.info(f"\n{'='*60}")
         logger.info(f"ALL BATCHES COMPLETE")
         logger.info(f"{'='*60}")
-        logger.info(f"Total images processed: {total_images}")
+        logger.info(f"Total images processed: {processed}")
         logger.info(f"Total batches saved: {batch_num - 1}")
         logger.info(f"Output location: {output_path}")
         logger.info(f"{'='*60}")
     
+    def _save_image_batch(self, output_path: Path, batch_num: int, image_embeddings: List[Dict],
+                          processed: int, total_images: int = None):
+        """Write one image_embeddings_batch_NNN.json file."""
+        batch_filename = f"image_embeddings_batch_{batch_num:03d}.json"
+        batch_filepath = output_path / batch_filename
+        
+        with open(batch_filepath, 'w') as f:
+            json.dump(image_embeddings, f, indent=2)
+        
+        logger.info(f"✓ Saved batch {batch_num} ({len(image_embeddings)} images) to {batch_filename}")
+        if total_images:
+            logger.info(f"  Overall progress: {processed}/{total_images} images ({processed*100//total_images}%)")
+        else:
+            logger.info(f"  Overall progress: {processed} images")
+    
     def save_products_with_embeddings(self, products: List[Dict], output_filename: str = 'products_with_embeddings.json'):
         """Save products with embeddings to local JSON file."""
         output_path = self.data_dir / output_filename
@@ -384,12 +491,13 @@ def main():
         print("GENERATING IMAGE EMBEDDINGS FOR ALL IMAGES")
         print("=" * 80)
         
-        # Load image data
-        image_df = service.load_image_data()
+        # Stream image rows from every matching CSV (optional glob as second argument)
+        pattern = sys.argv[2] if len(sys.argv) > 2 else IMAGE_CSV_PATTERN
+        image_rows = service.iter_image_rows(pattern)
         
         # Process in batches and save incrementally
         batch_size = 100  # Process 100 images per batch
-        service.generate_embeddings_for_images_batch(image_df, batch_size=batch_size)
+        service.generate_embeddings_for_images_batch(image_rows, batch_size=batch_size)
         
         return
     
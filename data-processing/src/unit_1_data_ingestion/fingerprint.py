@@ -0,0 +1,48 @@
+"""
+Unit 1: Product Fingerprints
+Content fingerprints carried by every enriched product so the pipeline
+can tell which variants changed since the last indexing run.
+
+text_fingerprint covers the text that is embedded (aggregated_text):
+when it changes the product must be re-embedded. content_fingerprint
+covers every indexed field except the embedding: when only it changes
+the indexed document is updated in place and the vector is kept.
+"""
+
+import hashlib
+import json
+from typing import Dict, List
+
+# Product fields holding the fingerprints themselves
+TEXT_FINGERPRINT_FIELD = 'text_fingerprint'
+CONTENT_FINGERPRINT_FIELD = 'content_fingerprint'
+
+# Text sent to the embedding model
+EMBEDDED_TEXT_FIELD = 'aggregated_text'
+
+# Not part of the content fingerprint
+EXCLUDED_FIELDS = frozenset({'text_embedding', TEXT_FINGERPRINT_FIELD, CONTENT_FINGERPRINT_FIELD})
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def text_fingerprint(product: Dict) -> str:
+    """Fingerprint of the embedded text."""
+    return _digest(str(product.get(EMBEDDED_TEXT_FIELD, '')).encode('utf-8'))
+
+
+def content_fingerprint(product: Dict) -> str:
+    """Fingerprint of all indexed fields (canonical JSON, embedding excluded)."""
+    fields = {key: value for key, value in product.items() if key not in EXCLUDED_FIELDS}
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+    return _digest(canonical.encode('utf-8'))
+
+
+def add_fingerprints(products: List[Dict]) -> List[Dict]:
+    """Set text_fingerprint and content_fingerprint on each product (in place)."""
+    for product in products:
+        product[TEXT_FINGERPRINT_FIELD] = text_fingerprint(product)
+        product[CONTENT_FINGERPRINT_FIELD] = content_fingerprint(product)
+    return products
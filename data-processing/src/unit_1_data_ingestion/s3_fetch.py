@@ -0,0 +1,261 @@
+"""
+Unit 1: Concurrent S3 Fetch
+Downloads many S3 objects with bounded parallelism so ingestion time is
+set by bandwidth rather than one round trip per file.
+
+Objects larger than one part are split into ranged GETs that run
+concurrently with everything else. When the size is not known from a
+listing, the first request asks for the first part only; its
+Content-Range reveals the size and the remaining parts are scheduled
+straight away, so no HEAD request is needed. Every ranged part after
+the first is sent with If-Match on the object's ETag (from the listing
+or the first part), so an object overwritten mid-download fails with
+412 instead of being stitched together from two versions. Objects are
+handed out as soon as their last part arrives. Listings are fully
+paginated. Every object's bytes, parts and wall time are recorded.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_PART_SIZE_MB = 8
+
+# "bytes 0-8388607/52428800"
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+def fetch_config(config: Dict) -> Dict:
+    """The aws.s3.fetch section with defaults applied."""
+    fetch = config.get('aws', {}).get('s3', {}).get('fetch', {})
+    return {
+        'max_concurrency': fetch.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+        'part_size_mb': fetch.get('part_size_mb', DEFAULT_PART_SIZE_MB)
+    }
+
+
+def s3_client_config(config: Dict) -> BotoConfig:
+    """botocore config for an S3 client used by S3Fetcher (one pooled connection per worker)."""
+    return BotoConfig(
+        max_pool_connections=fetch_config(config)['max_concurrency'],
+        retries={'max_attempts': 5, 'mode': 'standard'}
+    )
+
+
+class _Download:
+    """Parts and timing of one object being fetched (updated by the coordinating thread)."""
+
+    def __init__(self, key: str, size: Optional[int], etag: Optional[str]):
+        self.key = key
+        self.size = size
+        self.etag = etag
+        # Number of parts once they have all been scheduled
+        self.expected: Optional[int] = None
+        self.parts: Dict[int, bytes] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def record(self, offset: int, data: bytes, started: float, finished: float):
+        self.parts[offset] = data
+        self.started = started if self.started is None else min(self.started, started)
+        self.finished = finished if self.finished is None else max(self.finished, finished)
+
+    @property
+    def complete(self) -> bool:
+        return self.expected is not None and len(self.parts) == self.expected
+
+    def body(self) -> bytes:
+        if len(self.parts) == 1:
+            return next(iter(self.parts.values()))
+        return b''.join(self.parts[offset] for offset in sorted(self.parts))
+
+
+class S3Fetcher:
+    """
+    Concurrent downloads from one S3 bucket.
+
+    Configured by aws.s3.fetch in config.yaml:
+        max_concurrency: GET requests in flight (also the client pool size)
+        part_size_mb: ranged GET size for large objects
+
+    timings holds one entry per fetched object:
+        {'key', 'bytes', 'parts', 'ms', 'mib_per_s'}
+    """
+
+    def __init__(self, s3_client, bucket: str, config: Dict):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        settings = fetch_config(config)
+        self.max_concurrency = max(1, settings['max_concurrency'])
+        self.part_size = max(1, int(settings['part_size_mb'] * 1024 * 1024))
+        self.timings: List[Dict] = []
+        self.lock = threading.Lock()
+
+    def list_objects(self, prefix: str) -> List[Dict]:
+        """
+        All objects under a prefix (every page of list_objects_v2).
+
+        Returns:
+            Listing entries with at least Key and Size
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects.extend(page.get('Contents', []))
+        logger.info(f"Listed {len(objects)} objects under s3://{self.bucket}/{prefix}")
+        return objects
+
+    def fetch(self, key: str, size: Optional[int] = None) -> bytes:
+        """Fetch one object (ranged GETs in parallel when it is large)."""
+        return self.fetch_many([key], sizes={key: size} if size is not None else None)[key]
+
+    def fetch_many(self, keys: Iterable[str], sizes: Optional[Dict[str, int]] = None,
+                   etags: Optional[Dict[str, str]] = None) -> Dict[str, bytes]:
+        """
+        Fetch objects concurrently.
+
+        Args:
+            keys: Object keys
+            sizes: Known object sizes (e.g. from list_objects); unknown
+                sizes are discovered from the first ranged GET
+            etags: Known object ETags (e.g. from list_objects)
+
+        Returns:
+            Object bodies by key, in the order of keys
+        """
+        keys = list(dict.fromkeys(keys))
+        bodies = dict(self.iter_fetch(keys, sizes=sizes, etags=etags))
+        return {key: bodies[key] for key in keys}
+
+    def iter_fetch(self, keys: Iterable[str], sizes: Optional[Dict[str, int]] = None,
+                   etags: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Fetch objects concurrently, yielding each one as soon as it is complete.
+
+        Downloads continue in the background while the caller handles a
+        yielded body, and a body is released by the fetcher once yielded.
+        Closing the iterator early cancels the remaining requests.
+
+        Args:
+            keys: Object keys
+            sizes: Known object sizes (e.g. from list_objects); unknown
+                sizes are discovered from the first ranged GET
+            etags: Known object ETags (e.g. from list_objects); without
+                one, a multi-part object's first part is fetched before the
+                others so they can be pinned to its ETag
+
+        Yields:
+            (key, body) in order of completion
+        """
+        sizes = sizes or {}
+        etags = etags or {}
+        downloads = {key: _Download(key, sizes.get(key), etags.get(key)) for key in keys}
+        if not downloads:
+            return
+
+        start = time.perf_counter()
+        fetched = 0
+        total_bytes = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='s3-fetch')
+        try:
+            pending = set()
+            for download in downloads.values():
+                if download.size is None or (download.etag is None and download.size > self.part_size):
+                    # First part doubles as the size probe and supplies the ETag
+                    pending.add(executor.submit(self._get, download, 0, self.part_size - 1))
+                else:
+                    ranges = self._ranges(download.size, 0)
+                    download.expected = len(ranges)
+                    pending.update(executor.submit(self._get, download, first, last) for first, last in ranges)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                completed = []
+                for future in done:
+                    download, offset, data, started, finished, total, etag = future.result()
+                    download.record(offset, data, started, finished)
+                    if download.expected is None:
+                        download.size = total
+                        download.etag = download.etag or etag
+                        ranges = self._ranges(total, self.part_size)
+                        download.expected = 1 + len(ranges)
+                        pending.update(executor.submit(self._get, download, first, last)
+                                       for first, last in ranges)
+                    if download.complete:
+                        completed.append(download)
+
+                for download in completed:
+                    body = download.body()
+                    self._record_timing(download, len(body))
+                    download.parts.clear()
+                    fetched += 1
+                    total_bytes += len(body)
+                    yield download.key, body
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✓ Fetched {fetched} objects ({total_bytes / 2**20:.1f} MiB) "
+                    f"in {elapsed * 1000:.0f}ms ({total_bytes / 2**20 / max(elapsed, 1e-9):.1f} MiB/s)")
+
+    def _ranges(self, size: int, offset: int) -> List[tuple]:
+        """Inclusive byte ranges of part_size covering [offset, size)."""
+        if offset == 0 and size <= self.part_size:
+            return [(None, None)]
+        return [(first, min(first + self.part_size, size) - 1)
+                for first in range(offset, size, self.part_size)]
+
+    def _get(self, download: _Download, first: Optional[int], last: Optional[int]) -> tuple:
+        """
+        GET one part (the whole object when first is None).
+
+        Returns:
+            (download, offset, data, started, finished, object size, ETag)
+        """
+        kwargs = {'Bucket': self.bucket, 'Key': download.key}
+        if first is not None:
+            kwargs['Range'] = f'bytes={first}-{last}'
+            if download.etag:
+                # Every part must come from the same version of the object
+                kwargs['IfMatch'] = download.etag
+
+        started = time.perf_counter()
+        try:
+            response = self.s3_client.get_object(**kwargs)
+            data = response['Body'].read()
+        except ClientError as e:
+            # A ranged GET of an empty object is rejected as unsatisfiable
+            if first == 0 and e.response.get('Error', {}).get('Code') == 'InvalidRange':
+                return download, 0, b'', started, time.perf_counter(), 0, None
+            raise
+        finished = time.perf_counter()
+
+        # No Content-Range: the whole object was returned
+        match = CONTENT_RANGE_RE.match(response.get('ContentRange') or '')
+        total = int(match.group(3)) if match else (first or 0) + len(data)
+        return download, first or 0, data, started, finished, total, response.get('ETag')
+
+    def _record_timing(self, download: _Download, size: int):
+        """Append the per-object timing entry."""
+        ms = ((download.finished or 0) - (download.started or 0)) * 1000
+        timing = {
+            'key': download.key,
+            'bytes': size,
+            'parts': len(download.parts),
+            'ms': round(ms, 1),
+            'mib_per_s': round(size / 2**20 / (ms / 1000), 2) if ms > 0 else None
+        }
+        logger.debug(f"Fetched {download.key}: {size} bytes in {timing['parts']} parts, {timing['ms']}ms")
+        with self.lock:
+            self.timings.append(timing)
@@ -0,0 +1,250 @@
+"""
+Unit 1: Ingestion Snapshot Cache
+Keeps a local columnar snapshot of every parsed source file so re-runs
+only download and parse the files that changed.
+
+Snapshots are keyed by the S3 object ETag (or, for local files, by a
+content hash that is only recomputed when mtime or size change) plus a
+digest of the read schema. With pyarrow installed they are Arrow IPC
+files loaded through a memory map; without it they fall back to pickle.
+Hits and the source bytes they saved are counted and logged.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional: snapshots fall back to pickle
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes
+SNAPSHOT_FORMAT_VERSION = 2
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _format_tag() -> str:
+    """Snapshot encoding plus the library versions it depends on."""
+    if pa is not None:
+        return f'arrow-ipc/pyarrow-{pa.__version__}/pandas-{pd.__version__}'
+    return f'pickle-{pickle.HIGHEST_PROTOCOL}/pandas-{pd.__version__}/py{sys.version_info[0]}.{sys.version_info[1]}'
+
+
+def _restore_object_columns(df: pd.DataFrame, object_columns: List[str]) -> pd.DataFrame:
+    """
+    Give object columns back their parsed form after an Arrow round trip.
+    
+    Arrow returns missing values in object/string columns as None (and may
+    turn object columns into a string dtype); a cold parse has object
+    columns with NaN. Without this, warm and cold runs would build
+    different products ('None' vs 'nan' text, null vs NaN fingerprints).
+    """
+    columns = set(object_columns) | {c for c in df.columns if df[c].dtype == object}
+    for column in df.columns:
+        if column in columns:
+            values = df[column].astype(object)
+            df[column] = values.where(values.notna(), np.nan)
+    return df
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    """
+    Parsed-DataFrame snapshots on local disk.
+
+    Configured by data_ingestion.snapshot_cache in config.yaml:
+        enabled: off unless set
+        dir: snapshot directory
+
+    Each snapshot is a data file (.arrow or .pkl) and a .json manifest
+    holding the source key, encoding and source size. A snapshot is used
+    only when both the source key and the encoding match.
+    """
+
+    def __init__(self, cache_dir: str, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self.format = _format_tag()
+        self.suffix = '.arrow' if pa is not None else '.pkl'
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.load_ms = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'SnapshotCache':
+        """Cache configured by data_ingestion.snapshot_cache."""
+        cache_config = config.get('data_ingestion', {}).get('snapshot_cache', {})
+        return cls(cache_config.get('dir', '.ingestion_cache'),
+                   enabled=cache_config.get('enabled', False))
+
+    def _paths(self, name: str) -> tuple:
+        stem = re.sub(r'[^A-Za-z0-9._-]', '_', name)
+        return self.cache_dir / f'{stem}{self.suffix}', self.cache_dir / f'{stem}.json'
+
+    def _read_manifest(self, name: str) -> Optional[Dict]:
+        _, manifest_path = self._paths(name)
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != SNAPSHOT_FORMAT_VERSION or manifest.get('format') != self.format:
+            return None
+        return manifest
+
+    def load(self, name: str, source_key: str) -> Optional[pd.DataFrame]:
+        """
+        Snapshot for a source, or None when missing or stale.
+
+        Args:
+            name: Source name (S3 key or local path)
+            source_key: Current ETag/hash of the source plus schema digest
+
+        Returns:
+            The parsed DataFrame as stored
+        """
+        if not self.enabled:
+            return None
+
+        manifest = self._read_manifest(name)
+        if manifest is None or manifest.get('source_key') != source_key:
+            self.misses += 1
+            return None
+
+        data_path, _ = self._paths(name)
+        start = time.perf_counter()
+        try:
+            if pa is not None:
+                # Memory-mapped: column buffers are paged in from the file
+                table = pa.ipc.open_file(pa.memory_map(str(data_path), 'r')).read_all()
+                df = _restore_object_columns(table.to_pandas(split_blocks=True),
+                                             manifest.get('object_columns', []))
+            else:
+                with open(data_path, 'rb') as f:
+                    df = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable snapshot {data_path}: {str(e)}")
+            self.misses += 1
+            return None
+
+        self.load_ms += (time.perf_counter() - start) * 1000
+        self.hits += 1
+        self.bytes_saved += manifest.get('source_bytes', 0)
+        logger.info(f"✓ Snapshot hit for {name} ({len(df)} rows)")
+        return df
+
+    def store(self, name: str, source_key: str, df: pd.DataFrame, source_bytes: int = 0,
+              extra: Optional[Dict] = None):
+        """
+        Write a snapshot (atomically; failures are logged, never raised).
+
+        Args:
+            name: Source name (S3 key or local path)
+            source_key: ETag/hash of the source plus schema digest
+            df: Parsed DataFrame
+            source_bytes: Size of the source object (counted as saved on hits)
+            extra: Additional manifest fields (e.g. local mtime and size)
+        """
+        if not self.enabled:
+            return
+
+        data_path, manifest_path = self._paths(name)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = data_path.with_name(data_path.name + '.tmp')
+            if pa is not None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.OSFile(str(tmp_path), 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, data_path)
+
+            self._write_manifest(name, {
+                'version': SNAPSHOT_FORMAT_VERSION,
+                'format': self.format,
+                'source_key': source_key,
+                'source_bytes': source_bytes,
+                'rows': len(df),
+                'object_columns': [str(c) for c in df.columns if df[c].dtype == object],
+                'written_at': time.time(),
+                **(extra or {})
+            })
+        except Exception as e:
+            logger.warning(f"Could not write snapshot for {name}: {str(e)}")
+
+    def _write_manifest(self, name: str, manifest: Dict):
+        _, manifest_path = self._paths(name)
+        tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def local_source_key(self, path: Path, schema_digest: str = '') -> Dict:
+        """
+        Source key for a local file: its SHA-256, reused from the manifest
+        while mtime and size are unchanged so unchanged files are not re-read.
+
+        Returns:
+            {'source_key', 'source_bytes', 'schema_digest', 'mtime_ns',
+            'size'} (pass as store(extra=...) to keep the fast path)
+        """
+        stat = path.stat()
+        fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+        manifest = self._read_manifest(str(path)) if self.enabled else None
+        if (manifest and manifest.get('mtime_ns') == stat.st_mtime_ns
+                and manifest.get('size') == stat.st_size
+                and manifest.get('schema_digest') == schema_digest):
+            source_key = manifest['source_key']
+        else:
+            source_key = f'sha256:{file_sha256(path)}|{schema_digest}'
+            if manifest and manifest.get('source_key') == source_key:
+                # Touched but unchanged: remember the new mtime
+                self._write_manifest(str(path), {**manifest, **fingerprint})
+
+        return {'source_key': source_key, 'source_bytes': stat.st_size,
+                'schema_digest': schema_digest, **fingerprint}
+
+    def stats(self) -> Dict:
+        """Hit/miss counts and source bytes saved since creation."""
+        return {
+            'enabled': self.enabled,
+            'format': self.format,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+            'load_ms': round(self.load_ms, 1)
+        }
+
+    def log_summary(self):
+        """Log hits, misses and bytes saved."""
+        if self.enabled:
+            logger.info(f"Snapshot cache: {self.hits} hits, {self.misses} misses, "
+                        f"{self.bytes_saved / 2**20:.1f} MiB not downloaded/parsed "
+                        f"(snapshots loaded in {self.load_ms:.0f}ms)")
@@ -55,7 +55,7 @@ class EmbeddingService:
             raise
     
     def generate_text_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts in parallel."""
+        """Generate embeddings for multiple texts in parallel (in input order)."""
         embeddings = []
         batch_size = self.config['embedding_generation']['batch_size']
         max_workers = self.config['embedding_generation']['max_workers']
@@ -67,16 +67,17 @@ class EmbeddingService:
             batch = texts[i:i + batch_size]
             
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(self.generate_text_embedding, text): text 
-                          for text in batch}
+                futures = {executor.submit(self.generate_text_embedding, text): position 
+                          for position, text in enumerate(batch)}
+                batch_embeddings = [[] for _ in batch]  # Empty embedding for failed items
                 
                 for future in as_completed(futures):
                     try:
-                        embedding = future.result()
-                        embeddings.append(embedding)
+                        batch_embeddings[futures[future]] = future.result()
                     except Exception as e:
                         logger.error(f"Failed to generate embedding: {str(e)}")
-                        embeddings.append([])  # Empty embedding for failed items
+                
+                embeddings.extend(batch_embeddings)
             
             logger.info(f"Processed {min(i + batch_size, len(texts))}/{len(texts)} texts")
         
@@ -19,6 +19,8 @@ from opensearchpy import OpenSearch
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from unit_1_data_ingestion.s3_fetch import S3Fetcher, s3_client_config
+
 # Load environment variables
 load_dotenv()
 
@@ -36,8 +38,10 @@ class S3EmbeddingLoader:
         # Initialize S3 client
         self.s3_client = boto3.client(
             's3',
-            region_name=config['aws']['region']
+            region_name=config['aws']['region'],
+            config=s3_client_config(config)
         )
+        self.fetcher = S3Fetcher(self.s3_client, self.bucket, config)
     
     def load_text_embeddings(self) -> List[Dict]:
         """Load text embeddings from S3."""
@@ -48,8 +52,8 @@ class S3EmbeddingLoader:
         logger.info(f"Loading text embeddings from s3://{self.bucket}/{s3_key}")
         
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket, Key=s3_key)
-            content = response['Body'].read().decode('utf-8')
+            # One large file: fetched as parallel ranged GETs
+            content = self.fetcher.fetch(s3_key).decode('utf-8')
             
             # Fix NaN values that cause OpenSearch indexing errors
             # Replace NaN with null for proper JSON parsing
@@ -75,36 +79,37 @@ class S3EmbeddingLoader:
         logger.info(f"Loading image embeddings from s3://{self.bucket}/{prefix}")
         
         try:
-            # List all batch files
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket,
-                Prefix=prefix
-            )
+            # List all batch files (every page, not just the first 1,000 keys)
+            objects = self.fetcher.list_objects(prefix)
             
-            if 'Contents' not in response:
+            if not objects:
                 logger.warning(f"No files found in s3://{self.bucket}/{prefix}")
                 return []
             
             # Filter for batch files matching pattern
-            batch_files = [
-                obj['Key'] for obj in response['Contents']
-                if obj['Key'].endswith('.json') and 'batch' in obj['Key']
-            ]
-            batch_files.sort()
+            batch_objects = sorted(
+                (obj for obj in objects
+                 if obj['Key'].endswith('.json') and 'batch' in obj['Key']),
+                key=lambda obj: obj['Key']
+            )
             
-            logger.info(f"Found {len(batch_files)} batch files")
+            logger.info(f"Found {len(batch_objects)} batch files")
+            
+            # Download concurrently (sizes from the listing drive ranged GETs,
+            # ETags pin their parts to the listed version)
+            bodies = self.fetcher.fetch_many(
+                [obj['Key'] for obj in batch_objects],
+                sizes={obj['Key']: obj['Size'] for obj in batch_objects},
+                etags={obj['Key']: obj['ETag'] for obj in batch_objects if obj.get('ETag')}
+            )
             
             all_images = []
             
-            for batch_file in batch_files:
-                logger.info(f"Loading {batch_file}...")
-                
-                response = self.s3_client.get_object(Bucket=self.bucket, Key=batch_file)
-                content = response['Body'].read().decode('utf-8')
-                batch_images = json.loads(content)
+            for batch_file in [obj['Key'] for obj in batch_objects]:
+                batch_images = json.loads(bodies.pop(batch_file).decode('utf-8'))
                 
                 all_images.extend(batch_images)
-                logger.info(f"  Loaded {len(batch_images)} images")
+                logger.info(f"  Loaded {len(batch_images)} images from {batch_file}")
             
             logger.info(f"✓ Total images loaded: {len(all_images)}")
             return all_images
@@ -0,0 +1,184 @@
+"""
+Unit 3: Index Manifest
+Persistent record of what the text index holds: the text and content
+fingerprints last indexed for every variant_id. Comparing a fresh
+ingestion against it yields the delta for an incremental run.
+
+The manifest is only trusted for the index it was written against
+(matched by the index UUID, which changes whenever the index is
+recreated) and for the same embedding model and dimension; otherwise
+the pipeline falls back to a full rebuild.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from unit_1_data_ingestion.fingerprint import CONTENT_FINGERPRINT_FIELD, TEXT_FINGERPRINT_FIELD
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT_VERSION = 1
+
+
+@dataclass
+class DeltaPlan:
+    """
+    Changes between a fresh ingestion and the manifest.
+
+    Attributes:
+        added: Products not in the manifest (embed and index)
+        text_changed: Products whose embedded text changed (re-embed and re-index)
+        content_changed: Products with only non-text fields changed (partial update)
+        deleted: variant_ids in the manifest but no longer ingested
+        unchanged: Number of products with both fingerprints unchanged
+    """
+    added: List[Dict] = field(default_factory=list)
+    text_changed: List[Dict] = field(default_factory=list)
+    content_changed: List[Dict] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def to_embed(self) -> List[Dict]:
+        """Products that need a new text embedding."""
+        return self.added + self.text_changed
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'added': len(self.added),
+            'text_changed': len(self.text_changed),
+            'content_changed': len(self.content_changed),
+            'deleted': len(self.deleted),
+            'unchanged': self.unchanged
+        }
+
+
+class IndexManifest:
+    """
+    variant_id -> [text_fingerprint, content_fingerprint] for one text index.
+
+    Configured by indexing.delta in config.yaml (manifest_path).
+    """
+
+    def __init__(self, path: str, index_name: str, model_id: str, dimension: int):
+        self.path = Path(path)
+        self.index_name = index_name
+        self.model_id = model_id
+        self.dimension = dimension
+        self.index_uuid: Optional[str] = None
+        self.entries: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'IndexManifest':
+        """Manifest for the configured text index and embedding model."""
+        delta_config = config.get('indexing', {}).get('delta', {})
+        bedrock_config = config['aws']['bedrock']
+        return cls(
+            delta_config.get('manifest_path', 'index_manifest.json'),
+            config['aws']['opensearch']['indices']['text_index'],
+            bedrock_config['text_model_id'],
+            bedrock_config['text_embedding_dimension']
+        )
+
+    def load(self, index_uuid: Optional[str]) -> bool:
+        """
+        Load the manifest if it matches the live index and embedding model.
+
+        Args:
+            index_uuid: UUID of the live text index (None if it does not exist)
+
+        Returns:
+            True when the manifest can be used for an incremental run
+        """
+        if index_uuid is None:
+            logger.info(f"Index {self.index_name} does not exist; full rebuild")
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No index manifest at {self.path}; full rebuild")
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable index manifest {self.path}: {str(e)}; full rebuild")
+            return False
+
+        expected = {
+            'version': MANIFEST_FORMAT_VERSION,
+            'index': self.index_name,
+            'index_uuid': index_uuid,
+            'model_id': self.model_id,
+            'dimension': self.dimension
+        }
+        mismatched = [key for key, value in expected.items() if data.get(key) != value]
+        if mismatched:
+            logger.info(f"Index manifest does not match the live index ({', '.join(mismatched)}); full rebuild")
+            return False
+
+        self.index_uuid = index_uuid
+        self.entries = data.get('entries', {})
+        logger.info(f"Loaded index manifest: {len(self.entries)} variants")
+        return True
+
+    def plan(self, products: Iterable[Dict]) -> DeltaPlan:
+        """Compare fingerprinted products against the manifest."""
+        plan = DeltaPlan()
+        seen = set()
+        for product in products:
+            variant_id = product['variant_id']
+            seen.add(variant_id)
+            previous = self.entries.get(variant_id)
+            if previous is None:
+                plan.added.append(product)
+            elif previous[0] != product[TEXT_FINGERPRINT_FIELD]:
+                plan.text_changed.append(product)
+            elif previous[1] != product[CONTENT_FINGERPRINT_FIELD]:
+                plan.content_changed.append(product)
+            else:
+                plan.unchanged += 1
+        plan.deleted = [variant_id for variant_id in self.entries if variant_id not in seen]
+        return plan
+
+    def record(self, products: Iterable[Dict]):
+        """Store the fingerprints of successfully indexed products."""
+        for product in products:
+            self.entries[product['variant_id']] = [
+                product[TEXT_FINGERPRINT_FIELD], product[CONTENT_FINGERPRINT_FIELD]
+            ]
+
+    def remove(self, variant_ids: Iterable[str]):
+        """Forget deleted variants."""
+        for variant_id in variant_ids:
+            self.entries.pop(variant_id, None)
+
+    def reset(self, index_uuid: Optional[str]):
+        """Start over for a freshly created index."""
+        self.index_uuid = index_uuid
+        self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically."""
+        data = {
+            'version': MANIFEST_FORMAT_VERSION,
+            'index': self.index_name,
+            'index_uuid': self.index_uuid,
+            'model_id': self.model_id,
+            'dimension': self.dimension,
+            'updated_at': time.time(),
+            'entries': self.entries
+        }
+        if self.path.parent != Path(''):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        logger.info(f"✓ Saved index manifest ({len(self.entries)} variants) to {self.path}")
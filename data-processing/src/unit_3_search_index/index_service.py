@@ -6,7 +6,7 @@ Creates and manages OpenSearch indices for text and image embeddings.
 import boto3
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 import time
 
 logger = logging.getLogger(__name__)
@@ -93,6 +93,8 @@ class SearchIndexService:
                     "variant_url": {"type": "keyword"},
                     "stock_status": {"type": "keyword"},
                     "lifecycle_status": {"type": "keyword"},
+                    "text_fingerprint": {"type": "keyword"},
+                    "content_fingerprint": {"type": "keyword"},
                     "text_embedding": {
                         "type": "knn_vector",
                         "dimension": self.config['aws']['bedrock']['text_embedding_dimension'],
@@ -205,9 +207,15 @@ class SearchIndexService:
             logger.error(f"Error creating image index: {str(e)}")
             raise
     
-    def index_products(self, products: List[Dict]):
-        """Index products with text embeddings to OpenSearch."""
+    def index_products(self, products: List[Dict]) -> List[str]:
+        """
+        Index products with text embeddings to OpenSearch.
+        
+        Returns:
+            variant_ids of documents the bulk requests rejected
+        """
         batch_size = self.config['indexing']['batch_size']
+        failed_ids = []
         
         logger.info(f"Indexing {len(products)} products...")
         
@@ -232,6 +240,7 @@ class SearchIndexService:
                 
                 if response.get('errors'):
                     logger.error(f"Errors in bulk indexing: {response}")
+                    failed_ids.extend(self._bulk_failures(response, [p['variant_id'] for p in batch]))
                 else:
                     logger.info(f"Indexed {len(batch)} products ({i + len(batch)}/{len(products)})")
                     
@@ -242,6 +251,86 @@ class SearchIndexService:
         # Refresh index
         self.client.indices.refresh(index=self.text_index)
         logger.info("Text index refresh complete")
+        return failed_ids
+    
+    def apply_text_delta(self, upserts: List[Dict], partial_updates: List[Dict],
+                         deletes: List[str]) -> List[str]:
+        """
+        Apply an incremental change set to the text index in targeted bulk requests.
+        
+        Args:
+            upserts: Complete products (with text_embedding) to index
+            partial_updates: Products whose stored embedding is still valid;
+                every other field is updated in place
+            deletes: variant_ids to remove
+        
+        Returns:
+            variant_ids of operations the bulk requests rejected
+        """
+        batch_size = self.config['indexing']['batch_size']
+        operations = (
+            [('index', p['variant_id'], p) for p in upserts] +
+            [('update', p['variant_id'], {'doc': {k: v for k, v in p.items() if k != 'text_embedding'}})
+             for p in partial_updates] +
+            [('delete', variant_id, None) for variant_id in deletes]
+        )
+        failed_ids = []
+        
+        logger.info(f"Applying text index delta: {len(upserts)} upserts, "
+                    f"{len(partial_updates)} partial updates, {len(deletes)} deletes")
+        
+        for i in range(0, len(operations), batch_size):
+            batch = operations[i:i + batch_size]
+            
+            bulk_body = []
+            for action, doc_id, source in batch:
+                bulk_body.append({action: {"_index": self.text_index, "_id": doc_id}})
+                if source is not None:
+                    bulk_body.append(source)
+            
+            try:
+                response = self.client.bulk(body=bulk_body)
+                
+                if response.get('errors'):
+                    # A delete of a document that is already gone is not a failure
+                    failures = self._bulk_failures(response, [doc_id for _, doc_id, _ in batch],
+                                                   ignore_missing=True)
+                    if failures:
+                        logger.error(f"Errors in bulk delta for {len(failures)} documents: {failures[:10]}")
+                    failed_ids.extend(failures)
+                logger.info(f"Applied {len(batch)} operations ({i + len(batch)}/{len(operations)})")
+                    
+            except Exception as e:
+                logger.error(f"Error applying delta batch: {str(e)}")
+                raise
+        
+        if operations:
+            self.client.indices.refresh(index=self.text_index)
+            logger.info("Text index refresh complete")
+        return failed_ids
+    
+    @staticmethod
+    def _bulk_failures(response: Dict, doc_ids: List[str], ignore_missing: bool = False) -> List[str]:
+        """IDs of failed items in a bulk response (items follow request order)."""
+        items = response.get('items')
+        if not items:
+            return list(doc_ids)
+        failures = []
+        for doc_id, item in zip(doc_ids, items):
+            action, result = next(iter(item.items()))
+            if 'error' not in result and result.get('status', 200) < 300:
+                continue
+            if ignore_missing and action == 'delete' and result.get('status') == 404:
+                continue
+            failures.append(doc_id)
+        return failures
+    
+    def text_index_uuid(self) -> Optional[str]:
+        """UUID of the live text index (None if it does not exist)."""
+        if not self.client.indices.exists(index=self.text_index):
+            return None
+        settings = self.client.indices.get_settings(index=self.text_index)
+        return next(iter(settings.values()))['settings']['index'].get('uuid')
     
     def index_images(self, image_documents: List[Dict]):
         """Index image embeddings to OpenSearch."""
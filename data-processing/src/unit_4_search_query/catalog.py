@@ -0,0 +1,372 @@
+"""
+Unit 4: Compiled Catalog
+Immutable, precompiled view of the unified catalog shared by filter
+extraction (SearchQueryService), tag validation (ClaudeLLMService) and
+tag type inference (TagIndexService).
+"""
+
+import hashlib
+import json
+import logging
+import marshal
+import os
+import re
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+# Directory holding config.yaml; relative catalog_snapshot paths resolve against it
+CONFIG_DIR = Path(__file__).resolve().parent.parent
+
+# Tag type -> catalog key used to validate tags of that type
+TAG_TYPE_TO_CATALOG_KEY = {
+    'category': 'categories',
+    'price_range': 'price_ranges',
+    'material': 'materials',
+    'style': 'styles',
+    'color': 'colors'
+}
+
+# Catalog keys in tag type inference priority (e.g. "Walnut" is a material first)
+TAG_TYPE_PRIORITY = ('category', 'material', 'style', 'color')
+
+
+def get_catalog_section(config: Dict) -> Dict[str, List[str]]:
+    """Return the unified catalog section (falls back to legacy related_tags.catalog_values)."""
+    return (
+        config.get('catalog')
+        or config.get('related_tags', {}).get('catalog_values')
+        or {}
+    )
+
+
+def catalog_version(catalog: Dict[str, List[str]]) -> str:
+    """Content hash identifying a catalog version."""
+    payload = json.dumps(catalog, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def parse_price_range(label: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse a price range label into a half-open [low, high) band.
+
+    "Under $500" -> (0, 500), "$500-$1,000" -> (500, 1000),
+    "Over $3,000" -> (3000, inf). Returns None for unparseable labels.
+    """
+    text = label.replace(',', '').strip().lower()
+    numbers = [float(n) for n in re.findall(r'\d+(?:\.\d+)?', text)]
+    if not numbers:
+        return None
+    if text.startswith('under'):
+        return (0.0, numbers[0])
+    if text.startswith('over'):
+        return (numbers[0], float('inf'))
+    if len(numbers) >= 2:
+        return (numbers[0], numbers[1])
+    return None
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _contains_word(text: str, word: str) -> bool:
+    """Equivalent of re.search(r'\\b' + re.escape(word) + r'\\b', text) for words with word-char edges."""
+    start = text.find(word)
+    while start >= 0:
+        end = start + len(word)
+        if ((start == 0 or not _is_word_char(text[start - 1])) and
+                (end == len(text) or not _is_word_char(text[end]))):
+            return True
+        start = text.find(word, start + 1)
+    return False
+
+
+@dataclass(frozen=True)
+class CompiledCatalog:
+    """
+    Read-only catalog compiled once per catalog version.
+
+    Attributes:
+        version: Content hash of the source catalog
+        values: catalog key -> canonical values in config order
+        lowercase: catalog key -> frozenset of lowercase values
+        canonical: catalog key -> lowercase value -> canonical spelling
+        value_types: lowercase value -> tag type (by TAG_TYPE_PRIORITY)
+        match_terms: catalog key -> (canonical, lowercase, needs_regex) tuples
+        price_bands: (label, low, high) for each parseable price range label
+    """
+    version: str
+    values: Dict[str, Tuple[str, ...]]
+    lowercase: Dict[str, FrozenSet[str]]
+    canonical: Dict[str, Dict[str, str]]
+    value_types: Dict[str, str]
+    match_terms: Dict[str, Tuple[Tuple[str, str, bool], ...]]
+    price_bands: Tuple[Tuple[str, float, float], ...]
+
+    @classmethod
+    def compile(cls, catalog: Dict[str, List[str]]) -> 'CompiledCatalog':
+        """Compile a raw catalog section."""
+        values = {}
+        lowercase = {}
+        canonical = {}
+        match_terms = {}
+
+        for key, raw_values in catalog.items():
+            entries = tuple(str(v) for v in (raw_values or []))
+            values[key] = entries
+            lowercase[key] = frozenset(v.lower() for v in entries)
+
+            spellings = {}
+            for value in entries:
+                spellings.setdefault(value.lower(), value)
+            canonical[key] = spellings
+
+            match_terms[key] = tuple(
+                (value, value.lower(),
+                 not (_is_word_char(value[0]) and _is_word_char(value[-1])))
+                for value in entries if value
+            )
+
+        value_types = {}
+        for tag_type in TAG_TYPE_PRIORITY:
+            for value in lowercase.get(TAG_TYPE_TO_CATALOG_KEY[tag_type], ()):
+                value_types.setdefault(value, tag_type)
+
+        price_bands = []
+        for label in values.get('price_ranges', ()):
+            band = parse_price_range(label)
+            if band:
+                price_bands.append((label, band[0], band[1]))
+
+        return cls(
+            version=catalog_version(catalog),
+            values=values,
+            lowercase=lowercase,
+            canonical=canonical,
+            value_types=value_types,
+            match_terms=match_terms,
+            price_bands=tuple(price_bands)
+        )
+
+    def get(self, key: str, default: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+        """Canonical values for a catalog key, in config order."""
+        return self.values.get(key, default)
+
+    def contains(self, key: str, value: str) -> bool:
+        """Case-insensitive membership test."""
+        return value.lower() in self.lowercase.get(key, ())
+
+    def canonicalize(self, key: str, value: str) -> Optional[str]:
+        """Canonical catalog spelling of a value, or None if not in the catalog."""
+        return self.canonical.get(key, {}).get(value.lower())
+
+    def is_valid_tag(self, tag: str, tag_type: str) -> bool:
+        """Validate a tag against the catalog values for its type."""
+        return self.contains(TAG_TYPE_TO_CATALOG_KEY.get(tag_type, 'categories'), tag)
+
+    def tag_type_of(self, value: str) -> Optional[str]:
+        """Tag type of a catalog value, or None if the value is not a tag value."""
+        return self.value_types.get(value.lower())
+
+    def match_values(self, key: str, query_lower: str) -> List[str]:
+        """
+        Find catalog values mentioned in a lowercase query.
+
+        Uses word boundary matching so "oak" doesn't match "soaking".
+        A substring check prefilters values before the boundary check.
+        """
+        found = []
+        for value, value_lower, needs_regex in self.match_terms.get(key, ()):
+            if value_lower not in query_lower:
+                continue
+            if needs_regex:
+                pattern = r'\b' + re.escape(value_lower) + r'\b'
+                if re.search(pattern, query_lower, re.IGNORECASE):
+                    found.append(value)
+            elif _contains_word(query_lower, value_lower):
+                found.append(value)
+        return found
+
+    def price_band(self, price: float) -> Optional[str]:
+        """Narrowest price range label containing a price (first in config order on ties)."""
+        best = None
+        for label, low, high in self.price_bands:
+            if low <= price < high and (best is None or high - low < best[1]):
+                best = (label, high - low)
+        return best[0] if best else None
+
+    def price_segments(self) -> List[Tuple[float, float, str]]:
+        """
+        Disjoint (low, high, label) segments covering all price bands.
+
+        Every price in a segment has the same price_band(), so overlapping
+        labels ("Under $500", "Under $1,000") can be counted with one
+        non-overlapping range aggregation.
+        """
+        bounds = sorted({b for _, low, high in self.price_bands for b in (low, high)})
+        segments = []
+        for low, high in zip(bounds, bounds[1:]):
+            label = self.price_band(low)
+            if label:
+                segments.append((low, high, label))
+        return segments
+
+    # =========================================================================
+    # Binary snapshot (fast cold starts)
+    # =========================================================================
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Write the compiled catalog as a marshal snapshot (atomic replace).
+
+        Each writer uses its own temporary file, so concurrent writers never
+        interleave or replace a file another is still writing.
+        """
+        payload = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'python': sys.version_info[:2],
+            'version': self.version,
+            'values': self.values,
+            'lowercase': self.lowercase,
+            'canonical': self.canonical,
+            'value_types': self.value_types,
+            'match_terms': self.match_terms,
+            'price_bands': self.price_bands
+        }
+
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=output.parent, prefix=output.name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(payload, f)
+            os.replace(tmp_path, output)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load_snapshot(cls, path: str, expected_version: Optional[str] = None) -> Optional['CompiledCatalog']:
+        """
+        Load a snapshot written by save_snapshot.
+
+        Returns:
+            CompiledCatalog, or None if the snapshot is missing, unreadable,
+            from another Python version or for another catalog version
+        """
+        try:
+            with open(path, 'rb') as f:
+                payload = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError, OSError) as e:
+            logger.warning(f"Ignoring unreadable catalog snapshot {path}: {str(e)}")
+            return None
+
+        if not isinstance(payload, dict):
+            return None
+        if payload.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            return None
+        if tuple(payload.get('python', ())) != sys.version_info[:2]:
+            return None
+        if expected_version and payload.get('version') != expected_version:
+            return None
+
+        return cls(
+            version=payload['version'],
+            values=payload['values'],
+            lowercase=payload['lowercase'],
+            canonical=payload['canonical'],
+            value_types=payload['value_types'],
+            match_terms=payload['match_terms'],
+            price_bands=payload['price_bands']
+        )
+
+
+_compiled_catalogs: Dict[str, CompiledCatalog] = {}
+_compiled_lock = threading.Lock()
+
+
+def catalog_snapshot_path(config: Dict) -> Optional[Path]:
+    """catalog_snapshot.path resolved against the config directory (None if not configured)."""
+    path = config.get('catalog_snapshot', {}).get('path')
+    if not path:
+        return None
+    return CONFIG_DIR / path
+
+
+def get_compiled_catalog(config: Dict) -> CompiledCatalog:
+    """
+    Get the shared compiled catalog for a config.
+
+    Compiled once per catalog version and shared by all services in the
+    process. When catalog_snapshot.path is configured, a matching snapshot
+    is loaded instead of compiling. Snapshots are only read here; they are
+    written by save_catalog_snapshot in the designated builders.
+
+    Args:
+        config: Full configuration dict
+
+    Returns:
+        CompiledCatalog for the config's catalog
+    """
+    catalog = get_catalog_section(config)
+    version = catalog_version(catalog)
+
+    compiled = _compiled_catalogs.get(version)
+    if compiled is not None:
+        return compiled
+
+    with _compiled_lock:
+        compiled = _compiled_catalogs.get(version)
+        if compiled is not None:
+            return compiled
+
+        snapshot_path = catalog_snapshot_path(config)
+        if snapshot_path:
+            compiled = CompiledCatalog.load_snapshot(str(snapshot_path), expected_version=version)
+
+        if compiled is None:
+            compiled = CompiledCatalog.compile(catalog)
+
+        _compiled_catalogs[version] = compiled
+        logger.info(f"Compiled catalog version {version} "
+                    f"({sum(len(v) for v in compiled.values.values())} values)")
+        return compiled
+
+
+def save_catalog_snapshot(config: Dict) -> Optional[Path]:
+    """
+    Write the catalog snapshot for a config unless a current one exists.
+
+    Only called by the designated builders (the pre-fork master and
+    build_lambda_snapshots.py); other processes just compile on a miss.
+
+    Returns:
+        The snapshot path, or None when catalog_snapshot.path is not
+        configured or the snapshot could not be written
+    """
+    snapshot_path = catalog_snapshot_path(config)
+    if snapshot_path is None:
+        return None
+    compiled = get_compiled_catalog(config)
+    if CompiledCatalog.load_snapshot(str(snapshot_path), expected_version=compiled.version) is not None:
+        return snapshot_path
+    try:
+        compiled.save_snapshot(str(snapshot_path))
+    except OSError as e:
+        logger.warning(f"Could not write catalog snapshot {snapshot_path}: {str(e)}")
+        return None
+    logger.info(f"✓ Wrote catalog snapshot {snapshot_path} (version {compiled.version})")
+    return snapshot_path
@@ -0,0 +1,360 @@
+"""
+Unit 4: Shared AWS Clients
+One boto3 session and one Bedrock/OpenSearch client set shared by the
+search and LLM services, created on first use so a cold start only pays
+for the clients a request actually needs. reset() recreates them in a
+forked worker.
+
+Connection pools are sized from the serving concurrency (threads per
+worker plus batch embedding fan-out) so concurrent requests reuse
+keep-alive connections instead of opening and discarding extra ones.
+Pool checkouts and wait times are exported as /metrics gauges.
+"""
+
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+import boto3
+from botocore.config import Config as BotoConfig
+from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+# botocore and requests both default to 10 connections per host
+DEFAULT_POOL_SIZE = 10
+
+# pool_stats keys that only ever increase (Prometheus counters)
+POOL_COUNTER_KEYS = re.compile(r'pool_.+_(checkouts|exhausted)')
+
+
+def pool_sizes(config: Dict, concurrency: Optional[int] = None) -> Dict[str, int]:
+    """
+    Connection pool sizes for the OpenSearch and Bedrock clients.
+
+    Explicit connection_pools.*_pool_size values win; 0 derives the size
+    from concurrency (server.threads when not given, 1 on Lambda). Each
+    request thread holds at most one OpenSearch connection, while Bedrock
+    also serves the batch embedding fan-out.
+
+    Args:
+        config: Full configuration dict
+        concurrency: Concurrent requests per process
+
+    Returns:
+        {'opensearch': size, 'bedrock': size}
+    """
+    pools_config = config.get('connection_pools', {})
+    if concurrency is None:
+        concurrency = config.get('server', {}).get('threads', 4)
+    fan_out = config.get('search_query', {}).get('batch', {}).get('embedding_concurrency', 8)
+
+    return {
+        'opensearch': (pools_config.get('opensearch_pool_size', 0)
+                       or max(DEFAULT_POOL_SIZE, concurrency)),
+        'bedrock': (pools_config.get('bedrock_pool_size', 0)
+                    or max(DEFAULT_POOL_SIZE, concurrency + fan_out))
+    }
+
+
+class PoolStats:
+    """Checkout counts and wait times for one client's connection pools."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.exhausted = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def checkout(self, wait_ms: float):
+        """Record a connection taken from the pool after waiting wait_ms."""
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if self.in_use > self.size:
+                # Pool empty: urllib3 opens a connection it discards on return
+                self.exhausted += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def checkin(self):
+        """Record a connection returned to the pool."""
+        with self.lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Flat gauge values (pool_<name>_*)."""
+        with self.lock:
+            prefix = f'pool_{self.name}'
+            return {
+                f'{prefix}_size': self.size,
+                f'{prefix}_in_use': self.in_use,
+                f'{prefix}_peak_in_use': self.peak_in_use,
+                f'{prefix}_utilization': round(self.peak_in_use / self.size, 3) if self.size else 0,
+                f'{prefix}_checkouts': self.checkouts,
+                f'{prefix}_exhausted': self.exhausted,
+                f'{prefix}_wait_ms_mean': round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0,
+                f'{prefix}_wait_ms_max': round(self.wait_ms_max, 3)
+            }
+
+
+def timed_pool_class(base, stats: PoolStats):
+    """Subclass a urllib3 connection pool class to report checkouts to stats."""
+
+    class TimedConnectionPool(base):
+        def _get_conn(self, timeout=None):
+            start = time.perf_counter()
+            conn = super()._get_conn(timeout)
+            stats.checkout((time.perf_counter() - start) * 1000)
+            return conn
+
+        def _put_conn(self, conn):
+            stats.checkin()
+            super()._put_conn(conn)
+
+    TimedConnectionPool.__name__ = TimedConnectionPool.__qualname__ = f'Timed{base.__name__}'
+    return TimedConnectionPool
+
+
+def keepalive_socket_options():
+    """urllib3 socket options with TCP keep-alive enabled."""
+    return HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """requests adapter with timed pools and optional TCP keep-alive."""
+
+    def __init__(self, pool_stats: Optional[PoolStats] = None, tcp_keepalive: bool = True, **kwargs):
+        self.pool_stats = pool_stats
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.tcp_keepalive:
+            pool_kwargs['socket_options'] = keepalive_socket_options()
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        if self.pool_stats is not None:
+            manager = self.poolmanager
+            manager.pool_classes_by_scheme = {
+                scheme: timed_pool_class(base, self.pool_stats)
+                for scheme, base in manager.pool_classes_by_scheme.items()
+            }
+
+
+class PooledRequestsHttpConnection(RequestsHttpConnection):
+    """OpenSearch connection whose session uses a sized, instrumented pool."""
+
+    def __init__(self, *args, pool_maxsize: int = DEFAULT_POOL_SIZE,
+                 pool_stats: Optional[PoolStats] = None, pool_block: bool = False,
+                 tcp_keepalive: bool = True, **kwargs):
+        super().__init__(*args, pool_maxsize=pool_maxsize, **kwargs)
+        adapter = PooledHTTPAdapter(
+            pool_stats=pool_stats, tcp_keepalive=tcp_keepalive,
+            pool_maxsize=pool_maxsize, pool_block=pool_block
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+class ClientRegistry:
+    """
+    Lazily created, shared Bedrock and OpenSearch clients for a config.
+
+    Configured by the connection_pools section of config.yaml:
+        opensearch_pool_size / bedrock_pool_size: 0 = derived (see pool_sizes)
+        block_when_exhausted: wait for a free OpenSearch connection instead
+            of opening a throwaway one
+        tcp_keepalive, http_compress, connect_timeout_seconds,
+        read_timeout_seconds
+    """
+
+    def __init__(self, config: Dict, concurrency: Optional[int] = None):
+        self.config = config
+        self.pools_config = config.get('connection_pools', {})
+        self.sizes = pool_sizes(config, concurrency)
+        self.lock = threading.RLock()
+        self._session = None
+        self._bedrock_client = None
+        self._opensearch_client = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {name: PoolStats(name, size) for name, size in self.sizes.items()}
+
+    def pool_stats(self) -> Dict[str, float]:
+        """Pool gauges for MetricsRegistry.register_source."""
+        values = {}
+        for stats in self.stats.values():
+            values.update(stats.snapshot())
+        return values
+
+    @property
+    def session(self):
+        """The boto3 session used to resolve IAM credentials (created once)."""
+        with self.lock:
+            if self._session is None:
+                self._session = boto3.Session()
+            return self._session
+
+    def bedrock_client(self):
+        """The shared bedrock-runtime client (bedrock_region, else region)."""
+        if self._bedrock_client is None:
+            with self.lock:
+                if self._bedrock_client is None:
+                    aws_config = self.config['aws']
+                    client = boto3.client(
+                        'bedrock-runtime',
+                        region_name=aws_config.get('bedrock_region', aws_config['region']),
+                        config=BotoConfig(
+                            max_pool_connections=self.sizes['bedrock'],
+                            tcp_keepalive=self.pools_config.get('tcp_keepalive', True),
+                            connect_timeout=self.pools_config.get('connect_timeout_seconds', 5),
+                            read_timeout=self.pools_config.get('read_timeout_seconds', 60)
+                        )
+                    )
+                    self._instrument_bedrock(client)
+                    self._bedrock_client = client
+        return self._bedrock_client
+
+    def _instrument_bedrock(self, client):
+        """
+        Report Bedrock pool checkouts to the pool stats.
+
+        botocore has no public hook for its urllib3 pools; the pool classes
+        are swapped in place (the dict is shared with its pool managers).
+        If botocore internals change this is skipped and only the sizing
+        applies.
+        """
+        http_session = getattr(getattr(client, '_endpoint', None), 'http_session', None)
+        pool_classes = getattr(http_session, '_pool_classes_by_scheme', None)
+        if not isinstance(pool_classes, dict):
+            return
+        for scheme, base in list(pool_classes.items()):
+            pool_classes[scheme] = timed_pool_class(base, self.stats['bedrock'])
+
+    def opensearch_client(self) -> OpenSearch:
+        """The shared OpenSearch client (IAM SigV4 or basic auth)."""
+        if self._opensearch_client is None:
+            with self.lock:
+                if self._opensearch_client is None:
+                    self._opensearch_client = self._create_opensearch_client()
+        return self._opensearch_client
+
+    def _create_opensearch_client(self) -> OpenSearch:
+        opensearch_config = self.config['aws']['opensearch']
+
+        # SSL configuration (allow disabling for SSH tunnels)
+        verify_certs = opensearch_config.get('verify_certs', True)
+        ssl_show_warn = opensearch_config.get('ssl_show_warn', True)
+
+        # Sized keep-alive pool; compressed request/response bodies
+        pool_kwargs = {
+            'connection_class': PooledRequestsHttpConnection,
+            'pool_maxsize': self.sizes['opensearch'],
+            'pool_stats': self.stats['opensearch'],
+            'pool_block': self.pools_config.get('block_when_exhausted', False),
+            'tcp_keepalive': self.pools_config.get('tcp_keepalive', True),
+            'http_compress': self.pools_config.get('http_compress', True)
+        }
+
+        if opensearch_config.get('use_iam_auth', True):
+            credentials = self.session.get_credentials()
+            auth = AWSV4SignerAuth(credentials, self.config['aws']['region'])
+
+            return OpenSearch(
+                hosts=[{'host': opensearch_config['endpoint'].replace('https://', ''),
+                        'port': 443}],
+                http_auth=auth,
+                use_ssl=True,
+                verify_certs=verify_certs,
+                ssl_show_warn=ssl_show_warn,
+                **pool_kwargs
+            )
+
+        # Load credentials from environment variables or config
+        username = os.getenv('OPENSEARCH_USERNAME') or opensearch_config.get('username')
+        password = os.getenv('OPENSEARCH_PASSWORD') or opensearch_config.get('password')
+
+        if not username or not password:
+            raise ValueError("OpenSearch username/password not found in environment or config")
+
+        return OpenSearch(
+            hosts=[opensearch_config['endpoint']],
+            http_auth=(username, password),
+            use_ssl=True,
+            verify_certs=verify_certs,
+            ssl_show_warn=ssl_show_warn,
+            **pool_kwargs
+        )
+
+    def warm_up(self) -> Optional[float]:
+        """
+        Open the OpenSearch connection (TLS handshake) ahead of the first request.
+
+        Returns:
+            Elapsed milliseconds, or None if the ping failed
+        """
+        start = time.perf_counter()
+        self.bedrock_client()
+        if not self.opensearch_client().ping():
+            logger.warning("OpenSearch warm-up ping failed")
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"✓ Warmed up AWS connections in {elapsed_ms:.0f}ms")
+        return elapsed_ms
+
+    def reset(self) -> None:
+        """
+        Close and drop all clients so they are recreated (e.g. after fork).
+
+        Closing releases pooled keep-alive sockets; a process that forks
+        right after reset() hands none of them to its children.
+        """
+        with self.lock:
+            for client in (self._bedrock_client, self._opensearch_client):
+                close = getattr(client, 'close', None)
+                if close is None:
+                    continue
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Closing client failed: {str(e)}")
+            self._session = None
+            self._bedrock_client = None
+            self._opensearch_client = None
+            self._reset_stats()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry(config: Dict, concurrency: Optional[int] = None) -> ClientRegistry:
+    """
+    Get the process-wide ClientRegistry.
+
+    Created on first call; a different config object (e.g. after a full
+    reload) replaces it.
+
+    Args:
+        config: Full configuration dict
+        concurrency: Concurrent requests per process (see pool_sizes)
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None or _registry.config is not config:
+            _registry = ClientRegistry(config, concurrency=concurrency)
+        return _registry
+
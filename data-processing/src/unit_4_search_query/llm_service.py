@@ -3,15 +3,76 @@ Unit 4: LLM Service for Features 5 & 6
 Claude LLM integration via Bedrock for intent extraction and tag generation.
 """
 
-import boto3
 import json
 import logging
-from typing import Dict, List, Optional, Tuple
+import os
+import re
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 import threading
 
+from .catalog import get_compiled_catalog
+from .clients import ClientRegistry
+
 logger = logging.getLogger(__name__)
 
+# Version of the warm-cache artifact written by precompute_llm_cache.py
+WARM_CACHE_FORMAT_VERSION = 1
+
+# LLMConcurrencyLimiter.stats keys that only ever increase (Prometheus counters)
+LIMITER_COUNTER_KEYS = re.compile(r'llm_(admitted|shed)_.+')
+
+_warm_cache_lock = threading.Lock()
+_warm_cache_loaded: Dict[Tuple[str, float], Dict] = {}
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups (lowercase, collapsed whitespace)."""
+    return ' '.join(query.lower().split())
+
+
+def load_warm_cache(path: Optional[str]) -> Dict:
+    """
+    Load a precomputed warm-cache artifact (intents and tags per query).
+    
+    The parsed artifact is memoized per path and mtime, so the LLM service
+    and the tag index share one copy when both load it at startup.
+    
+    Returns:
+        Dict with 'version', 'intents' and 'tags' keys (empty if unavailable)
+    """
+    empty = {'version': None, 'intents': {}, 'tags': {}}
+    if not path or not os.path.exists(path):
+        return empty
+    
+    memo_key = (os.path.abspath(path), os.path.getmtime(path))
+    with _warm_cache_lock:
+        if memo_key in _warm_cache_loaded:
+            return _warm_cache_loaded[memo_key]
+        
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load warm cache {path}: {e}")
+            return empty
+        
+        if data.get('format_version') != WARM_CACHE_FORMAT_VERSION:
+            logger.warning(f"Ignoring warm cache {path}: unsupported format "
+                           f"{data.get('format_version')}")
+            return empty
+        
+        warm_cache = {
+            'version': data.get('version'),
+            'intents': data.get('intents', {}),
+            'tags': data.get('tags', {})
+        }
+        _warm_cache_loaded[memo_key] = warm_cache
+        logger.info(f"Loaded warm cache {path} (version {warm_cache['version']}): "
+                    f"{len(warm_cache['intents'])} intents, {len(warm_cache['tags'])} tag sets")
+        return warm_cache
+
 
 class LLMCache:
     """Thread-safe in-memory cache with TTL for LLM responses."""
@@ -29,7 +90,7 @@ class LLMCache:
     
     def get(self, key: str) -> Optional[Dict]:
         """Get cached value if not expired."""
-        normalized_key = key.strip().lower()
+        normalized_key = normalize_query(key)
         if normalized_key in self._cache:
             value, expiry = self._cache[normalized_key]
             if datetime.now() < expiry:
@@ -39,7 +100,7 @@ class LLMCache:
     
     def set(self, key: str, value: Dict, ttl_seconds: int) -> None:
         """Cache value with TTL."""
-        normalized_key = key.strip().lower()
+        normalized_key = normalize_query(key)
         expiry = datetime.now() + timedelta(seconds=ttl_seconds)
         self._cache[normalized_key] = (value, expiry)
     
@@ -48,17 +109,316 @@ class LLMCache:
         self._cache.clear()
 
 
+class SemanticIntentCache:
+    """
+    Intent cache keyed by query embedding instead of exact query text.
+    
+    Embeddings of cached queries are kept L2-normalized in a preallocated
+    float32 matrix, so a lookup is one matrix-vector product. The entry with
+    the highest cosine similarity among unexpired entries is reused when it
+    passes the threshold. When full, the oldest entry is overwritten (ring
+    buffer).
+    """
+    
+    def __init__(self, max_entries: int = 5000, similarity_threshold: float = 0.92,
+                 ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[str, Dict, datetime]]] = [None] * max_entries
+        # Expiry timestamps per slot, so expired rows are masked in the lookup
+        self._expiry = np.zeros(max_entries)
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.ndim != 1 or norm == 0:
+            return None
+        return vector / norm
+    
+    def get(self, embedding: List[float]) -> Optional[Tuple[str, Dict, float]]:
+        """
+        Find the most similar cached query.
+        
+        Returns:
+            (cached_query, value, similarity) or None on a miss
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if (vector is None or self._size == 0
+                    or vector.shape[0] != self._matrix.shape[1]):
+                self.misses += 1
+                return None
+            
+            similarities = self._matrix[:self._size] @ vector
+            # An expired slot must not shadow a fresh entry for the same query
+            similarities[self._expiry[:self._size] <= datetime.now().timestamp()] = -np.inf
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            entry = self._entries[best]
+            
+            if similarity >= self.similarity_threshold:
+                self.hits += 1
+                return entry[0], entry[1], similarity
+            
+            self.misses += 1
+            return None
+    
+    def set(self, query: str, embedding: List[float], value: Dict) -> None:
+        """Cache a value under a query embedding."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self._matrix.shape[1]:
+                return
+            
+            slot = self._next
+            expiry = datetime.now() + timedelta(seconds=self.ttl_seconds)
+            self._matrix[slot] = vector
+            self._entries[slot] = (query, value, expiry)
+            self._expiry[slot] = expiry.timestamp()
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+    
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries = [None] * self.max_entries
+            self._expiry[:] = 0
+            self._size = 0
+            self._next = 0
+            self.hits = 0
+            self.misses = 0
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a JSON object that arrives in streamed chunks.
+    
+    Top-level fields are available in ``fields`` as soon as their value is
+    complete, and elements of top-level arrays are reported as soon as each
+    element closes. Text before the first '{' is ignored, like _extract_json.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.fields: Dict[str, object] = {}
+        self.items: Dict[str, List] = {}
+        self.done = False
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._primitive_start = -1
+        self._value_start = -1
+        self._element_start = -1
+        self._expect_key = False
+        self._key: Optional[str] = None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """
+        Consume a chunk of text.
+        
+        Returns:
+            List of (field_name, element) pairs for top-level array
+            elements completed by this chunk
+        """
+        self.buffer += chunk
+        buf = self.buffer
+        completed = []
+        i = self._pos
+        
+        while i < len(buf) and not self.done:
+            ch = buf[i]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_scalar(self._string_start, i + 1, completed)
+                i += 1
+                continue
+            
+            if not self._stack:
+                # Skip any preamble before the root object
+                if ch == '{':
+                    self._stack.append('{')
+                    self._expect_key = True
+                i += 1
+                continue
+            
+            if self._primitive_start >= 0 and (ch in ',}]' or ch.isspace()):
+                self._close_scalar(self._primitive_start, i, completed)
+                self._primitive_start = -1
+            
+            if ch == '"':
+                self._open_value(i)
+                self._in_string = True
+                self._string_start = i
+            elif ch in '{[':
+                self._open_value(i)
+                if len(self._stack) == 1 and ch == '[':
+                    self.items.setdefault(self._key, [])
+                self._stack.append(ch)
+            elif ch in '}]':
+                self._stack.pop()
+                self._close_container(i + 1, completed)
+            elif ch == ':':
+                if len(self._stack) == 1:
+                    self._expect_key = False
+            elif ch == ',':
+                if len(self._stack) == 1:
+                    self._expect_key = True
+            elif not ch.isspace() and self._primitive_start < 0:
+                self._open_value(i)
+                self._primitive_start = i
+            i += 1
+        
+        self._pos = i
+        return completed
+    
+    def _open_value(self, index: int) -> None:
+        """Record where a top-level field value or array element starts."""
+        level = len(self._stack)
+        if level == 1 and not self._expect_key:
+            self._value_start = index
+        elif level == 2 and self._stack[1] == '[':
+            self._element_start = index
+    
+    def _close_scalar(self, start: int, end: int, completed: List) -> None:
+        """Handle a string or primitive that just finished."""
+        level = len(self._stack)
+        if level == 1:
+            value = json.loads(self.buffer[start:end])
+            if self._expect_key:
+                self._key = value
+            else:
+                self.fields[self._key] = value
+        elif level == 2 and self._stack[1] == '[':
+            self._add_item(json.loads(self.buffer[start:end]), completed)
+    
+    def _close_container(self, end: int, completed: List) -> None:
+        """Handle an object or array that just closed."""
+        level = len(self._stack)
+        if level == 0:
+            self.done = True
+        elif level == 1:
+            self.fields[self._key] = json.loads(self.buffer[self._value_start:end])
+        elif level == 2 and self._stack[1] == '[':
+            self._add_item(json.loads(self.buffer[self._element_start:end]), completed)
+    
+    def _add_item(self, item, completed: List) -> None:
+        self.items.setdefault(self._key, []).append(item)
+        completed.append((self._key, item))
+
+
+class LLMConcurrencyLimiter:
+    """
+    Caps concurrent Claude calls with a short, bounded wait queue.
+    
+    LLM work on the search path is optional (intent fallback, Tier-2 tags),
+    so when all slots are busy a caller waits at most wait_timeout_seconds,
+    and only if fewer than max_waiting callers are already waiting;
+    otherwise the call is shed and the caller skips the LLM step.
+    """
+    
+    def __init__(self, max_concurrent: int = 8, max_waiting: int = 16,
+                 wait_timeout_seconds: float = 0.05):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted: Dict[str, int] = {}
+        self.shed: Dict[str, int] = {}
+    
+    def acquire(self, kind: str) -> bool:
+        """
+        Try to take a slot for an LLM call.
+        
+        Args:
+            kind: Call type for the counters ('intent' or 'tags')
+        
+        Returns:
+            True if admitted (call release() when done), False if shed
+        """
+        if self.semaphore.acquire(blocking=False):
+            return self._admit(kind)
+        
+        with self.lock:
+            if self.waiting >= self.max_waiting:
+                self.shed[kind] = self.shed.get(kind, 0) + 1
+                return False
+            self.waiting += 1
+        
+        acquired = self.semaphore.acquire(timeout=self.wait_timeout_seconds)
+        with self.lock:
+            self.waiting -= 1
+            if not acquired:
+                self.shed[kind] = self.shed.get(kind, 0) + 1
+                return False
+        return self._admit(kind)
+    
+    def _admit(self, kind: str) -> bool:
+        with self.lock:
+            self.in_flight += 1
+            self.admitted[kind] = self.admitted.get(kind, 0) + 1
+        return True
+    
+    def release(self) -> None:
+        """Free a slot taken by acquire()."""
+        with self.lock:
+            self.in_flight -= 1
+        self.semaphore.release()
+    
+    def stats(self) -> Dict:
+        """Current load and admitted/shed counts per call type."""
+        with self.lock:
+            stats = {
+                'llm_in_flight': self.in_flight,
+                'llm_waiting': self.waiting,
+                'llm_max_concurrent': self.max_concurrent
+            }
+            for kind, count in self.admitted.items():
+                stats[f'llm_admitted_{kind}'] = count
+            for kind, count in self.shed.items():
+                stats[f'llm_shed_{kind}'] = count
+            return stats
+
+
 class ClaudeLLMService:
     """Service for Claude LLM interactions via Bedrock."""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, clients: Optional[ClientRegistry] = None):
         self.config = config
-        # Use bedrock_region for Bedrock (us-east-1)
-        bedrock_region = config['aws'].get('bedrock_region', config['aws']['region'])
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            region_name=bedrock_region
-        )
+        self.clients = clients or ClientRegistry(config)
+        self.reset_clients()
         self.intent_cache = LLMCache()
         self.tag_cache = LLMCache()
         
@@ -69,6 +429,17 @@ class ClaudeLLMService:
             'model_id', 'anthropic.claude-sonnet-4-5-20250929-v1:0'
         )
         self.intent_cache_ttl = self.llm_fallback_config.get('cache_ttl_seconds', 3600)
+        self.intent_streaming = self.llm_fallback_config.get('streaming', False)
+        
+        # Semantic cache: reuse intents of near-duplicate queries by embedding
+        semantic_config = self.llm_fallback_config.get('semantic_cache', {})
+        self.semantic_cache = None
+        if semantic_config.get('enabled', False):
+            self.semantic_cache = SemanticIntentCache(
+                max_entries=semantic_config.get('max_entries', 5000),
+                similarity_threshold=semantic_config.get('similarity_threshold', 0.92),
+                ttl_seconds=self.intent_cache_ttl
+            )
         
         # Feature 6 config
         self.tags_config = config.get('related_tags', {})
@@ -78,9 +449,33 @@ class ClaudeLLMService:
         self.tag_cache_ttl = self.tags_config.get('cache_ttl_seconds', 1800)
         self.min_tags = self.tags_config.get('min_tags', 3)
         self.max_tags = self.tags_config.get('max_tags', 10)
+        self.tag_streaming = self.tags_config.get('streaming', False)
+        
+        # Unified catalog values (single source of truth, compiled once)
+        self.catalog = get_compiled_catalog(config)
         
-        # Unified catalog values (single source of truth)
-        self.catalog = config.get('catalog', {})
+        # Precomputed intents for head queries (see precompute_llm_cache.py)
+        warm_cache_path = config.get('llm_precompute', {}).get('warm_cache_path')
+        self.warm_intents = load_warm_cache(warm_cache_path)['intents']
+        
+        # Concurrency limit shared by intent extraction and tag generation
+        concurrency_config = config.get('llm_concurrency', {})
+        self.limiter = None
+        if concurrency_config.get('enabled', True):
+            self.limiter = LLMConcurrencyLimiter(
+                max_concurrent=concurrency_config.get('max_concurrent', 8),
+                max_waiting=concurrency_config.get('max_waiting', 16),
+                wait_timeout_seconds=concurrency_config.get('wait_timeout_ms', 50) / 1000
+            )
+    
+    def reset_clients(self):
+        """Bind the shared Bedrock client (again in a forked worker process)."""
+        self.bedrock_client = self.clients.bedrock_client()
+    
+    @staticmethod
+    def _cache_key(kind: str, query: str) -> str:
+        """Namespace cache keys: intent and tag results share the LLMCache singleton."""
+        return f"{kind}:{normalize_query(query)}"
     
     def should_trigger_fallback(self, top_score: float) -> bool:
         """Check if LLM fallback should be triggered based on similarity score."""
@@ -88,18 +483,20 @@ class ClaudeLLMService:
             return False
         return top_score < self.similarity_threshold
     
+    def _build_claude_body(self, prompt: str) -> str:
+        """Build the Bedrock request body for a Claude prompt."""
+        return json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1024,
+            "messages": [{"role": "user", "content": prompt}]
+        })
+    
     def _invoke_claude(self, prompt: str, model_id: str) -> str:
         """Call Claude via Bedrock."""
         try:
-            body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1024,
-                "messages": [{"role": "user", "content": prompt}]
-            })
-            
             response = self.bedrock_client.invoke_model(
                 modelId=model_id,
-                body=body,
+                body=self._build_claude_body(prompt),
                 contentType='application/json',
                 accept='application/json'
             )
@@ -110,6 +507,57 @@ class ClaudeLLMService:
             logger.error(f"Claude invocation failed: {e}")
             raise
     
+    def _invoke_claude_stream(self, prompt: str, model_id: str) -> Iterator[str]:
+        """
+        Call Claude via Bedrock response streaming.
+        
+        Yields text deltas as they arrive. Closing the generator early closes
+        the underlying HTTP stream, so callers can stop once they have enough.
+        """
+        try:
+            response = self.bedrock_client.invoke_model_with_response_stream(
+                modelId=model_id,
+                body=self._build_claude_body(prompt),
+                contentType='application/json',
+                accept='application/json'
+            )
+        except Exception as e:
+            logger.error(f"Claude stream invocation failed: {e}")
+            raise
+        
+        stream = response['body']
+        try:
+            for event in stream:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                payload = json.loads(chunk['bytes'])
+                if payload.get('type') == 'content_block_delta':
+                    text = payload.get('delta', {}).get('text')
+                    if text:
+                        yield text
+                elif payload.get('type') == 'message_stop':
+                    break
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+    
+    def _acquire_llm_slot(self, kind: str, query: str) -> bool:
+        """Take a concurrency slot, or log and return False if the call is shed."""
+        if self.limiter is None or self.limiter.acquire(kind):
+            return True
+        logger.warning(f"LLM concurrency limit reached, skipping {kind} for: {query}")
+        return False
+    
+    def _release_llm_slot(self) -> None:
+        if self.limiter is not None:
+            self.limiter.release()
+    
+    def get_limiter_stats(self) -> Dict:
+        """LLM concurrency limiter load and shed counts (empty when disabled)."""
+        return self.limiter.stats() if self.limiter else {}
+    
     def _extract_json(self, text: str) -> str:
         """Extract JSON from text response."""
         start = text.find('{')
@@ -123,20 +571,40 @@ class ClaudeLLMService:
     # Feature 5: Intent Extraction
     # =========================================================================
     
-    def extract_intents(self, query: str) -> Dict:
+    def extract_intents(self, query: str, query_embedding: Optional[List[float]] = None) -> Dict:
         """
         Extract concrete attributes from abstract query using Claude.
         
+        Args:
+            query: User search query
+            query_embedding: Embedding already computed for the query; enables
+                the semantic cache lookup without an extra Bedrock call
+        
         Returns:
             Dict with keys: abstract_terms, concrete_attributes, enhanced_query
         """
+        # Precomputed intents never expire and cost nothing
+        warm = self.warm_intents.get(normalize_query(query))
+        if warm:
+            logger.info(f"Intent warm cache hit for: {query}")
+            return warm
+        
         # Check cache
         if self.llm_fallback_config.get('cache_enabled', True):
-            cached = self.intent_cache.get(query)
+            cached = self.intent_cache.get(self._cache_key('intent', query))
             if cached:
                 logger.info(f"Intent cache hit for: {query}")
                 return cached
         
+        use_semantic_cache = self.semantic_cache is not None and query_embedding is not None
+        if use_semantic_cache:
+            match = self.semantic_cache.get(query_embedding)
+            if match:
+                cached_query, cached, similarity = match
+                logger.info(f"Intent semantic cache hit for: {query} "
+                            f"(matched '{cached_query}', similarity {similarity:.3f})")
+                return cached
+        
         # Build catalog context
         catalog_context = self._build_catalog_context()
         
@@ -168,10 +636,21 @@ Example for "royal yet modern dining table":
 Now analyze: "{query}"
 """
         
+        # Under load the fallback is skipped: the original query is kept
+        if not self._acquire_llm_slot('intent', query):
+            return {
+                'abstract_terms': [],
+                'concrete_attributes': {},
+                'enhanced_query': query
+            }
+        
         try:
-            response = self._invoke_claude(prompt, self.intent_model_id)
-            json_str = self._extract_json(response)
-            result = json.loads(json_str)
+            if self.intent_streaming:
+                result = self._stream_intents(prompt)
+            else:
+                response = self._invoke_claude(prompt, self.intent_model_id)
+                json_str = self._extract_json(response)
+                result = json.loads(json_str)
             
             # Ensure required fields
             result.setdefault('abstract_terms', [])
@@ -180,7 +659,9 @@ Now analyze: "{query}"
             
             # Cache result
             if self.llm_fallback_config.get('cache_enabled', True):
-                self.intent_cache.set(query, result, self.intent_cache_ttl)
+                self.intent_cache.set(self._cache_key('intent', query), result, self.intent_cache_ttl)
+            if use_semantic_cache:
+                self.semantic_cache.set(query, query_embedding, result)
             
             logger.info(f"Extracted intents for '{query}': {result['abstract_terms']}")
             return result
@@ -192,6 +673,35 @@ Now analyze: "{query}"
                 'concrete_attributes': {},
                 'enhanced_query': query
             }
+        finally:
+            self._release_llm_slot()
+    
+    def get_cache_stats(self) -> Dict:
+        """Report intent cache effectiveness (semantic cache hit/miss rates)."""
+        return {
+            'semantic_cache': self.semantic_cache.stats() if self.semantic_cache else None
+        }
+    
+    def _stream_intents(self, prompt: str) -> Dict:
+        """
+        Stream the intent response and stop as soon as enhanced_query is complete.
+        
+        enhanced_query is the last field in the requested schema and the only
+        one the search path needs, so the rest of the stream is not awaited.
+        """
+        parser = IncrementalJSONParser()
+        stream = self._invoke_claude_stream(prompt, self.intent_model_id)
+        try:
+            for text in stream:
+                parser.feed(text)
+                if 'enhanced_query' in parser.fields or parser.done:
+                    break
+        finally:
+            stream.close()
+        
+        if not parser.fields:
+            raise ValueError("No JSON object in streamed intent response")
+        return dict(parser.fields)
     
     def _build_catalog_context(self) -> str:
         """Build catalog knowledge context for LLM prompt."""
@@ -217,12 +727,14 @@ Map abstract terms to these concrete attributes when possible."""
         self,
         query: str,
         search_results: List[Dict] = None,
-        tag_index_service = None
+        tag_index_service = None,
+        facet_tags: Optional[List[Dict]] = None
     ) -> List[Dict]:
         """
         Generate personalized, clickable search tags using two-tier approach.
         
         Tier 1: Pre-computed index (instant, <1ms) - 95% of queries
+        Result-set facet tags (no LLM) when there are at least min_tags
         Tier 2: LLM generation (1-2s) - 5% of queries
         
         Returns:
@@ -238,23 +750,38 @@ Map abstract terms to these concrete attributes when possible."""
             # Tags are already dicts, return as-is
             return tags
         
+        # Facet tags from the search's aggregations replace the LLM tier
+        if facet_tags and len(facet_tags) >= self.min_tags:
+            logger.info(f"Using result-set facet tags for: {query}")
+            return facet_tags[:self.max_tags]
+        
         # Tier 2: Check cache for LLM-generated tags
         if self.tags_config.get('cache_enabled', True):
-            cached = self.tag_cache.get(query)
+            cached = self.tag_cache.get(self._cache_key('tags', query))
             if cached:
                 logger.info(f"Tag cache hit for: {query}")
+                if tag_index_service:
+                    tag_index_service.record_llm_tags(query, cached)
                 return cached
         
         # Tier 2: Generate with LLM for unique queries
         logger.info(f"Generating tags with LLM for unique query: {query}")
         tags = self._generate_tags_with_llm(query, search_results)
         
+        # Nothing to cache or promote when the call was shed or failed;
+        # the next request for the query tries again
+        if not tags:
+            return tags
+        
         # Cache LLM result
         if self.tags_config.get('cache_enabled', True):
-            self.tag_cache.set(query, tags, self.tag_cache_ttl)
+            self.tag_cache.set(self._cache_key('tags', query), tags, self.tag_cache_ttl)
         
-        # Note: We don't add to pre-computed index dynamically to avoid index bloat
-        # The index should be rebuilt periodically with analytics data
+        # Popular Tier-2 queries are promoted into a size-capped Tier-1 overlay;
+        # head queries are also precomputed offline from query logs
+        # (precompute_llm_cache.py writes the warm cache the tag index loads)
+        if tag_index_service:
+            tag_index_service.record_llm_tags(query, tags)
         
         return tags
     
@@ -272,13 +799,78 @@ Map abstract terms to these concrete attributes when possible."""
         if not self.tags_config.get('enabled', True):
             return []
         
-        # Check cache
-        if self.tags_config.get('cache_enabled', True):
-            cached = self.tag_cache.get(query)
-            if cached:
-                logger.info(f"Tag cache hit for: {query}")
-                return cached
+        # Caching is left to generate_related_tags
+        prompt = self._build_tag_prompt(query, search_results)
         
+        if not self._acquire_llm_slot('tags', query):
+            return []
+        
+        try:
+            if self.tag_streaming:
+                tags = list(self._stream_tags(prompt))
+            else:
+                response = self._invoke_claude(prompt, self.tag_model_id)
+                json_str = self._extract_json(response)
+                data = json.loads(json_str)
+                
+                tags = []
+                for tag_data in data.get('tags', []):
+                    tag = self._to_tag(tag_data)
+                    # Validate against catalog
+                    if tag:
+                        tags.append(tag)
+            
+            # Ensure within limits
+            tags = tags[:self.max_tags]
+            
+            logger.info(f"Generated {len(tags)} tags for '{query}'")
+            return tags
+            
+        except Exception as e:
+            logger.error(f"Tag generation failed: {e}")
+            return []
+        finally:
+            self._release_llm_slot()
+    
+    def _stream_tags(self, prompt: str) -> Iterator[Dict]:
+        """
+        Yield catalog-valid tags as each element of the "tags" array closes.
+        
+        The stream is closed as soon as max_tags valid tags have been read,
+        so the rest of the response is never generated or transferred.
+        """
+        parser = IncrementalJSONParser()
+        stream = self._invoke_claude_stream(prompt, self.tag_model_id)
+        emitted = 0
+        try:
+            for text in stream:
+                for key, tag_data in parser.feed(text):
+                    if key != 'tags' or not isinstance(tag_data, dict):
+                        continue
+                    tag = self._to_tag(tag_data)
+                    if tag:
+                        yield tag
+                        emitted += 1
+                        if emitted >= self.max_tags:
+                            return
+                if parser.done:
+                    return
+        finally:
+            stream.close()
+    
+    def _to_tag(self, tag_data: Dict) -> Optional[Dict]:
+        """Convert an LLM tag entry to a tag dict, or None if not in the catalog."""
+        tag = {
+            'tag': tag_data.get('tag', ''),
+            'type': tag_data.get('type', 'category'),
+            'relevance_score': tag_data.get('relevance', 0.5)
+        }
+        if self._is_valid_tag(tag['tag'], tag['type']):
+            return tag
+        return None
+    
+    def _build_tag_prompt(self, query: str, search_results: List[Dict] = None) -> str:
+        """Build the tag generation prompt."""
         # Build context from search results
         results_context = ""
         if search_results:
@@ -288,7 +880,7 @@ Map abstract terms to these concrete attributes when possible."""
         # Build catalog values context
         catalog_context = self._build_tag_catalog_context()
         
-        prompt = f"""You are a furniture search assistant. Generate related search tags for: "{query}"
+        return f"""You are a furniture search assistant. Generate related search tags for: "{query}"
 
 {results_context}
 
@@ -308,36 +900,6 @@ Respond ONLY with valid JSON (no other text):
 
 Valid types: category, price_range, material, style, color
 """
-        
-        try:
-            response = self._invoke_claude(prompt, self.tag_model_id)
-            json_str = self._extract_json(response)
-            data = json.loads(json_str)
-            
-            tags = []
-            for tag_data in data.get('tags', []):
-                tag = {
-                    'tag': tag_data.get('tag', ''),
-                    'type': tag_data.get('type', 'category'),
-                    'relevance_score': tag_data.get('relevance', 0.5)
-                }
-                # Validate against catalog
-                if self._is_valid_tag(tag['tag'], tag['type']):
-                    tags.append(tag)
-            
-            # Ensure within limits
-            tags = tags[:self.max_tags]
-            
-            # Cache result
-            if self.tags_config.get('cache_enabled', True):
-                self.tag_cache.set(query, tags, self.tag_cache_ttl)
-            
-            logger.info(f"Generated {len(tags)} tags for '{query}'")
-            return tags
-            
-        except Exception as e:
-            logger.error(f"Tag generation failed: {e}")
-            return []
     
     def _build_tag_catalog_context(self) -> str:
         """Build catalog values context for tag generation."""
@@ -349,17 +911,5 @@ Colors: {', '.join(self.catalog.get('colors', []))}
 Price Ranges: {', '.join(self.catalog.get('price_ranges', []))}"""
     
     def _is_valid_tag(self, tag: str, tag_type: str) -> bool:
-        """Validate tag against catalog values."""
-        type_map = {
-            'category': 'categories',
-            'price_range': 'price_ranges',
-            'material': 'materials',
-            'style': 'styles',
-            'color': 'colors'
-        }
-        
-        catalog_key = type_map.get(tag_type, 'categories')
-        valid_values = self.catalog.get(catalog_key, [])
-        
-        # Case-insensitive comparison
-        return tag.lower() in [v.lower() for v in valid_values]
+        """Validate tag against catalog values (case-insensitive)."""
+        return self.catalog.is_valid_tag(tag, tag_type)
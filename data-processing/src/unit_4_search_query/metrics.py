@@ -0,0 +1,274 @@
+"""
+Unit 4: Search Metrics
+Low-overhead latency histograms and counters for the search APIs, with
+per-request stage timing (filters, embedding, KNN, BM25, fusion, LLM
+fallback, tags, formatting). Exported by the /metrics endpoint (JSON or
+Prometheus text) and optionally as CloudWatch embedded metric format
+(EMF) log lines.
+"""
+
+import bisect
+import contextvars
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Pattern
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 10000
+)
+
+# Operations timed per stage but kept out of search_latency and EMF
+INTERNAL_OPERATIONS = frozenset({'warmup'})
+
+# Request timer of the request being handled on this thread/context
+_current_timer: contextvars.ContextVar = contextvars.ContextVar('request_timer', default=None)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value_ms: float):
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value_ms)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value_ms
+            if value_ms > self.max:
+                self.max = value_ms
+
+    def percentile(self, q: float) -> float:
+        """Estimated q-quantile (0-1): upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                if index < len(self.buckets):
+                    return min(float(self.buckets[index]), self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        """Count, mean, max and p50/p95/p99 estimates."""
+        with self.lock:
+            if not self.count:
+                return {'count': 0}
+            return {
+                'count': self.count,
+                'mean_ms': round(self.total / self.count, 2),
+                'p50_ms': self.percentile(0.50),
+                'p95_ms': self.percentile(0.95),
+                'p99_ms': self.percentile(0.99),
+                'max_ms': round(self.max, 2)
+            }
+
+
+class RequestTimer:
+    """
+    Stage timings for one request.
+
+    Used as a context manager by MetricsRegistry.request(); stages timed
+    with MetricsRegistry.stage() inside it accumulate here. Stages may
+    nest (llm_fallback includes its re-search), and repeated stages add up.
+    """
+
+    def __init__(self, registry: 'MetricsRegistry', operation: str):
+        self.registry = registry
+        self.operation = operation
+        self.stages: Dict[str, float] = {}
+        self.start = 0.0
+        self.total_ms = 0.0
+        self._token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_timer.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.total_ms = (time.perf_counter() - self.start) * 1000
+        _current_timer.reset(self._token)
+        self.registry.finish_request(self)
+        return False
+
+    def add(self, stage: str, elapsed_ms: float):
+        """Accumulate time spent in a stage."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def breakdown(self) -> Dict[str, float]:
+        """Stage timings in milliseconds (rounded) for debug output."""
+        return {stage: round(ms, 1) for stage, ms in self.stages.items()}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of latency histograms and counters.
+
+    Histograms are keyed '<operation>.<stage>' (e.g. 'text_search.knn')
+    plus 'search_latency' per request and 'embedding_generation_time' per
+    Bedrock call. Counters track the monitoring.metrics counts
+    (search_errors, llm_fallback_count, tag_generation_count).
+
+    Other components can register sources (callables returning a dict of
+    numbers), e.g. connection pool usage or the LLM concurrency limiter's
+    shed counts. Source values are gauges unless their key matches the
+    source's counter pattern (monotonic counts such as pool checkouts).
+
+    Metrics are per process; under gunicorn each worker reports its own.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        monitoring_config = (config or {}).get('monitoring', {})
+        emf_config = monitoring_config.get('emf', {})
+
+        self.debug = monitoring_config.get('debug_timings', False)
+        self.emf_enabled = emf_config.get('enabled', False)
+        self.emf_namespace = emf_config.get('namespace', 'SemanticSearch')
+
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.sources: Dict[str, Callable[[], Dict]] = {}
+        self.source_counters: Dict[str, Pattern] = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Get or create a histogram."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def observe(self, name: str, value_ms: float):
+        """Record a latency observation."""
+        self.histogram(name).observe(value_ms)
+
+    def increment(self, name: str, count: int = 1):
+        """Increment a counter."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def register_source(self, name: str, source: Callable[[], Dict], counters: Optional[Pattern] = None):
+        """
+        Register a callable whose numeric values are exported.
+
+        Args:
+            counters: Keys (full match) that only ever increase; exported to
+                Prometheus as counters with a _total suffix, the rest as gauges
+        """
+        self.sources[name] = source
+        if counters is not None:
+            self.source_counters[name] = counters
+
+    def gauges(self) -> Dict[str, Dict]:
+        """Current values of all registered sources."""
+        return {name: source() for name, source in self.sources.items()}
+
+    def request(self, operation: str) -> RequestTimer:
+        """Start timing a request: `with metrics.request('text_search') as timer:`."""
+        return RequestTimer(self, operation)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the current request (`with metrics.stage('knn'):`)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timer = _current_timer.get()
+            if timer is not None:
+                timer.add(name, elapsed_ms)
+                self.observe(f'{timer.operation}.{name}', elapsed_ms)
+            else:
+                self.observe(name, elapsed_ms)
+
+    def finish_request(self, timer: RequestTimer):
+        """Record a finished request's total latency and emit EMF if enabled."""
+        self.observe(f'{timer.operation}.total', timer.total_ms)
+        if timer.operation in INTERNAL_OPERATIONS:
+            return
+        self.observe('search_latency', timer.total_ms)
+        if self.emf_enabled:
+            self.emit_emf(timer)
+
+    def emit_emf(self, timer: RequestTimer):
+        """Write one CloudWatch embedded metric format line for a request."""
+        values = {f'{stage}_ms': round(ms, 2) for stage, ms in timer.stages.items()}
+        values['search_latency_ms'] = round(timer.total_ms, 2)
+
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.emf_namespace,
+                    'Dimensions': [['Operation']],
+                    'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in values]
+                }]
+            },
+            'Operation': timer.operation,
+            **values
+        }
+        sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+        sys.stdout.flush()
+
+    def snapshot(self) -> Dict:
+        """All histograms and counters as a JSON-serializable dict."""
+        return {
+            'uptime_seconds': int(time.time() - self.started_at),
+            'latency': {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'gauges': self.gauges()
+        }
+
+    def prometheus(self) -> str:
+        """Histograms and counters in Prometheus text exposition format."""
+        lines = [
+            '# TYPE search_stage_latency_ms histogram'
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            with histogram.lock:
+                counts = list(histogram.counts)
+                total, count = histogram.total, histogram.count
+            label = f'name="{name}"'
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'search_stage_latency_ms_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'search_stage_latency_ms_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'search_stage_latency_ms_sum{{{label}}} {total:.3f}')
+            lines.append(f'search_stage_latency_ms_count{{{label}}} {count}')
+
+        with self.lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f'# TYPE {name}_total counter')
+            lines.append(f'{name}_total {value}')
+
+        for source, values in self.gauges().items():
+            counter_keys = self.source_counters.get(source)
+            for name, value in sorted(values.items()):
+                if counter_keys is not None and counter_keys.fullmatch(name):
+                    lines.append(f'# TYPE {name}_total counter')
+                    lines.append(f'{name}_total {value}')
+                else:
+                    lines.append(f'# TYPE {name} gauge')
+                    lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
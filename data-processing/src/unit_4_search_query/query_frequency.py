@@ -0,0 +1,97 @@
+"""
+Unit 4: Query Frequency Tracking
+Bounded-memory frequency estimates for search queries: a count-min sketch
+plus a top-k heavy-hitters set. Used to find Tier-2 (LLM) tag queries that
+are popular enough to promote into the Tier-1 tag index.
+"""
+
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class CountMinSketch:
+    """
+    Count-min sketch: approximate counts in fixed memory.
+
+    Estimates never undercount; they overcount by at most
+    2 * total / width with probability 1 - (1/2)^depth.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8 * self.depth).digest()
+        hashes = np.frombuffer(digest, dtype=np.uint64)
+        return (hashes % self.width).astype(np.intp)
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Add to a key's count and return its new estimate."""
+        columns = self._columns(key)
+        self.table[self._rows, columns] += count
+        return int(self.table[self._rows, columns].min())
+
+    def estimate(self, key: str) -> int:
+        """Estimated count for a key."""
+        return int(self.table[self._rows, self._columns(key)].min())
+
+    def decay(self):
+        """Halve all counts so old popularity fades."""
+        self.table >>= 1
+
+
+class QueryFrequencyTracker:
+    """
+    Thread-safe heavy-hitters tracker over a stream of queries.
+
+    A count-min sketch estimates every query's frequency; the top-k set
+    keeps the most frequent queries. Counts are halved every
+    decay_interval observations so the set follows current traffic.
+    """
+
+    def __init__(self, top_k: int = 1000, width: int = 2048, depth: int = 4,
+                 decay_interval: int = 100000):
+        self.top_k = top_k
+        self.decay_interval = decay_interval
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy_hitters: Dict[str, int] = {}
+        self.observations = 0
+        self.lock = threading.Lock()
+
+    def add(self, query: str) -> Tuple[int, bool]:
+        """
+        Record one occurrence of a query.
+
+        Returns:
+            (estimated count, whether the query is in the top-k set)
+        """
+        with self.lock:
+            self.observations += 1
+            if self.decay_interval and self.observations % self.decay_interval == 0:
+                self.sketch.decay()
+                self.heavy_hitters = {q: c >> 1 for q, c in self.heavy_hitters.items()}
+
+            estimate = self.sketch.add(query)
+
+            if query in self.heavy_hitters or len(self.heavy_hitters) < self.top_k:
+                self.heavy_hitters[query] = estimate
+                return estimate, True
+
+            coldest = min(self.heavy_hitters, key=self.heavy_hitters.get)
+            if estimate > self.heavy_hitters[coldest]:
+                del self.heavy_hitters[coldest]
+                self.heavy_hitters[query] = estimate
+                return estimate, True
+
+            return estimate, False
+
+    def top(self, n: int = 20) -> List[Tuple[str, int]]:
+        """Most frequent queries with estimated counts."""
+        with self.lock:
+            return sorted(self.heavy_hitters.items(), key=lambda x: -x[1])[:n]
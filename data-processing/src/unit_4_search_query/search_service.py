@@ -4,88 +4,180 @@ Main search APIs integrated with Bedrock and OpenSearch.
 Includes Feature 5 (LLM Fallback) and Feature 6 (Related Tags).
 """
 
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 import json
 import logging
 import time
 import re
 from typing import Dict, List, Optional, Tuple
 import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-from .llm_service import ClaudeLLMService
+from .catalog import get_compiled_catalog, parse_price_range
+from .clients import POOL_COUNTER_KEYS, ClientRegistry
+from .llm_service import LIMITER_COUNTER_KEYS, ClaudeLLMService, normalize_query
+from .metrics import MetricsRegistry
+from .tag_index_builder import facet_aggregations
 from .tag_index_service import TagIndexService
 
 logger = logging.getLogger(__name__)
 
+# Catalog keys extracted as structured filters, in filter output order
+FILTER_CATALOG_KEYS = (
+    'colors', 'materials', 'categories', 'sizes',
+    'styles', 'rooms', 'features', 'conditions'
+)
+
+# Product fields a refinement tag filters on, by tag type
+TAG_FILTER_FIELDS = {
+    'category': ('frontend_category', 'frontend_subcategory'),
+    'material': ('material',),
+    'color': ('color_tone',),
+    'style': ('product_name', 'aggregated_text')
+}
+
+
+class CandidateCache:
+    """
+    Recent fused candidate sets per query, for refine-by-tag.
+    
+    Each entry keeps the raw (unformatted) results with the query and
+    embedding that retrieved them. Bounded LRU with a TTL; thread-safe.
+    """
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, query: str) -> Optional[Dict]:
+        """Candidate entry for a query, or None if missing or expired."""
+        key = normalize_query(query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['stored_at'] > self.ttl_seconds:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+    
+    def put(self, query: str, entry: Dict) -> None:
+        """Store a query's candidate entry, evicting the least recently used."""
+        key = normalize_query(query)
+        with self.lock:
+            self.entries[key] = dict(entry, stored_at=time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
 
 class SearchQueryService:
     """Production search service with real AWS integrations."""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, clients: Optional[ClientRegistry] = None,
+                 lazy: bool = False):
+        """
+        Args:
+            config: Service configuration
+            clients: Shared AWS clients (a new registry when omitted)
+            lazy: Defer the LLM and tag index services to first use, so
+                cold starts (Lambda) and image-only requests skip them
+        """
         self.config = config
+        self.clients = clients or ClientRegistry(config)
         
-        # Initialize Bedrock client (use bedrock_region for us-east-1)
-        bedrock_region = config['aws'].get('bedrock_region', config['aws']['region'])
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            region_name=bedrock_region
-        )
+        # Network clients (recreated per worker after fork, see reset_clients)
+        self._create_clients()
         
-        # Initialize OpenSearch client (use main region for ap-southeast-1)
         opensearch_config = config['aws']['opensearch']
-        
-        # SSL configuration (allow disabling for SSH tunnels)
-        verify_certs = opensearch_config.get('verify_certs', True)
-        ssl_show_warn = opensearch_config.get('ssl_show_warn', True)
-        
-        if opensearch_config.get('use_iam_auth', True):
-            credentials = boto3.Session().get_credentials()
-            auth = AWSV4SignerAuth(credentials, config['aws']['region'])
-            
-            self.opensearch_client = OpenSearch(
-                hosts=[{'host': opensearch_config['endpoint'].replace('https://', ''), 
-                       'port': 443}],
-                http_auth=auth,
-                use_ssl=True,
-                verify_certs=verify_certs,
-                ssl_show_warn=ssl_show_warn,
-                connection_class=RequestsHttpConnection
-            )
-        else:
-            # Load credentials from environment variables or config
-            import os
-            username = os.getenv('OPENSEARCH_USERNAME') or opensearch_config.get('username')
-            password = os.getenv('OPENSEARCH_PASSWORD') or opensearch_config.get('password')
-            
-            if not username or not password:
-                raise ValueError("OpenSearch username/password not found in environment or config")
-            
-            self.opensearch_client = OpenSearch(
-                hosts=[opensearch_config['endpoint']],
-                http_auth=(username, password),
-                use_ssl=True,
-                verify_certs=verify_certs,
-                ssl_show_warn=ssl_show_warn
-            )
-        
         self.text_index = opensearch_config['indices']['text_index']
         self.image_index = opensearch_config['indices']['image_index']
         self.text_model_id = config['aws']['bedrock']['text_model_id']
         self.image_model_id = config['aws']['bedrock']['image_model_id']
         
-        # Initialize LLM service for Features 5 & 6
-        self.llm_service = ClaudeLLMService(config)
+        # Batch text search (/search/text/batch)
+        self.batch_config = config['search_query'].get('batch', {})
+        
+        # Latency histograms and counters (/metrics)
+        self.metrics = MetricsRegistry(config)
+        self.metrics.register_source('connection_pools', self.clients.pool_stats, counters=POOL_COUNTER_KEYS)
+        
+        # Feature 6: refine-by-tag filters the original query's candidates
+        self.refine_config = config['search_query'].get('refine', {})
+        self.candidate_cache = None
+        if self.refine_config.get('candidate_cache_size', 1000) > 0:
+            self.candidate_cache = CandidateCache(
+                max_entries=self.refine_config.get('candidate_cache_size', 1000),
+                ttl_seconds=self.refine_config.get('candidate_ttl_seconds', 600)
+            )
+        
+        # Compiled catalog shared with the LLM and tag index services
+        self.catalog = get_compiled_catalog(config)
         
-        # Initialize Tag Index Service for Feature 6 (pre-computed tags)
-        self.tag_index = TagIndexService(config)
+        # LLM service (Features 5 & 6) and tag index (Feature 6), see properties
+        self._llm_service = None
+        self._tag_index = None
+        self._components_lock = threading.Lock()
+        if not lazy:
+            self.llm_service
+            self.tag_index
+        
+        # Feature 6: facet aggregations piggybacked on the retrieval request
+        self.facet_config = config.get('related_tags', {}).get('facet_tags', {})
+        self.facet_aggs = None
+        if self.facet_config.get('enabled', False):
+            self.facet_aggs = facet_aggregations(
+                self.catalog, self.facet_config.get('bucket_size', 20)
+            )
+    
+    @property
+    def llm_service(self) -> ClaudeLLMService:
+        """LLM service for Features 5 & 6 (created on first use when lazy)."""
+        if self._llm_service is None:
+            with self._components_lock:
+                if self._llm_service is None:
+                    llm_service = ClaudeLLMService(self.config, clients=self.clients)
+                    self.metrics.register_source('llm_concurrency', llm_service.get_limiter_stats,
+                                                 counters=LIMITER_COUNTER_KEYS)
+                    self._llm_service = llm_service
+        return self._llm_service
+    
+    @property
+    def tag_index(self) -> TagIndexService:
+        """Pre-computed tag index for Feature 6 (created on first use when lazy)."""
+        if self._tag_index is None:
+            with self._components_lock:
+                if self._tag_index is None:
+                    self._tag_index = TagIndexService(self.config)
+        return self._tag_index
+    
+    def _create_clients(self):
+        """Bind the shared Bedrock and OpenSearch clients."""
+        self.bedrock_client = self.clients.bedrock_client()
+        self.opensearch_client = self.clients.opensearch_client()
+    
+    def reset_clients(self):
+        """
+        Recreate network clients in a forked worker process.
+        
+        Connection pools are not fork-safe; the read-only state built in the
+        master (config, catalog, tag index, caches) is kept and shared
+        copy-on-write.
+        """
+        self.clients.reset()
+        self._create_clients()
+        if self._llm_service is not None:
+            self._llm_service.reset_clients()
     
     def extract_filters(self, query: str) -> Dict:
         """Extract filters from natural language query using config-based patterns."""
         filters = {}
         query_lower = query.lower()
         filter_config = self.config['search_query']['filters']
-        catalog = self.config.get('catalog', {})
         
         # Extract price filters using config patterns
         price_patterns = filter_config.get('price_patterns', [])
@@ -117,70 +209,18 @@ class SearchQueryService:
                     filters['price_max'] = price * (1 + variance)
                     break
         
-        # Extract colors (from unified catalog)
-        colors = catalog.get('colors', [])
-        found_colors = self._match_filter_values(query_lower, colors)
-        if found_colors:
-            filters['colors'] = found_colors
-        
-        # Extract materials (from unified catalog)
-        materials = catalog.get('materials', [])
-        found_materials = self._match_filter_values(query_lower, materials)
-        if found_materials:
-            filters['materials'] = found_materials
-        
-        # Extract categories (from unified catalog)
-        categories = catalog.get('categories', [])
-        found_categories = self._match_filter_values(query_lower, categories)
-        if found_categories:
-            filters['categories'] = found_categories
-        
-        # Extract sizes (from unified catalog)
-        sizes = catalog.get('sizes', [])
-        found_sizes = self._match_filter_values(query_lower, sizes)
-        if found_sizes:
-            filters['sizes'] = found_sizes
-        
-        # Extract styles (from unified catalog)
-        styles = catalog.get('styles', [])
-        found_styles = self._match_filter_values(query_lower, styles)
-        if found_styles:
-            filters['styles'] = found_styles
-        
-        # Extract room types (from unified catalog)
-        rooms = catalog.get('rooms', [])
-        found_rooms = self._match_filter_values(query_lower, rooms)
-        if found_rooms:
-            filters['rooms'] = found_rooms
-        
-        # Extract features (from unified catalog)
-        features = catalog.get('features', [])
-        found_features = self._match_filter_values(query_lower, features)
-        if found_features:
-            filters['features'] = found_features
-        
-        # Extract conditions (from unified catalog)
-        conditions = catalog.get('conditions', [])
-        found_conditions = self._match_filter_values(query_lower, conditions)
-        if found_conditions:
-            filters['conditions'] = found_conditions
+        # Extract catalog values (colors, materials, categories, ...)
+        for key in FILTER_CATALOG_KEYS:
+            found_values = self.catalog.match_values(key, query_lower)
+            if found_values:
+                filters[key] = found_values
         
         return filters
     
-    def _match_filter_values(self, query: str, values: List[str]) -> List[str]:
-        """Match filter values using word boundary matching for accuracy."""
-        found = []
-        for value in values:
-            # Use word boundary matching to avoid partial matches
-            # e.g., "oak" shouldn't match "soaking"
-            pattern = r'\b' + re.escape(value.lower()) + r'\b'
-            if re.search(pattern, query, re.IGNORECASE):
-                found.append(value)
-        return found
-    
     def generate_query_embedding(self, query: str) -> List[float]:
         """Generate embedding for search query using Bedrock."""
         try:
+            start = time.perf_counter()
             body = json.dumps({"inputText": query})
             
             response = self.bedrock_client.invoke_model(
@@ -191,57 +231,74 @@ class SearchQueryService:
             )
             
             response_body = json.loads(response['body'].read())
+            self.metrics.observe('embedding_generation_time', (time.perf_counter() - start) * 1000)
             return response_body.get('embedding', [])
             
         except Exception as e:
             logger.error(f"Error generating query embedding: {str(e)}")
             raise
     
+    def generate_query_embeddings(
+        self,
+        queries: List[str]
+    ) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """
+        Embed several queries with bounded Bedrock concurrency.
+        
+        Duplicate queries are embedded once. Concurrency is capped by
+        search_query.batch.embedding_concurrency to stay under the
+        Bedrock request rate. A failed embedding only fails its query.
+        
+        Returns:
+            (query -> embedding, query -> error message for failed queries)
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        max_workers = min(self.batch_config.get('embedding_concurrency', 8), len(unique_queries))
+        embeddings, errors = {}, {}
+        
+        if max_workers <= 1:
+            for query in unique_queries:
+                try:
+                    embeddings[query] = self.generate_query_embedding(query)
+                except Exception as e:
+                    errors[query] = str(e)
+            return embeddings, errors
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {query: executor.submit(self.generate_query_embedding, query) for query in unique_queries}
+            for query, future in futures.items():
+                try:
+                    embeddings[query] = future.result()
+                except Exception as e:
+                    errors[query] = str(e)
+        return embeddings, errors
+    
     def knn_search(self, query_embedding: List[float], filters: Dict, k: int = 50) -> List[Dict]:
         """Perform KNN search on OpenSearch."""
-        query_body = {
-            "size": k,
-            "query": {
-                "knn": {
-                    "text_embedding": {
-                        "vector": query_embedding,
-                        "k": k
-                    }
-                }
-            }
-        }
+        results, _ = self.knn_search_with_facets(query_embedding, filters, k)
+        return results
+    
+    def knn_search_with_facets(
+        self,
+        query_embedding: List[float],
+        filters: Dict,
+        k: int = 50,
+        aggs: Optional[Dict] = None
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Perform KNN search, optionally with facet aggregations over the hits.
         
-        # Add filters if present
-        if filters:
-            filter_clauses = []
-            
-            if 'price_max' in filters:
-                filter_clauses.append({"range": {"price": {"lte": filters['price_max']}}})
-            
-            if 'price_min' in filters:
-                filter_clauses.append({"range": {"price": {"gte": filters['price_min']}}})
-            
-            if filter_clauses:
-                query_body["query"] = {
-                    "bool": {
-                        "must": [query_body["query"]],
-                        "filter": filter_clauses
-                    }
-                }
+        Returns:
+            (results, facets) where facets is {'aggregations', 'total'} or None
+        """
+        query_body = self._knn_query_body(query_embedding, filters, k, aggs)
         
         try:
             response = self.opensearch_client.search(
                 index=self.text_index,
                 body=query_body
             )
-            
-            results = []
-            for hit in response['hits']['hits']:
-                result = hit['_source']
-                result['score'] = hit['_score']
-                results.append(result)
-            
-            return results
+            return self._parse_hits(response), self._parse_facets(response, aggs)
             
         except Exception as e:
             logger.error(f"Error in KNN search: {str(e)}")
@@ -249,10 +306,72 @@ class SearchQueryService:
     
     def bm25_search(self, query: str, filters: Dict, k: int = 50) -> List[Dict]:
         """Perform BM25 keyword search on OpenSearch."""
+        results, _ = self.bm25_search_with_facets(query, filters, k)
+        return results
+    
+    def bm25_search_with_facets(
+        self,
+        query: str,
+        filters: Dict,
+        k: int = 50,
+        aggs: Optional[Dict] = None
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Perform BM25 search, optionally with facet aggregations over the matches.
+        
+        Returns:
+            (results, facets) where facets is {'aggregations', 'total'} or None
+        """
+        query_body = self._bm25_query_body(query, filters, k, aggs)
+        
+        try:
+            response = self.opensearch_client.search(
+                index=self.text_index,
+                body=query_body
+            )
+            return self._parse_hits(response), self._parse_facets(response, aggs)
+            
+        except Exception as e:
+            logger.error(f"Error in BM25 search: {str(e)}")
+            raise
+    
+    def _knn_query_body(
+        self,
+        query_embedding: List[float],
+        filters: Dict,
+        k: int,
+        aggs: Optional[Dict] = None
+    ) -> Dict:
+        """Build the KNN search request body."""
+        query_body = {
+            "size": k,
+            # Callers (and the refine candidate cache) never read the vector
+            "_source": {"excludes": ["text_embedding"]},
+            "query": {
+                "knn": {
+                    "text_embedding": {
+                        "vector": query_embedding,
+                        "k": k
+                    }
+                }
+            }
+        }
+        return self._apply_filters_and_aggs(query_body, filters, aggs)
+    
+    def _bm25_query_body(
+        self,
+        query: str,
+        filters: Dict,
+        k: int,
+        aggs: Optional[Dict] = None
+    ) -> Dict:
+        """Build the BM25 multi_match request body with field boosts."""
         field_boosts = self.config['search_query']['field_boosts']
         
         query_body = {
             "size": k,
+            # Callers (and the refine candidate cache) never read the vector
+            "_source": {"excludes": ["text_embedding"]},
             "query": {
                 "multi_match": {
                     "query": query,
@@ -268,17 +387,25 @@ class SearchQueryService:
                 }
             }
         }
-        
-        # Add filters
+        return self._apply_filters_and_aggs(query_body, filters, aggs)
+    
+    @staticmethod
+    def _apply_filters_and_aggs(query_body: Dict, filters: Dict, aggs: Optional[Dict]) -> Dict:
+        """Wrap the query with price filter clauses and attach aggregations."""
         if filters:
             filter_clauses = []
             
             if 'price_max' in filters:
-                filter_clauses.append({"range": {"price": {"lte": filters['price_max']}}})
+                # Price range tags are half-open bands: [price_min, price_max)
+                bound = "lt" if filters.get('price_max_exclusive') else "lte"
+                filter_clauses.append({"range": {"price": {bound: filters['price_max']}}})
             
             if 'price_min' in filters:
                 filter_clauses.append({"range": {"price": {"gte": filters['price_min']}}})
             
+            # Structured clauses (e.g. refine-by-tag field filters)
+            filter_clauses.extend(filters.get('clauses', []))
+            
             if filter_clauses:
                 query_body["query"] = {
                     "bool": {
@@ -287,23 +414,34 @@ class SearchQueryService:
                     }
                 }
         
-        try:
-            response = self.opensearch_client.search(
-                index=self.text_index,
-                body=query_body
-            )
-            
-            results = []
-            for hit in response['hits']['hits']:
-                result = hit['_source']
-                result['score'] = hit['_score']
-                results.append(result)
-            
-            return results
-            
-        except Exception as e:
-            logger.error(f"Error in BM25 search: {str(e)}")
-            raise
+        if aggs:
+            query_body["aggs"] = aggs
+        
+        return query_body
+    
+    @staticmethod
+    def _parse_hits(response: Dict) -> List[Dict]:
+        """Convert OpenSearch hits to result dicts with score."""
+        results = []
+        for hit in response['hits']['hits']:
+            result = hit['_source']
+            result.pop('text_embedding', None)
+            result['score'] = hit['_score']
+            results.append(result)
+        return results
+    
+    @staticmethod
+    def _parse_facets(response: Dict, aggs: Optional[Dict]) -> Optional[Dict]:
+        """Extract facet aggregations and the matched document count."""
+        if not aggs:
+            return None
+        total = response['hits'].get('total', 0)
+        if isinstance(total, dict):
+            total = total.get('value', 0)
+        return {
+            'aggregations': response.get('aggregations', {}),
+            'total': total
+        }
     
     def reciprocal_rank_fusion(self, knn_results: List[Dict], 
                                bm25_results: List[Dict], k: int = 60) -> List[Dict]:
@@ -348,6 +486,20 @@ class SearchQueryService:
         Includes Feature 5 (LLM Fallback) and Feature 6 (Related Tags).
         Returns JSON response with search results.
         """
+        with self.metrics.request('text_search') as timer:
+            response = self._text_results(user_search_string)
+            self._record_outcome(response, timer, 'search_metadata')
+        return response
+    
+    def _record_outcome(self, response: Dict, timer, metadata_key: str):
+        """Count failed searches and attach the stage breakdown in debug mode."""
+        if response.get('error_code') == 'SEARCH_FAILED':
+            self.metrics.increment('search_errors')
+        if self.metrics.debug and metadata_key in response:
+            response[metadata_key]['stage_timings_ms'] = timer.breakdown()
+    
+    def _text_results(self, user_search_string: str) -> Dict:
+        """Text search pipeline behind get_text_results()."""
         start_time = time.time()
         
         try:
@@ -360,113 +512,407 @@ class SearchQueryService:
                 }
             
             # Extract filters
-            filters = self.extract_filters(user_search_string)
+            with self.metrics.stage('filters'):
+                filters = self.extract_filters(user_search_string)
             
             # Get search mode
             search_mode = self.config['search_query']['default_search_mode']
             max_results = self.config['search_query']['max_results']
             
             # Perform initial search
-            results, top_score = self._perform_search(
+            results, top_score, query_embedding, facets = self._perform_search(
                 user_search_string, filters, search_mode, max_results
             )
             
-            # Feature 5: LLM Fallback for low-quality results
-            llm_fallback_used = False
-            enhanced_query = None
-            original_query = user_search_string
+            return self._build_text_response(
+                user_search_string, filters, search_mode, max_results,
+                results, top_score, query_embedding, facets, start_time
+            )
             
-            if self.llm_service.should_trigger_fallback(top_score):
-                logger.info(f"Triggering LLM fallback for '{user_search_string}' (score: {top_score})")
-                
-                # Extract intents using Claude
-                intents = self.llm_service.extract_intents(user_search_string)
-                enhanced_query = intents.get('enhanced_query', user_search_string)
-                
-                if enhanced_query != user_search_string:
-                    # Re-search with enhanced query
-                    enhanced_filters = self.extract_filters(enhanced_query)
-                    results, _ = self._perform_search(
-                        enhanced_query, enhanced_filters, search_mode, max_results
-                    )
-                    llm_fallback_used = True
-                    logger.info(f"LLM enhanced query: '{enhanced_query}'")
+        except Exception as e:
+            logger.error(f"Error in get_text_results: {str(e)}")
+            return {
+                "status": "error",
+                "error_code": "SEARCH_FAILED",
+                "message": str(e)
+            }
+    
+    def get_text_results_batch(
+        self,
+        queries: List[str],
+        llm_fallback: bool = True,
+        include_tags: bool = True
+    ) -> Dict:
+        """
+        Batch API: text search results for many queries in one call.
+        
+        Queries are embedded with bounded concurrency, then every query's
+        KNN/BM25 legs go to OpenSearch in a single _msearch request and are
+        fused per query. LLM fallback re-searches still run per query.
+        
+        Args:
+            queries: Search strings
+            llm_fallback: Allow Feature 5 LLM fallback (batch jobs usually disable it)
+            include_tags: Compute Feature 6 related tags
+        
+        Returns:
+            JSON response with one get_text_results-style entry per query, in order
+        """
+        with self.metrics.request('text_batch') as timer:
+            response = self._text_results_batch(queries, llm_fallback, include_tags)
+            self._record_outcome(response, timer, 'batch_metadata')
+        return response
+    
+    def _text_results_batch(self, queries: List[str], llm_fallback: bool,
+                            include_tags: bool) -> Dict:
+        """Batch search pipeline behind get_text_results_batch()."""
+        start_time = time.time()
+        
+        if not queries or not isinstance(queries, list):
+            return {
+                "status": "error",
+                "error_code": "EMPTY_BATCH",
+                "message": "queries must be a non-empty list"
+            }
+        
+        max_batch_size = self.batch_config.get('max_batch_size', 100)
+        if len(queries) > max_batch_size:
+            return {
+                "status": "error",
+                "error_code": "BATCH_TOO_LARGE",
+                "message": f"at most {max_batch_size} queries per batch"
+            }
+        
+        try:
+            search_mode = self.config['search_query']['default_search_mode']
+            max_results = self.config['search_query']['max_results']
+            if search_mode not in ('knn', 'bm25', 'hybrid'):
+                raise ValueError(f"Unknown search mode: {search_mode}")
             
-            # Check if no results after fallback
-            if not results:
-                return {
-                    "status": "error",
-                    "error_code": "NO_RESULTS",
-                    "message": "no results found for query",
-                    "llm_fallback_used": llm_fallback_used,
-                    "enhanced_query": enhanced_query
-                }
+            responses = [None] * len(queries)
+            pending = []
+            for i, query in enumerate(queries):
+                if not isinstance(query, str) or not query.strip():
+                    responses[i] = {
+                        "status": "error",
+                        "error_code": "EMPTY_QUERY",
+                        "message": "empty search query"
+                    }
+                else:
+                    pending.append(i)
             
-            # Format results
-            formatted_results = self._format_results(results)
+            with self.metrics.stage('filters'):
+                filters = {i: self.extract_filters(queries[i]) for i in pending}
+            embeddings = {}
+            if search_mode != 'bm25' and pending:
+                with self.metrics.stage('embedding'):
+                    embeddings, embedding_errors = self.generate_query_embeddings(
+                        [queries[i] for i in pending]
+                    )
+                # Queries whose embedding failed are answered here and skip the msearch
+                for i in pending:
+                    if queries[i] in embedding_errors:
+                        responses[i] = {
+                            "status": "error",
+                            "error_code": "SEARCH_FAILED",
+                            "message": embedding_errors[queries[i]]
+                        }
+                pending = [i for i in pending if queries[i] not in embedding_errors]
             
-            # Feature 6: Generate related tags using two-tier approach
-            related_tags = self.llm_service.generate_related_tags(
-                user_search_string, formatted_results, self.tag_index
-            )
+            with self.metrics.stage('msearch'):
+                legs = self._msearch_legs(
+                    [(queries[i], filters[i], embeddings.get(queries[i])) for i in pending],
+                    search_mode, max_results, self.facet_aggs if include_tags else None
+                )
+            
+            for i, (results, top_score, facets, error) in zip(pending, legs):
+                query = queries[i]
+                if error:
+                    responses[i] = {
+                        "status": "error",
+                        "error_code": "SEARCH_FAILED",
+                        "message": error
+                    }
+                    continue
+                try:
+                    responses[i] = self._build_text_response(
+                        query, filters[i], search_mode, max_results,
+                        results, top_score, embeddings.get(query), facets, start_time,
+                        llm_fallback=llm_fallback, include_tags=include_tags
+                    )
+                except Exception as e:
+                    logger.error(f"Error in batch query '{query}': {str(e)}")
+                    responses[i] = {
+                        "status": "error",
+                        "error_code": "SEARCH_FAILED",
+                        "message": str(e)
+                    }
             
             response_time = int((time.time() - start_time) * 1000)
+            logger.info(f"Batch search: {len(queries)} queries in {response_time}ms")
             
             return {
                 "status": "success",
-                "total_results": len(formatted_results),
-                "results": formatted_results,
-                "related_tags": related_tags,  # Feature 6
-                "search_metadata": {
-                    "query": original_query,
+                "total_queries": len(queries),
+                "responses": responses,
+                "batch_metadata": {
                     "search_mode": search_mode,
-                    "filters_applied": filters,
                     "response_time_ms": response_time,
-                    "llm_fallback_used": llm_fallback_used,  # Feature 5
-                    "enhanced_query": enhanced_query  # Feature 5
+                    "llm_fallback": llm_fallback,
+                    "include_tags": include_tags
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error in get_text_results: {str(e)}")
+            logger.error(f"Error in get_text_results_batch: {str(e)}")
             return {
                 "status": "error",
                 "error_code": "SEARCH_FAILED",
                 "message": str(e)
             }
     
+    def _msearch_legs(
+        self,
+        searches: List[Tuple[str, Dict, Optional[List[float]]]],
+        search_mode: str,
+        max_results: int,
+        aggs: Optional[Dict]
+    ) -> List[Tuple[List[Dict], float, Optional[Dict], Optional[str]]]:
+        """
+        Run the search legs of many queries as one _msearch request.
+        
+        Mirrors _perform_search: facets ride on the KNN leg in knn and
+        hybrid modes and on the BM25 leg in bm25 mode.
+        
+        Args:
+            searches: (query, filters, embedding) per query
+        
+        Returns:
+            (results, top_score, facets, error) per query, in order
+        """
+        if not searches:
+            return []
+        
+        body = []
+        header = {"index": self.text_index}
+        for query, filters, query_embedding in searches:
+            if search_mode in ('knn', 'hybrid'):
+                body.append(header)
+                body.append(self._knn_query_body(query_embedding, filters, max_results, aggs))
+            if search_mode in ('bm25', 'hybrid'):
+                body.append(header)
+                body.append(self._bm25_query_body(
+                    query, filters, max_results, aggs if search_mode == 'bm25' else None
+                ))
+        
+        try:
+            leg_responses = iter(self.opensearch_client.msearch(body=body)['responses'])
+        except Exception as e:
+            logger.error(f"Error in batch msearch: {str(e)}")
+            raise
+        
+        def next_leg(leg_aggs):
+            response = next(leg_responses)
+            if 'error' in response:
+                return None, None, str(response['error'])
+            return self._parse_hits(response), self._parse_facets(response, leg_aggs), None
+        
+        outcomes = []
+        for _ in searches:
+            if search_mode == 'hybrid':
+                knn_results, facets, knn_error = next_leg(aggs)
+                bm25_results, _, bm25_error = next_leg(None)
+                error = knn_error or bm25_error
+                if not error:
+                    rrf_k = self.config['search_query']['rrf']['k']
+                    results = self.reciprocal_rank_fusion(knn_results, bm25_results, rrf_k)
+                    results = results[:max_results]
+            else:
+                results, facets, error = next_leg(aggs)
+            
+            if error:
+                outcomes.append(([], 0.0, None, error))
+                continue
+            top_score = results[0].get('score', 0.0) if results else 0.0
+            outcomes.append((results, top_score, facets, None))
+        
+        return outcomes
+    
+    def _build_text_response(
+        self,
+        user_search_string: str,
+        filters: Dict,
+        search_mode: str,
+        max_results: int,
+        results: List[Dict],
+        top_score: float,
+        query_embedding: Optional[List[float]],
+        facets: Optional[Dict],
+        start_time: float,
+        llm_fallback: bool = True,
+        include_tags: bool = True
+    ) -> Dict:
+        """
+        Turn first-pass search results into the text search response:
+        LLM fallback re-search (Feature 5), formatting and related tags
+        (Feature 6).
+        
+        Args:
+            llm_fallback: Allow the LLM fallback for low-scoring results
+            include_tags: Compute related tags
+        """
+        # Feature 5: LLM Fallback for low-quality results
+        llm_fallback_used = False
+        enhanced_query = None
+        original_query = user_search_string
+        retrieval_query, retrieval_filters = user_search_string, filters
+        
+        if llm_fallback and self.llm_service.should_trigger_fallback(top_score):
+            logger.info(f"Triggering LLM fallback for '{user_search_string}' (score: {top_score})")
+            self.metrics.increment('llm_fallback_count')
+            
+            with self.metrics.stage('llm_fallback'):
+                # Extract intents using Claude (embedding enables the semantic cache)
+                intents = self.llm_service.extract_intents(user_search_string, query_embedding)
+                enhanced_query = intents.get('enhanced_query', user_search_string)
+                
+                if enhanced_query != user_search_string:
+                    # Re-search with enhanced query
+                    enhanced_filters = self.extract_filters(enhanced_query)
+                    results, _, query_embedding, facets = self._perform_search(
+                        enhanced_query, enhanced_filters, search_mode, max_results
+                    )
+                    retrieval_query, retrieval_filters = enhanced_query, enhanced_filters
+                    llm_fallback_used = True
+                    logger.info(f"LLM enhanced query: '{enhanced_query}'")
+        
+        # Check if no results after fallback
+        if not results:
+            return {
+                "status": "error",
+                "error_code": "NO_RESULTS",
+                "message": "no results found for query",
+                "llm_fallback_used": llm_fallback_used,
+                "enhanced_query": enhanced_query
+            }
+        
+        # Keep the fused candidates for refine-by-tag
+        if self.candidate_cache is not None:
+            self.candidate_cache.put(user_search_string, {
+                'results': results,
+                'query': retrieval_query,
+                'filters': retrieval_filters,
+                'query_embedding': query_embedding
+            })
+        
+        # Format results
+        with self.metrics.stage('formatting'):
+            formatted_results = self._format_results(results)
+        
+        related_tags = []
+        if include_tags:
+            self.metrics.increment('tag_generation_count')
+            with self.metrics.stage('tags'):
+                # Feature 6: Facet tags from the result set's aggregations
+                facet_tags = None
+                if facets:
+                    facet_tags = self.tag_index.get_facet_tags(
+                        user_search_string,
+                        facets['aggregations'],
+                        facets['total'],
+                        min_count=self.facet_config.get('min_count', 2)
+                    )
+                
+                # Feature 6: Generate related tags using two-tier approach
+                related_tags = self.llm_service.generate_related_tags(
+                    user_search_string, formatted_results, self.tag_index,
+                    facet_tags=facet_tags
+                )
+        
+        response_time = int((time.time() - start_time) * 1000)
+        
+        return {
+            "status": "success",
+            "total_results": len(formatted_results),
+            "results": formatted_results,
+            "related_tags": related_tags,  # Feature 6
+            "search_metadata": {
+                "query": original_query,
+                "search_mode": search_mode,
+                "filters_applied": filters,
+                "response_time_ms": response_time,
+                "llm_fallback_used": llm_fallback_used,  # Feature 5
+                "enhanced_query": enhanced_query  # Feature 5
+            }
+        }
+    
     def _perform_search(
         self,
         query: str,
         filters: Dict,
         search_mode: str,
-        max_results: int
-    ) -> Tuple[List[Dict], float]:
+        max_results: int,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Dict], float, Optional[List[float]], Optional[Dict]]:
         """
         Perform search and return results with top score.
-        Returns (results, top_score) tuple.
+        Returns (results, top_score, query_embedding, facets) tuple; the
+        embedding is None in bm25 mode, where none is computed, and facets
+        is None unless related_tags.facet_tags is enabled. Facets ride on
+        the KNN request (the semantic result set) in knn and hybrid modes.
+        A query_embedding computed earlier for the same query is reused.
         """
+        facets = None
+        
         if search_mode == 'knn':
-            query_embedding = self.generate_query_embedding(query)
-            results = self.knn_search(query_embedding, filters, max_results)
+            if query_embedding is None:
+                with self.metrics.stage('embedding'):
+                    query_embedding = self.generate_query_embedding(query)
+            with self.metrics.stage('knn'):
+                results, facets = self._knn_leg(query_embedding, filters, max_results)
             
         elif search_mode == 'bm25':
-            results = self.bm25_search(query, filters, max_results)
+            query_embedding = None
+            with self.metrics.stage('bm25'):
+                if self.facet_aggs:
+                    results, facets = self.bm25_search_with_facets(
+                        query, filters, max_results, self.facet_aggs
+                    )
+                else:
+                    results = self.bm25_search(query, filters, max_results)
             
         elif search_mode == 'hybrid':
-            query_embedding = self.generate_query_embedding(query)
-            knn_results = self.knn_search(query_embedding, filters, max_results)
-            bm25_results = self.bm25_search(query, filters, max_results)
-            rrf_k = self.config['search_query']['rrf']['k']
-            results = self.reciprocal_rank_fusion(knn_results, bm25_results, rrf_k)
-            results = results[:max_results]
+            if query_embedding is None:
+                with self.metrics.stage('embedding'):
+                    query_embedding = self.generate_query_embedding(query)
+            with self.metrics.stage('knn'):
+                knn_results, facets = self._knn_leg(query_embedding, filters, max_results)
+            with self.metrics.stage('bm25'):
+                bm25_results = self.bm25_search(query, filters, max_results)
+            with self.metrics.stage('fusion'):
+                rrf_k = self.config['search_query']['rrf']['k']
+                results = self.reciprocal_rank_fusion(knn_results, bm25_results, rrf_k)
+                results = results[:max_results]
         else:
             raise ValueError(f"Unknown search mode: {search_mode}")
         
         # Get top score for fallback decision
         top_score = results[0].get('score', 0.0) if results else 0.0
         
-        return results, top_score
+        return results, top_score, query_embedding, facets
+    
+    def _knn_leg(
+        self,
+        query_embedding: List[float],
+        filters: Dict,
+        max_results: int
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """Run the KNN leg of a search, with facet aggregations when enabled."""
+        if self.facet_aggs:
+            return self.knn_search_with_facets(
+                query_embedding, filters, max_results, self.facet_aggs
+            )
+        return self.knn_search(query_embedding, filters, max_results), None
     
     def _format_results(self, results: List[Dict]) -> List[Dict]:
         """Format search results for API response with complete metadata."""
@@ -519,6 +965,13 @@ class SearchQueryService:
         Main API: Get image similarity search results.
         Returns JSON response with similar products.
         """
+        with self.metrics.request('image_search') as timer:
+            response = self._image_match_result(image_base64)
+            self._record_outcome(response, timer, 'search_metadata')
+        return response
+    
+    def _image_match_result(self, image_base64: str) -> Dict:
+        """Image search pipeline behind get_image_match_result()."""
         start_time = time.time()
         
         try:
@@ -531,17 +984,18 @@ class SearchQueryService:
                 }
             
             # Generate image embedding
-            body = json.dumps({"inputImage": image_base64})
-            
-            response = self.bedrock_client.invoke_model(
-                modelId=self.image_model_id,
-                body=body,
-                contentType='application/json',
-                accept='application/json'
-            )
-            
-            response_body = json.loads(response['body'].read())
-            image_embedding = response_body.get('embedding', [])
+            with self.metrics.stage('embedding'):
+                body = json.dumps({"inputImage": image_base64})
+                
+                response = self.bedrock_client.invoke_model(
+                    modelId=self.image_model_id,
+                    body=body,
+                    contentType='application/json',
+                    accept='application/json'
+                )
+                
+                response_body = json.loads(response['body'].read())
+                image_embedding = response_body.get('embedding', [])
             
             # Perform KNN search on image index
             max_results = self.config['search_query']['max_results']
@@ -558,10 +1012,11 @@ class SearchQueryService:
                 }
             }
             
-            response = self.opensearch_client.search(
-                index=self.image_index,
-                body=query_body
-            )
+            with self.metrics.stage('knn'):
+                response = self.opensearch_client.search(
+                    index=self.image_index,
+                    body=query_body
+                )
             
             results = []
             for hit in response['hits']['hits']:
@@ -577,34 +1032,35 @@ class SearchQueryService:
                 }
             
             # Format results with full product metadata
-            formatted_results = []
-            for rank, result in enumerate(results, 1):
-                formatted_results.append({
-                    "variant_id": result['variant_id'],
-                    "product_id": result.get('product_id', ''),
-                    "product_name": result.get('product_name', ''),
-                    "variant_name": result.get('variant_name', ''),
-                    "description": result.get('description', ''),
-                    "price": result.get('price', 0),
-                    "currency": result.get('currency', 'SGD'),
-                    "image_url": result.get('image_url', ''),
-                    "image_type": result.get('image_type', ''),
-                    "image_position": result.get('image_position', 1),
-                    "is_default": result.get('is_default', False),
-                    "score": round(result.get('score', 0), 4),
-                    "rank": rank,
-                    "frontend_category": result.get('frontend_category', ''),
-                    "frontend_subcategory": result.get('frontend_subcategory', ''),
-                    "backend_category": result.get('backend_category', ''),
-                    "product_type": result.get('product_type', ''),
-                    "review_rating": result.get('review_rating', 0),
-                    "review_count": result.get('review_count', 0),
-                    "stock_status": result.get('stock_status', ''),
-                    "material": result.get('material', ''),
-                    "color_tone": result.get('color_tone', ''),
-                    "collection": result.get('collection', ''),
-                    "variant_url": result.get('variant_url', '')
-                })
+            with self.metrics.stage('formatting'):
+                formatted_results = []
+                for rank, result in enumerate(results, 1):
+                    formatted_results.append({
+                        "variant_id": result['variant_id'],
+                        "product_id": result.get('product_id', ''),
+                        "product_name": result.get('product_name', ''),
+                        "variant_name": result.get('variant_name', ''),
+                        "description": result.get('description', ''),
+                        "price": result.get('price', 0),
+                        "currency": result.get('currency', 'SGD'),
+                        "image_url": result.get('image_url', ''),
+                        "image_type": result.get('image_type', ''),
+                        "image_position": result.get('image_position', 1),
+                        "is_default": result.get('is_default', False),
+                        "score": round(result.get('score', 0), 4),
+                        "rank": rank,
+                        "frontend_category": result.get('frontend_category', ''),
+                        "frontend_subcategory": result.get('frontend_subcategory', ''),
+                        "backend_category": result.get('backend_category', ''),
+                        "product_type": result.get('product_type', ''),
+                        "review_rating": result.get('review_rating', 0),
+                        "review_count": result.get('review_count', 0),
+                        "stock_status": result.get('stock_status', ''),
+                        "material": result.get('material', ''),
+                        "color_tone": result.get('color_tone', ''),
+                        "collection": result.get('collection', ''),
+                        "variant_url": result.get('variant_url', '')
+                    })
             
             response_time = int((time.time() - start_time) * 1000)
             
@@ -630,6 +1086,14 @@ class SearchQueryService:
         """
         Feature 6: Refine search based on selected tag.
         
+        The tag becomes a structured filter (price range, or a field filter
+        for category, material, color and style) applied to the original
+        query's cached candidates. OpenSearch is queried again, reusing the
+        cached embedding, only when the candidates are not cached or fewer
+        than search_query.refine.min_results survive the filter. No LLM
+        fallback or tag generation runs. Tags without a structured filter
+        (unknown type, unparseable price range) search "<query> <tag>".
+        
         Args:
             original_query: The original search query
             tag: The selected tag value (e.g., "Dining Chairs", "Under $1,000")
@@ -638,19 +1102,169 @@ class SearchQueryService:
         Returns:
             Search results refined by the selected tag
         """
-        # Build refined query based on tag type
+        with self.metrics.request('refine') as timer:
+            response = self._refine_results(original_query, tag, tag_type)
+            self._record_outcome(response, timer, 'search_metadata')
+        return response
+    
+    def _refine_results(self, original_query: str, tag: str, tag_type: str) -> Dict:
+        """Refine pipeline behind refine_search_by_tag()."""
+        start_time = time.time()
+        
+        try:
+            if not original_query or not original_query.strip():
+                return {
+                    "status": "error",
+                    "error_code": "EMPTY_QUERY",
+                    "message": "empty search query"
+                }
+            
+            tag_filter = self._tag_filter(tag, tag_type)
+            if tag_filter is None:
+                # No structured filter for this tag: search the combined query
+                return self._text_results(f"{original_query} {tag or ''}".strip())
+            matches, tag_filters = tag_filter
+            
+            search_mode = self.config['search_query']['default_search_mode']
+            max_results = self.config['search_query']['max_results']
+            min_results = self.refine_config.get('min_results', 10)
+            
+            cached = self.candidate_cache.get(original_query) if self.candidate_cache else None
+            results = []
+            if cached:
+                with self.metrics.stage('candidate_filter'):
+                    results = [r for r in cached['results'] if matches(r)]
+            
+            re_retrieved = len(results) < min_results
+            if re_retrieved:
+                query = cached['query'] if cached else original_query
+                base_filters = cached['filters'] if cached else self.extract_filters(query)
+                filters = self._merge_filters(base_filters, tag_filters)
+                results, _, _, _ = self._perform_search(
+                    query, filters, search_mode, max_results,
+                    query_embedding=cached['query_embedding'] if cached else None
+                )
+            else:
+                filters = self._merge_filters(cached['filters'], tag_filters)
+            
+            if not results:
+                return {
+                    "status": "error",
+                    "error_code": "NO_RESULTS",
+                    "message": "no results found for query"
+                }
+            
+            with self.metrics.stage('formatting'):
+                formatted_results = self._format_results(results[:max_results])
+            
+            # Tier-1 tags of the original query (in-memory), minus the clicked one
+            related_tags = []
+            if self.tag_index.has_tags_for_query(original_query):
+                related_tags = [
+                    t for t in self.tag_index.get_tags_for_query(original_query)
+                    if t['tag'].lower() != tag.lower()
+                ]
+            
+            response_time = int((time.time() - start_time) * 1000)
+            
+            return {
+                "status": "success",
+                "total_results": len(formatted_results),
+                "results": formatted_results,
+                "related_tags": related_tags,
+                "search_metadata": {
+                    "query": original_query,
+                    "refinement": {"tag": tag, "tag_type": tag_type},
+                    "search_mode": search_mode,
+                    "filters_applied": filters,
+                    "response_time_ms": response_time,
+                    "candidate_cache_hit": cached is not None,
+                    "re_retrieved": re_retrieved
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in refine_search_by_tag: {str(e)}")
+            return {
+                "status": "error",
+                "error_code": "SEARCH_FAILED",
+                "message": str(e)
+            }
+    
+    def _tag_filter(self, tag: str, tag_type: str) -> Optional[Tuple]:
+        """
+        Structured filter for a refinement tag.
+        
+        Returns:
+            (matches, filters) where matches(result) tests a cached candidate
+            and filters holds price_min/price_max or OpenSearch 'clauses';
+            None for unsupported tags
+        """
+        if not tag or not tag.strip():
+            return None
+        
         if tag_type == 'price_range':
-            # Parse price range and add as filter
-            refined_query = f"{original_query} {tag}"
-        elif tag_type == 'category':
-            # Add category to query
-            refined_query = f"{tag} {original_query}"
+            band = parse_price_range(tag)
+            if band is None:
+                return None
+            low, high = band
+            filters = {}
+            if low > 0:
+                filters['price_min'] = low
+            if high != float('inf'):
+                filters['price_max'] = high
+                filters['price_max_exclusive'] = True
+            
+            def matches(result: Dict) -> bool:
+                try:
+                    return low <= float(result.get('price')) < high
+                except (TypeError, ValueError):
+                    return False
+            
+            return matches, filters
+        
+        fields = TAG_FILTER_FIELDS.get(tag_type)
+        if not fields:
+            return None
+        tag_lower = tag.strip().lower()
+        
+        if tag_type == 'category':
+            clause = {"bool": {
+                "should": [
+                    {"term": {field: {"value": tag.strip(), "case_insensitive": True}}}
+                    for field in fields
+                ],
+                "minimum_should_match": 1
+            }}
+            
+            def matches(result: Dict) -> bool:
+                return any(str(result.get(f) or '').lower() == tag_lower for f in fields)
         else:
-            # Add attribute to query
-            refined_query = f"{original_query} {tag}"
+            if tag_type == 'style':
+                # Style only appears in free text
+                clause = {"multi_match": {"query": tag.strip(), "fields": list(fields), "type": "phrase"}}
+            else:
+                # Keyword values like "Performance Fabric" contain the catalog value
+                clause = {"wildcard": {fields[0]: {"value": f"*{tag.strip()}*", "case_insensitive": True}}}
+            
+            def matches(result: Dict) -> bool:
+                return any(tag_lower in str(result.get(f) or '').lower() for f in fields)
         
-        # Perform search with refined query
-        return self.get_text_results(refined_query)
+        return matches, {'clauses': [clause]}
+    
+    @staticmethod
+    def _merge_filters(filters: Dict, tag_filters: Dict) -> Dict:
+        """Combine query filters with tag filters (the narrower price bound wins)."""
+        merged = dict(filters)
+        if 'price_min' in tag_filters:
+            merged['price_min'] = max(merged.get('price_min', tag_filters['price_min']), tag_filters['price_min'])
+        if 'price_max' in tag_filters and tag_filters['price_max'] <= merged.get('price_max', float('inf')):
+            # On a tie the band's exclusive bound is the narrower one
+            merged['price_max'] = tag_filters['price_max']
+            merged['price_max_exclusive'] = tag_filters.get('price_max_exclusive', False)
+        if tag_filters.get('clauses'):
+            merged['clauses'] = list(merged.get('clauses', [])) + tag_filters['clauses']
+        return merged
 
 
 def main():
@@ -0,0 +1,138 @@
+"""
+Unit 4: API Response Serialization
+Fast JSON encoding (orjson when installed) and Accept-Encoding based
+gzip/brotli compression for search responses, shared by the Flask app
+and the Lambda handler.
+"""
+
+import gzip
+import json
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+
+def _default(obj):
+    """Encode NumPy values the JSON encoders do not know about."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {encoding: q-value}."""
+    encodings = {}
+    for token in (header or '').split(','):
+        parts = token.strip().split(';')
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+class ResponseEncoder:
+    """
+    Serialize API responses to JSON bytes and compress them when the
+    client accepts it and the body is large enough to benefit.
+
+    Configured by the api_response section of config.yaml:
+        serializer: auto (orjson when installed) or json
+        compression: enabled, min_size_bytes, gzip_level, brotli_quality
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        response_config = (config or {}).get('api_response', {})
+        self.use_orjson = orjson is not None and response_config.get('serializer', 'auto') != 'json'
+
+        compression_config = response_config.get('compression', {})
+        self.compression_enabled = compression_config.get('enabled', True)
+        self.min_size = compression_config.get('min_size_bytes', 1024)
+        self.gzip_level = compression_config.get('gzip_level', 6)
+        self.brotli_quality = compression_config.get('brotli_quality', 4)
+
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def dumps(self, obj) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes."""
+        if self.use_orjson:
+            return orjson.dumps(
+                obj, default=_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+    def choose_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Best supported content encoding for an Accept-Encoding header, or None."""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get('*', 0.0)
+
+        best, best_q = None, 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.encodings:
+                continue
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a body with the given content encoding."""
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def encode(self, obj, accept_encoding: Optional[str] = None) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Serialize and (when worthwhile) compress a response.
+
+        Args:
+            obj: Response payload
+            accept_encoding: Client Accept-Encoding header
+
+        Returns:
+            (body bytes, headers) where headers carry Content-Type and, for
+            compressed bodies, Content-Encoding and Vary
+        """
+        body = self.dumps(obj)
+        headers = {'Content-Type': 'application/json'}
+
+        if not self.compression_enabled:
+            return body, headers
+
+        headers['Vary'] = 'Accept-Encoding'
+        if len(body) < self.min_size:
+            return body, headers
+
+        encoding = self.choose_encoding(accept_encoding)
+        if encoding:
+            body = self.compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+        return body, headers
@@ -0,0 +1,336 @@
+"""
+Unit 4: Tag Index Builder for Feature 6
+Derives Tier-1 related tags from the indexed product catalog instead of
+hand-written maps. Counts how often categories, materials, colors, styles
+and price bands co-occur on real products and writes a compact artifact
+that TagIndexService loads at startup (related_tags.tag_index_path).
+"""
+
+import json
+import logging
+import math
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .catalog import CompiledCatalog
+
+logger = logging.getLogger(__name__)
+
+# Version of the tag index artifact written by build_tag_index.py
+TAG_INDEX_FORMAT_VERSION = 1
+
+# Tags kept per anchor, by type, before sorting by relevance
+TAG_QUOTAS = (
+    ('category', 3),
+    ('material', 2),
+    ('style', 2),
+    ('color', 2),
+    ('price_range', 1)
+)
+
+# Product fields aggregated in OpenSearch mode (style has no keyword field)
+FACET_FIELDS = {
+    'category': 'frontend_category',
+    'subcategory': 'frontend_subcategory',
+    'material': 'material',
+    'color': 'color_tone'
+}
+
+
+def _clean(value) -> Optional[str]:
+    """Return a stripped string value, or None for missing/NaN values."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    text = str(value).strip()
+    if not text or text.lower() in ('nan', 'none', 'null'):
+        return None
+    return text
+
+
+def category_tag(catalog: CompiledCatalog, value) -> Optional[str]:
+    """Canonical category spelling (catalog spelling when known)."""
+    value = _clean(value)
+    if not value:
+        return None
+    return catalog.canonicalize('categories', value) or value
+
+
+def catalog_tags(catalog: CompiledCatalog, catalog_key: str, value) -> List[str]:
+    """Catalog values mentioned in a free-text product field."""
+    value = _clean(value)
+    if not value:
+        return []
+    return catalog.match_values(catalog_key, value.lower())
+
+
+def bucket_tags(catalog: CompiledCatalog, facet_name: str, key) -> List[Tuple[str, str]]:
+    """Map a raw terms bucket key for a FACET_FIELDS facet to (tag_type, tag) pairs."""
+    if facet_name in ('category', 'subcategory'):
+        category = category_tag(catalog, key)
+        return [('category', category)] if category else []
+    if facet_name == 'material':
+        return [('material', m) for m in catalog_tags(catalog, 'materials', key)]
+    return [('color', c) for c in catalog_tags(catalog, 'colors', key)]
+
+
+def facet_aggregations(catalog: CompiledCatalog, size: int = 200) -> Dict:
+    """Terms aggregations over FACET_FIELDS plus a price band range aggregation."""
+    aggs = {
+        name: {'terms': {'field': field, 'size': size}}
+        for name, field in FACET_FIELDS.items()
+    }
+    aggs['price'] = {
+        'range': {
+            'field': 'price',
+            'ranges': [
+                {'key': f'{low}-{high}', 'from': low, **({'to': high} if high != float('inf') else {})}
+                for low, high, _ in catalog.price_segments()
+            ]
+        }
+    }
+    return aggs
+
+
+def count_facets(aggregations: Dict, catalog: CompiledCatalog) -> Counter:
+    """Count (tag_type, tag) documents from facet_aggregations() buckets."""
+    segment_labels = {
+        f'{low}-{high}': label for low, high, label in catalog.price_segments()
+    }
+
+    counts = Counter()
+    for facet_name in FACET_FIELDS:
+        for bucket in aggregations.get(facet_name, {}).get('buckets', []):
+            for tag in bucket_tags(catalog, facet_name, bucket['key']):
+                counts[tag] += bucket['doc_count']
+
+    for bucket in aggregations.get('price', {}).get('buckets', []):
+        label = segment_labels.get(bucket['key'])
+        if label and bucket['doc_count']:
+            counts[('price_range', label)] += bucket['doc_count']
+
+    return counts
+
+
+def select_tags(tag_counts: Counter, total: int, min_count: int) -> List[Dict]:
+    """
+    Pick the most frequent tags per type (TAG_QUOTAS).
+
+    Args:
+        tag_counts: (tag_type, tag) -> product count
+        total: Number of products the counts are relative to
+        min_count: Minimum count for a tag to be kept
+
+    Returns:
+        Tag dicts with relevance_score (share of products) and count,
+        sorted by relevance
+    """
+    by_type = defaultdict(list)
+    for (tag_type, tag), count in tag_counts.items():
+        if count >= min_count:
+            by_type[tag_type].append((count, tag))
+
+    tags = []
+    for tag_type, quota in TAG_QUOTAS:
+        ranked = sorted(by_type.get(tag_type, []), key=lambda x: (-x[0], x[1]))
+        for count, tag in ranked[:quota]:
+            tags.append({
+                'tag': tag,
+                'type': tag_type,
+                'relevance_score': round(count / total, 3) if total else 0.0,
+                'count': count
+            })
+
+    tags.sort(key=lambda x: (-x['relevance_score'], x['tag']))
+    return tags
+
+
+class TagCooccurrence:
+    """
+    Co-occurrence counts between anchors (query keys) and tag facets.
+
+    Anchors are lowercase category names (category_tags) and lowercase
+    material/color/style values (query_pattern_tags). Each anchor counts
+    the (tag_type, tag) facets seen on the same products.
+    """
+
+    def __init__(self, catalog: CompiledCatalog):
+        self.catalog = catalog
+        self.totals: Counter = Counter()
+        self.pairs: Dict[str, Counter] = defaultdict(Counter)
+        self.category_anchors: Set[str] = set()
+        self.product_count = 0
+
+    def product_facets(self, product: Dict) -> List[Tuple[str, str]]:
+        """Extract (tag_type, tag) facets from one product document."""
+        facets = []
+
+        for field in ('frontend_category', 'frontend_subcategory'):
+            category = category_tag(self.catalog, product.get(field))
+            if category:
+                facets.append(('category', category))
+
+        for material in catalog_tags(self.catalog, 'materials', product.get('material')):
+            facets.append(('material', material))
+
+        for color in catalog_tags(self.catalog, 'colors', product.get('color_tone')):
+            facets.append(('color', color))
+
+        style_text = ' '.join(
+            _clean(product.get(field)) or '' for field in ('product_name', 'aggregated_text')
+        )
+        for style in catalog_tags(self.catalog, 'styles', style_text):
+            facets.append(('style', style))
+
+        try:
+            price = float(product.get('price'))
+        except (TypeError, ValueError):
+            price = float('nan')
+        if not math.isnan(price):
+            band = self.catalog.price_band(price)
+            if band:
+                facets.append(('price_range', band))
+
+        # Deduplicate, keeping first occurrence order
+        return list(dict.fromkeys(facets))
+
+    def add(self, anchor: str, facets, weight: int = 1, is_category: bool = False):
+        """
+        Count facets co-occurring with an anchor.
+
+        Args:
+            anchor: Anchor value (category, material, color or style)
+            facets: (tag_type, tag) pairs of one product, or a Counter of
+                    pair -> count for pre-aggregated buckets
+            weight: Number of products the anchor total grows by
+            is_category: Whether the anchor is a category key
+        """
+        anchor = anchor.lower()
+        self.totals[anchor] += weight
+        if is_category:
+            self.category_anchors.add(anchor)
+        facet_counts = facets if isinstance(facets, Counter) else Counter(facets)
+        for (tag_type, tag), count in facet_counts.items():
+            if tag.lower() != anchor:
+                self.pairs[anchor][(tag_type, tag)] += count
+
+    def add_product(self, product: Dict):
+        """Count one product under every anchor it belongs to."""
+        facets = self.product_facets(product)
+        if not facets:
+            return
+        self.product_count += 1
+
+        for tag_type, tag in facets:
+            if tag_type == 'price_range':
+                continue
+            self.add(tag, facets, is_category=(tag_type == 'category'))
+
+    def to_index(self, min_count: int = 3) -> Dict:
+        """
+        Build the TagIndexService index from the counts.
+
+        Args:
+            min_count: Minimum co-occurrence count for a tag to be suggested
+
+        Returns:
+            Dict with category_tags, query_pattern_tags and term_to_tags
+        """
+        category_tags = {}
+        query_pattern_tags = {}
+
+        for anchor, total in self.totals.items():
+            tags = select_tags(self.pairs.get(anchor, Counter()), total, min_count)
+            if not tags:
+                continue
+            if anchor in self.category_anchors:
+                category_tags[anchor] = tags
+            else:
+                query_pattern_tags[anchor] = tags
+
+        term_to_tags = {}
+        for anchor, tags in list(category_tags.items()) + list(query_pattern_tags.items()):
+            term_to_tags.setdefault(anchor, set()).update(tag['tag'] for tag in tags)
+
+        return {
+            'category_tags': category_tags,
+            'query_pattern_tags': query_pattern_tags,
+            'term_to_tags': {k: sorted(v) for k, v in term_to_tags.items()}
+        }
+
+
+def build_from_products(products: Iterable[Dict], catalog: CompiledCatalog) -> TagCooccurrence:
+    """Count co-occurrences from product documents (e.g. products_with_embeddings.json)."""
+    counts = TagCooccurrence(catalog)
+    for product in products:
+        counts.add_product(product)
+    logger.info(f"Counted tag co-occurrences for {counts.product_count} products "
+                f"({len(counts.totals)} anchors)")
+    return counts
+
+
+def build_aggregation_query(catalog: CompiledCatalog, size: int = 200) -> Dict:
+    """OpenSearch aggregation request counting facets per category, material and color."""
+    facet_aggs = facet_aggregations(catalog, size)
+    return {
+        'size': 0,
+        'aggs': {
+            f'by_{name}': {'terms': {'field': FACET_FIELDS[name], 'size': size}, 'aggs': facet_aggs}
+            for name in FACET_FIELDS
+        }
+    }
+
+
+def build_from_aggregations(client, index_name: str, catalog: CompiledCatalog,
+                            size: int = 200) -> TagCooccurrence:
+    """
+    Count co-occurrences with OpenSearch aggregations over the text index.
+
+    Equivalent to build_from_products without pulling documents, except
+    that styles are not counted (style is only present in free text).
+    """
+    response = client.search(index=index_name, body=build_aggregation_query(catalog, size))
+    aggregations = response.get('aggregations', {})
+
+    counts = TagCooccurrence(catalog)
+    counts.product_count = response.get('hits', {}).get('total', {}).get('value', 0)
+
+    for name in FACET_FIELDS:
+        for bucket in aggregations.get(f'by_{name}', {}).get('buckets', []):
+            facets = count_facets(bucket, catalog)
+            for tag_type, anchor in bucket_tags(catalog, name, bucket['key']):
+                counts.add(anchor, facets, weight=bucket['doc_count'],
+                           is_category=(tag_type == 'category'))
+
+    logger.info(f"Counted tag co-occurrences from aggregations on {index_name} "
+                f"({len(counts.totals)} anchors)")
+    return counts
+
+
+def write_tag_index(output_path: str, index: Dict, catalog: CompiledCatalog,
+                    product_count: int, source: str) -> str:
+    """Write the versioned tag index artifact atomically. Returns the version."""
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    artifact = {
+        'format_version': TAG_INDEX_FORMAT_VERSION,
+        'version': version,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'source': source,
+        'catalog_version': catalog.version,
+        'product_count': product_count,
+        **index
+    }
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_suffix(output.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(artifact, f, separators=(',', ':'))
+    os.replace(tmp_path, output)
+
+    logger.info(f"✓ Wrote tag index version {version} to {output} "
+                f"({len(index['category_tags'])} categories, "
+                f"{len(index['query_pattern_tags'])} patterns)")
+    return version
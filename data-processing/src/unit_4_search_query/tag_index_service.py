@@ -4,15 +4,63 @@ This service pre-generates tags for common query patterns and product categories
 to avoid LLM calls during search queries.
 """
 
+import gzip
 import json
 import logging
-from typing import Dict, List, Set
-from collections import defaultdict
-from dataclasses import dataclass
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from enum import Enum
 
+from .catalog import get_compiled_catalog
+from .tag_index_builder import TAG_INDEX_FORMAT_VERSION, count_facets, select_tags
+from .llm_service import load_warm_cache, normalize_query
+from .query_frequency import QueryFrequencyTracker
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: overlay saves are then unlocked
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Trie node key marking the end of an index key phrase (never a token)
+_TERMINAL = ''
+
+# Maximum memoized merged tag lists for multi-key queries
+MERGED_TAGS_CACHE_SIZE = 4096
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens (keeps "2-seater", "mid-century")."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def stem_term(token: str) -> str:
+    """
+    Light stemming with plural folding.
+    
+    "sofas" -> "sofa", "benches" -> "bench", "shelves" -> "shelf",
+    "accessories" -> "accessory"; "glass" and short tokens are unchanged.
+    """
+    if len(token) <= 3 or not token.endswith('s') or token.endswith(('ss', 'us', 'is')):
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        return token[:-3] + 'y'
+    if token.endswith('ves') and len(token) > 4:
+        return token[:-3] + 'f'
+    if token.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return token[:-2]
+    return token[:-1]
+
 
 class TagType(Enum):
     """Tag types for search refinement"""
@@ -32,6 +80,271 @@ class SearchTag:
     count: int = None
 
 
+def read_index_file(filepath: str) -> Dict:
+    """Read a tag index snapshot (plain or gzip-compressed JSON)."""
+    opener = gzip.open if filepath.endswith('.gz') else open
+    with opener(filepath, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_index_file(filepath: str, index_data: Dict):
+    """
+    Write a tag index snapshot atomically (gzip-compressed for .gz paths).
+    Each writer uses its own temporary file, so concurrent writers never
+    interleave or replace each other's partial output.
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(filepath) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            if filepath.endswith('.gz'):
+                with gzip.open(raw, 'wt', encoding='utf-8') as f:
+                    json.dump(index_data, f, separators=(',', ':'))
+            else:
+                raw.write(json.dumps(index_data, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def check_format_version(index_data: Dict, source: str):
+    """Reject tag index artifacts written in a format this version cannot read."""
+    if index_data.get('format_version') != TAG_INDEX_FORMAT_VERSION:
+        raise ValueError(f"Unsupported tag index format {index_data.get('format_version')!r} "
+                         f"in {source} (expected {TAG_INDEX_FORMAT_VERSION})")
+
+
+@dataclass(frozen=True)
+class TagIndexSnapshot:
+    """
+    Immutable tag index state.
+    
+    Request threads read one snapshot reference per lookup; reloads build a
+    complete new snapshot off to the side and swap the reference, so a
+    lookup never sees a half-loaded index.
+    """
+    category_tags: Dict[str, List[Dict]]
+    query_pattern_tags: Dict[str, List[Dict]]
+    term_to_tags: Dict[str, Set[str]]
+    query_tags: Dict[str, List[Dict]]
+    version: str
+    source: str
+    loaded_at: float = field(default_factory=time.time)
+    phrase_trie: Dict = field(default_factory=dict)
+    merged_tags: Dict[Tuple, List[Dict]] = field(default_factory=dict)
+    
+    @classmethod
+    def create(
+        cls,
+        category_tags: Dict[str, List[Dict]],
+        query_pattern_tags: Dict[str, List[Dict]],
+        term_to_tags: Dict[str, Set[str]],
+        query_tags: Dict[str, List[Dict]],
+        version: str,
+        source: str
+    ) -> 'TagIndexSnapshot':
+        """
+        Build a snapshot with its phrase trie and per-key tag lists.
+        
+        Keys are folded the same way as query tokens, so "sofas" matches the
+        pattern "sofa" and "coffee table" matches the category "coffee tables".
+        """
+        snapshot = cls(
+            category_tags=category_tags,
+            query_pattern_tags=query_pattern_tags,
+            term_to_tags=term_to_tags,
+            query_tags=query_tags,
+            version=version,
+            source=source
+        )
+        
+        for source_name, index in (('category', category_tags), ('pattern', query_pattern_tags)):
+            for key in index:
+                tokens = [stem_term(t) for t in tokenize(key)]
+                if not tokens:
+                    continue
+                node = snapshot.phrase_trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(_TERMINAL, []).append((source_name, key))
+                
+                # Precompute single-key lists (the common case)
+                snapshot.merged_tags[((source_name, key),)] = snapshot.merge_tags([(source_name, key)])
+        
+        return snapshot
+    
+    def match_keys(self, query: str) -> Tuple:
+        """
+        Find index keys in a query by longest phrase match.
+        
+        Returns:
+            Tuple of (source, key) pairs in query order, source being
+            'category' or 'pattern'
+        """
+        tokens = [stem_term(t) for t in tokenize(query)]
+        matched = []
+        i = 0
+        while i < len(tokens):
+            node = self.phrase_trie
+            end = None
+            keys = None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    end, keys = j + 1, node[_TERMINAL]
+            
+            if keys:
+                for key in keys:
+                    if key not in matched:
+                        matched.append(key)
+                i = end
+            else:
+                i += 1
+        
+        return tuple(matched)
+    
+    def merge_tags(self, keys) -> List[Dict]:
+        """Merge tags for matched keys: category tags first, dedupe, sort by relevance."""
+        all_tags = []
+        seen_tags = set()
+        
+        for wanted, index in (('category', self.category_tags), ('pattern', self.query_pattern_tags)):
+            for source, key in keys:
+                if source != wanted:
+                    continue
+                for tag in index.get(key, []):
+                    if tag['tag'] not in seen_tags:
+                        all_tags.append(tag)
+                        seen_tags.add(tag['tag'])
+        
+        all_tags.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return all_tags
+    
+    def tags_for_keys(self, keys: Tuple) -> List[Dict]:
+        """Merged, pre-sorted tag list for a key set (precomputed or memoized)."""
+        merged = self.merged_tags.get(keys)
+        if merged is None:
+            merged = self.merge_tags(keys)
+            if len(self.merged_tags) < MERGED_TAGS_CACHE_SIZE:
+                self.merged_tags[keys] = merged
+        return merged
+    
+    def to_dict(self) -> Dict:
+        """Serializable snapshot contents (compact export format)."""
+        return {
+            'format_version': TAG_INDEX_FORMAT_VERSION,
+            'version': self.version,
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'source': self.source,
+            'category_tags': self.category_tags,
+            'query_pattern_tags': self.query_pattern_tags,
+            'term_to_tags': {k: sorted(v) for k, v in self.term_to_tags.items()},
+            'query_tags': self.query_tags
+        }
+
+
+class PromotedTagOverlay:
+    """
+    Size-capped LRU overlay of LLM tag results promoted into Tier 1.
+    
+    Entries are whole normalized queries. Lookups refresh recency; when
+    full, the least recently used entry is evicted. The overlay is
+    persisted as JSON so promotions survive restarts and can be shared
+    between workers (merged from disk on reload).
+    """
+    
+    def __init__(self, max_entries: int = 2000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        # mtime_ns of the file this process last wrote (its watcher skips it)
+        self.saved_mtime_ns: Optional[int] = None
+        self.merge_from_disk()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, query: str) -> bool:
+        return query in self.entries
+    
+    def get(self, query: str) -> Optional[List[Dict]]:
+        """Promoted tags for a normalized query (refreshes recency)."""
+        entry = self.entries.get(query)
+        if entry is None:
+            return None
+        with self.lock:
+            if query in self.entries:
+                self.entries.move_to_end(query)
+                entry['last_used'] = time.time()
+        return entry['tags']
+    
+    def put(self, query: str, tags: List[Dict], count: int):
+        """Promote tags for a query, evicting the coldest entries when full."""
+        with self.lock:
+            self.entries[query] = {
+                'tags': tags,
+                'count': count,
+                'promoted_at': time.time(),
+                'last_used': time.time()
+            }
+            self.entries.move_to_end(query)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def merge_from_disk(self):
+        """Merge entries persisted by this or other workers (most recent use wins)."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            stored = read_index_file(self.path).get('entries', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable promoted tag overlay {self.path}: {str(e)}")
+            return
+        
+        with self.lock:
+            for query, entry in stored.items():
+                current = self.entries.get(query)
+                if current is None or entry.get('last_used', 0) > current.get('last_used', 0):
+                    self.entries[query] = entry
+            ordered = sorted(self.entries.items(), key=lambda item: item[1].get('last_used', 0))
+            self.entries = OrderedDict(ordered[-self.max_entries:])
+    
+    def save(self):
+        """
+        Persist the overlay atomically.
+        
+        Under an exclusive lock on <path>.lock, entries saved by other
+        workers are merged in first, so no worker's promotions are lost.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.merge_from_disk()
+                with self.lock:
+                    data = {'entries': dict(self.entries)}
+                write_index_file(self.path, data)
+                self.saved_mtime_ns = os.stat(self.path).st_mtime_ns
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
 class TagIndexService:
     """
     Pre-compute and index tags for fast retrieval.
@@ -45,33 +358,99 @@ class TagIndexService:
     
     def __init__(self, config: Dict):
         self.config = config
-        self.catalog_values = config.get('related_tags', {}).get('catalog_values', {})
-        
-        # Pre-computed tag index
-        self.category_tags: Dict[str, List[Dict]] = {}
-        self.query_pattern_tags: Dict[str, List[Dict]] = {}
-        self.term_to_tags: Dict[str, Set[str]] = defaultdict(set)
-        
-        # Initialize index
-        self._build_tag_index()
+        self.catalog = get_compiled_catalog(config)
+        
+        # Index sources: data-driven artifact from build_tag_index.py when
+        # available (otherwise built-in seed patterns), plus whole-query tags
+        # precomputed offline from query logs
+        self.tag_index_path = config.get('related_tags', {}).get('tag_index_path')
+        self.warm_cache_path = config.get('llm_precompute', {}).get('warm_cache_path')
+        
+        # Current immutable snapshot; replaced atomically on reload
+        self._reload_lock = threading.Lock()
+        self._watcher_stop: Optional[threading.Event] = None
+        self._state = self._build_state()
+        
+        # Popular Tier-2 (LLM) queries promoted into Tier 1
+        promotion_config = config.get('related_tags', {}).get('promotion', {})
+        self.promotion_enabled = promotion_config.get('enabled', False)
+        self.promotion_min_count = promotion_config.get('min_count', 5)
+        self.frequency_tracker = QueryFrequencyTracker(
+            top_k=promotion_config.get('top_k', 1000),
+            width=promotion_config.get('sketch_width', 2048),
+            depth=promotion_config.get('sketch_depth', 4)
+        )
+        self.promoted = PromotedTagOverlay(
+            max_entries=promotion_config.get('max_entries', 2000),
+            path=promotion_config.get('overlay_path') if self.promotion_enabled else None
+        )
+    
+    # Read-only views of the current snapshot
+    @property
+    def category_tags(self) -> Dict[str, List[Dict]]:
+        return self._state.category_tags
+    
+    @property
+    def query_pattern_tags(self) -> Dict[str, List[Dict]]:
+        return self._state.query_pattern_tags
+    
+    @property
+    def term_to_tags(self) -> Dict[str, Set[str]]:
+        return self._state.term_to_tags
+    
+    @property
+    def query_tags(self) -> Dict[str, List[Dict]]:
+        return self._state.query_tags
     
-    def _build_tag_index(self):
-        """Build pre-computed tag index from catalog values."""
+    def _build_state(self) -> TagIndexSnapshot:
+        """Build a complete snapshot from the configured sources."""
+        if self.tag_index_path and os.path.exists(self.tag_index_path):
+            index_data = read_index_file(self.tag_index_path)
+            check_format_version(index_data, self.tag_index_path)
+            category_tags = index_data['category_tags']
+            query_pattern_tags = index_data['query_pattern_tags']
+            term_to_tags = {k: set(v) for k, v in index_data['term_to_tags'].items()}
+            query_tags = dict(index_data.get('query_tags', {}))
+            version = index_data.get('version', 'unversioned')
+            source = self.tag_index_path
+        else:
+            category_tags, query_pattern_tags, term_to_tags = self._build_tag_index()
+            query_tags = {}
+            version = f"seed-{self.catalog.version}"
+            source = 'seed'
+        
+        warm_cache = load_warm_cache(self.warm_cache_path)
+        query_tags.update(warm_cache['tags'])
+        if warm_cache['tags']:
+            version = f"{version}+warm-{warm_cache['version']}"
+        
+        return TagIndexSnapshot.create(
+            category_tags, query_pattern_tags, term_to_tags, query_tags, version, source
+        )
+    
+    def _build_tag_index(self) -> Tuple[Dict, Dict, Dict]:
+        """
+        Build pre-computed tag index from catalog values.
+        
+        Returns:
+            (category_tags, query_pattern_tags, term_to_tags)
+        """
         logger.info("Building tag index...")
         
         # 1. Category-based tags
-        categories = self.catalog_values.get('categories', [])
-        for category in categories:
-            self.category_tags[category.lower()] = self._generate_category_tags(category)
+        category_tags = {}
+        for category in self.catalog.get('categories'):
+            category_tags[category.lower()] = self._generate_category_tags(category)
         
         # 2. Common query patterns
-        self._build_query_pattern_index()
+        query_pattern_tags = self._build_query_pattern_index()
         
         # 3. Build term-to-tags inverted index
-        self._build_inverted_index()
+        term_to_tags = self._build_inverted_index(category_tags, query_pattern_tags)
         
-        logger.info(f"Tag index built: {len(self.category_tags)} categories, "
-                   f"{len(self.query_pattern_tags)} patterns")
+        logger.info(f"Tag index built: {len(category_tags)} categories, "
+                   f"{len(query_pattern_tags)} patterns")
+        return category_tags, query_pattern_tags, term_to_tags
     
     def _generate_category_tags(self, category: str) -> List[Dict]:
         """Generate tags for a specific category."""
@@ -138,7 +517,7 @@ class TagIndexService:
         }
         return material_map.get(category.lower(), ['Wood', 'Fabric'])
     
-    def _build_query_pattern_index(self):
+    def _build_query_pattern_index(self) -> Dict[str, List[Dict]]:
         """Build index for common query patterns."""
         # Common furniture query patterns
         patterns = {
@@ -153,6 +532,7 @@ class TagIndexService:
             'brown': ['Walnut', 'Oak', 'Leather', 'Wood', 'Traditional']
         }
         
+        query_pattern_tags = {}
         for pattern, tag_list in patterns.items():
             tags = []
             for i, tag in enumerate(tag_list):
@@ -162,7 +542,8 @@ class TagIndexService:
                     'type': tag_type,
                     'relevance_score': 0.9 - (i * 0.1)
                 })
-            self.query_pattern_tags[pattern] = tags
+            query_pattern_tags[pattern] = tags
+        return query_pattern_tags
     
     def _infer_tag_type(self, tag: str) -> str:
         """Infer tag type from tag value."""
@@ -171,35 +552,39 @@ class TagIndexService:
         if any(price_word in tag_lower for price_word in ['under', '$', 'over']):
             return 'price_range'
         
-        categories = [c.lower() for c in self.catalog_values.get('categories', [])]
-        if tag_lower in categories:
-            return 'category'
-        
-        materials = [m.lower() for m in self.catalog_values.get('materials', [])]
-        if tag_lower in materials:
-            return 'material'
-        
-        styles = [s.lower() for s in self.catalog_values.get('styles', [])]
-        if tag_lower in styles:
-            return 'style'
-        
-        colors = [c.lower() for c in self.catalog_values.get('colors', [])]
-        if tag_lower in colors:
-            return 'color'
+        tag_type = self.catalog.tag_type_of(tag)
+        if tag_type:
+            return tag_type
         
         return 'category'  # Default
     
-    def _build_inverted_index(self):
+    def _build_inverted_index(
+        self,
+        category_tags: Dict[str, List[Dict]],
+        query_pattern_tags: Dict[str, List[Dict]]
+    ) -> Dict[str, Set[str]]:
         """Build inverted index: term -> tags."""
+        term_to_tags = defaultdict(set)
+        
         # Index category tags
-        for category, tags in self.category_tags.items():
+        for category, tags in category_tags.items():
             for tag in tags:
-                self.term_to_tags[category].add(tag['tag'])
+                term_to_tags[category].add(tag['tag'])
         
         # Index query pattern tags
-        for pattern, tags in self.query_pattern_tags.items():
+        for pattern, tags in query_pattern_tags.items():
             for tag in tags:
-                self.term_to_tags[pattern].add(tag['tag'])
+                term_to_tags[pattern].add(tag['tag'])
+        
+        return dict(term_to_tags)
+    
+    def _match_keys(self, query: str) -> Tuple:
+        """Find index keys in a query by longest phrase match (current snapshot)."""
+        return self._state.match_keys(query)
+    
+    def _tags_for_keys(self, keys: Tuple) -> List[Dict]:
+        """Merged, pre-sorted tag list for a key set (current snapshot)."""
+        return self._state.tags_for_keys(keys)
     
     def has_tags_for_query(self, query: str) -> bool:
         """
@@ -211,15 +596,12 @@ class TagIndexService:
         Returns:
             True if tags exist in index, False otherwise
         """
-        query_lower = query.lower()
-        query_terms = query_lower.split()
+        state = self._state
+        normalized = normalize_query(query)
+        if normalized in state.query_tags or normalized in self.promoted:
+            return True
         
-        # Check if any term matches our index
-        for term in query_terms:
-            if term in self.category_tags or term in self.query_pattern_tags:
-                return True
-        
-        return False
+        return bool(state.match_keys(query))
     
     def get_tags_for_query(self, query: str, max_tags: int = 10) -> List[Dict]:
         """
@@ -232,36 +614,49 @@ class TagIndexService:
         Returns:
             List of tag dicts with tag, type, relevance_score
         """
-        query_lower = query.lower()
-        query_terms = query_lower.split()
-        
-        # Collect tags from all matching patterns
-        all_tags = []
-        seen_tags = set()
+        state = self._state
+        normalized = normalize_query(query)
+        precomputed = state.query_tags.get(normalized) or self.promoted.get(normalized)
+        if precomputed:
+            return precomputed[:max_tags]
         
-        # 1. Check for exact category matches
-        for term in query_terms:
-            if term in self.category_tags:
-                for tag in self.category_tags[term]:
-                    if tag['tag'] not in seen_tags:
-                        all_tags.append(tag)
-                        seen_tags.add(tag['tag'])
+        keys = state.match_keys(query)
         
-        # 2. Check for query pattern matches
-        for term in query_terms:
-            if term in self.query_pattern_tags:
-                for tag in self.query_pattern_tags[term]:
-                    if tag['tag'] not in seen_tags:
-                        all_tags.append(tag)
-                        seen_tags.add(tag['tag'])
+        # If no matches, return generic popular tags
+        if not keys:
+            return self._get_generic_tags()[:max_tags]
         
-        # 3. If no matches, return generic popular tags
-        if not all_tags:
-            all_tags = self._get_generic_tags()
+        return state.tags_for_keys(keys)[:max_tags]
+    
+    def get_facet_tags(
+        self,
+        query: str,
+        aggregations: Dict,
+        total: int,
+        max_tags: int = 10,
+        min_count: int = 2
+    ) -> List[Dict]:
+        """
+        Build tags from the facet aggregations of a query's result set.
         
-        # Sort by relevance and limit
-        all_tags.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return all_tags[:max_tags]
+        Args:
+            query: User search query (tags it already contains are skipped)
+            aggregations: Facet aggregation buckets from the retrieval request
+            total: Number of documents the aggregations ran over
+            max_tags: Maximum number of tags to return
+            min_count: Minimum matching documents for a tag
+            
+        Returns:
+            List of tag dicts with tag, type, relevance_score and count
+        """
+        query_terms = {stem_term(t) for t in tokenize(query)}
+        counts = count_facets(aggregations, self.catalog)
+        for tag_type, tag in list(counts):
+            tag_terms = {stem_term(t) for t in tokenize(tag)}
+            if tag_terms and tag_terms <= query_terms:
+                del counts[(tag_type, tag)]
+        
+        return select_tags(counts, total, min_count)[:max_tags]
     
     def _get_generic_tags(self) -> List[Dict]:
         """Get generic popular tags when no specific match."""
@@ -278,37 +673,153 @@ class TagIndexService:
         Determine if LLM should be used for tag generation.
         Use LLM only for complex/unique queries not in index.
         """
-        query_lower = query.lower()
-        query_terms = query_lower.split()
+        return not self.has_tags_for_query(query)
+    
+    def record_llm_tags(self, query: str, tags: List[Dict]) -> bool:
+        """
+        Count a Tier-2 (LLM) tag result and promote it once the query is popular.
         
-        # Check if any term matches our index
-        for term in query_terms:
-            if term in self.category_tags or term in self.query_pattern_tags:
-                return False  # Use pre-computed tags
+        A query is promoted when its estimated frequency reaches
+        promotion.min_count and it is among the top-k Tier-2 queries.
         
-        # Use LLM for unique/complex queries
+        Args:
+            query: User search query
+            tags: Validated LLM tags served for the query
+            
+        Returns:
+            True if the query was promoted into Tier 1
+        """
+        if not self.promotion_enabled or not tags:
+            return False
+        
+        normalized = normalize_query(query)
+        count, is_heavy_hitter = self.frequency_tracker.add(normalized)
+        if not is_heavy_hitter or count < self.promotion_min_count:
+            return False
+        
+        self.promoted.put(normalized, tags, count)
+        try:
+            self.promoted.save()
+        except OSError as e:
+            logger.warning(f"Could not persist promoted tags: {str(e)}")
+        
+        logger.info(f"Promoted LLM tags for '{normalized}' into Tier 1 (~{count} requests)")
         return True
     
     def export_index(self, filepath: str):
-        """Export tag index to JSON file for persistence."""
-        index_data = {
-            'category_tags': self.category_tags,
-            'query_pattern_tags': self.query_pattern_tags,
-            'term_to_tags': {k: list(v) for k, v in self.term_to_tags.items()}
-        }
-        
-        with open(filepath, 'w') as f:
-            json.dump(index_data, f, indent=2)
-        
-        logger.info(f"Tag index exported to {filepath}")
+        """
+        Export the current snapshot as compact, versioned JSON.
+        Paths ending in .gz are gzip-compressed.
+        """
+        write_index_file(filepath, self._state.to_dict())
+        logger.info(f"Tag index version {self._state.version} exported to {filepath}")
     
     def load_index(self, filepath: str):
-        """Load tag index from JSON file."""
-        with open(filepath, 'r') as f:
-            index_data = json.load(f)
+        """Load a tag index snapshot file and swap it in atomically."""
+        index_data = read_index_file(filepath)
+        check_format_version(index_data, filepath)
+        
+        snapshot = TagIndexSnapshot.create(
+            index_data['category_tags'],
+            index_data['query_pattern_tags'],
+            {k: set(v) for k, v in index_data['term_to_tags'].items()},
+            index_data.get('query_tags', {}),
+            index_data.get('version', 'unversioned'),
+            filepath
+        )
+        with self._reload_lock:
+            self._state = snapshot
+        
+        logger.info(f"Tag index loaded from {filepath}: {len(snapshot.category_tags)} categories, "
+                   f"{len(snapshot.query_pattern_tags)} patterns")
+    
+    # =========================================================================
+    # Hot reload
+    # =========================================================================
+    
+    def reload(self) -> bool:
+        """
+        Rebuild the index from the configured sources and swap it in.
         
-        self.category_tags = index_data['category_tags']
-        self.query_pattern_tags = index_data['query_pattern_tags']
-        self.term_to_tags = {k: set(v) for k, v in index_data['term_to_tags'].items()}
+        Request threads keep serving the old snapshot until the swap. On
+        failure the old snapshot stays in place.
         
-        logger.info(f"Tag index loaded from {filepath}")
+        Returns:
+            True if a new snapshot was installed
+        """
+        with self._reload_lock:
+            try:
+                snapshot = self._build_state()
+            except Exception as e:
+                logger.error(f"Tag index reload failed, keeping version "
+                            f"{self._state.version}: {str(e)}")
+                return False
+            self._state = snapshot
+            self.promoted.merge_from_disk()
+        
+        logger.info(f"Tag index reloaded: version {snapshot.version} from {snapshot.source}")
+        return True
+    
+    def reload_async(self) -> threading.Thread:
+        """Reload in a background thread (for signal handlers and admin endpoints)."""
+        thread = threading.Thread(target=self.reload, name='tag-index-reload', daemon=True)
+        thread.start()
+        return thread
+    
+    def _source_mtimes(self) -> Tuple:
+        """
+        Modification times (ns) of the tag index, warm cache and promoted
+        overlay files (None when missing).
+        """
+        mtimes = []
+        for path in (self.tag_index_path, self.warm_cache_path, self.promoted.path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns if path else None)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def start_watcher(self, poll_interval_seconds: float = 30.0):
+        """Poll the index source files and reload when they change."""
+        if self._watcher_stop is not None:
+            return
+        
+        stop = threading.Event()
+        self._watcher_stop = stop
+        initial = self._source_mtimes()
+        
+        def watch():
+            last_seen = initial
+            while not stop.wait(poll_interval_seconds):
+                current = self._source_mtimes()
+                if current == last_seen:
+                    continue
+                if current[:2] != last_seen[:2]:
+                    logger.info("Tag index sources changed, reloading")
+                    self.reload()
+                elif current[2] != self.promoted.saved_mtime_ns:
+                    # Only another worker's promotions changed: merge them in
+                    self.promoted.merge_from_disk()
+                last_seen = current
+        
+        threading.Thread(target=watch, name='tag-index-watcher', daemon=True).start()
+        logger.info(f"Watching tag index sources every {poll_interval_seconds}s")
+    
+    def stop_watcher(self):
+        """Stop the file watcher thread."""
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+            self._watcher_stop = None
+    
+    def get_snapshot_info(self) -> Dict:
+        """Version and load time of the snapshot currently serving requests."""
+        state = self._state
+        return {
+            'version': state.version,
+            'source': state.source,
+            'loaded_at': datetime.fromtimestamp(state.loaded_at, timezone.utc).isoformat(),
+            'categories': len(state.category_tags),
+            'patterns': len(state.query_pattern_tags),
+            'query_tags': len(state.query_tags),
+            'promoted_queries': len(self.promoted)
+        }
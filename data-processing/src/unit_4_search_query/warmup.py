@@ -0,0 +1,176 @@
+"""
+Unit 4: Search Node Warm-up
+Pays the first-request costs of a fresh search node before it takes
+traffic: connection setup (TLS to OpenSearch and Bedrock), loading the
+k-NN (HNSW) graphs into native memory via the k-NN warmup API, and
+replaying head queries to prime the LLM, tag and candidate caches.
+Readiness is reported through /health once warm-up has finished.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Warm-up steps in the order they run
+WARMUP_STEPS = ('connections', 'knn', 'head_queries')
+
+
+def load_head_queries(warmup_config: Dict) -> List[str]:
+    """
+    Head queries to replay: warmup.head_queries plus head_queries_file
+    (one query per line, most frequent first), deduplicated and capped
+    at max_head_queries.
+    """
+    queries = list(warmup_config.get('head_queries', []))
+
+    path = warmup_config.get('head_queries_file')
+    if path:
+        try:
+            with open(path, 'r') as f:
+                queries.extend(line.strip() for line in f)
+        except OSError as e:
+            logger.warning(f"Could not read head queries file {path}: {str(e)}")
+
+    unique = [q for q in dict.fromkeys(queries) if q]
+    return unique[:warmup_config.get('max_head_queries', 100)]
+
+
+class SearchWarmer:
+    """
+    Warm-up and readiness state for one SearchQueryService.
+
+    Configured by the warmup section of config.yaml:
+        enabled, steps (connections, knn, head_queries)
+        bedrock_probe_query: embedded once to open the Bedrock connection
+        knn_timeout_seconds: per-index k-NN warmup request timeout
+        head_queries, head_queries_file, max_head_queries
+        replay_concurrency, max_seconds (time budget for the replay)
+
+    Every step is best effort: failures are logged and reported, and the
+    node still becomes ready.
+    """
+
+    def __init__(self, search_service, config: Dict):
+        self.search_service = search_service
+        self.warmup_config = config.get('warmup', {})
+        self.enabled = self.warmup_config.get('enabled', True)
+        self.steps = tuple(self.warmup_config.get('steps', WARMUP_STEPS))
+
+        self.lock = threading.Lock()
+        self.state = 'pending' if self.enabled else 'ready'
+        self.report: Dict = {}
+
+    @property
+    def ready(self) -> bool:
+        """True once warm-up has finished (or is disabled)."""
+        return self.state == 'ready'
+
+    def status(self) -> Dict:
+        """Readiness and the last warm-up report (for /health)."""
+        with self.lock:
+            return {'state': self.state, 'ready': self.state == 'ready', **self.report}
+
+    def run(self, steps: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Run warm-up steps synchronously and mark the node ready.
+
+        Args:
+            steps: Subset of WARMUP_STEPS (default: warmup.steps)
+
+        Returns:
+            Report with per-step timings and errors
+        """
+        if not self.enabled:
+            return self.status()
+
+        steps = self.steps if steps is None else tuple(steps)
+        steps = [step for step in WARMUP_STEPS if step in steps]
+        with self.lock:
+            self.state = 'warming'
+
+        start = time.perf_counter()
+        report = {'steps': {}, 'errors': []}
+        for step in steps:
+            step_start = time.perf_counter()
+            try:
+                result = getattr(self, f'_warm_{step}')()
+            except Exception as e:
+                logger.warning(f"Warm-up step {step} failed: {str(e)}")
+                report['errors'].append(f"{step}: {str(e)}")
+                result = None
+            report['steps'][step] = {
+                'ms': round((time.perf_counter() - step_start) * 1000, 1),
+                **(result or {})
+            }
+        report['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        with self.lock:
+            self.report = report
+            self.state = 'ready'
+        logger.info(f"✓ Warm-up finished in {report['total_ms']:.0f}ms "
+                    f"({', '.join(steps) or 'no steps'}; {len(report['errors'])} errors)")
+        return report
+
+    def start_background(self, steps: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Run warm-up in a daemon thread; /health reports 'warming' until done."""
+        with self.lock:
+            if self.enabled:
+                self.state = 'warming'
+        thread = threading.Thread(target=self.run, args=(steps,), name='search-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_connections(self) -> Dict:
+        """Open the OpenSearch and Bedrock connections (TLS handshakes)."""
+        service = self.search_service
+        opensearch_ok = service.clients.warm_up() is not None
+
+        probe = self.warmup_config.get('bedrock_probe_query', 'sofa')
+        if probe:
+            service.generate_query_embedding(probe)
+        return {'opensearch_ping': opensearch_ok}
+
+    def _warm_knn(self) -> Dict:
+        """Load the text and image k-NN graphs into native memory."""
+        service = self.search_service
+        timeout = self.warmup_config.get('knn_timeout_seconds', 60)
+
+        shards = {}
+        for index in (service.text_index, service.image_index):
+            response = service.opensearch_client.transport.perform_request(
+                'GET', f'/_plugins/_knn/warmup/{index}',
+                params={'request_timeout': timeout}
+            )
+            shards[index] = (response or {}).get('_shards', {})
+        return {'indices': shards}
+
+    def _warm_head_queries(self) -> Dict:
+        """Replay head queries through text search to prime the caches."""
+        service = self.search_service
+        queries = load_head_queries(self.warmup_config)
+        if not queries:
+            return {'queries': 0}
+
+        deadline = time.perf_counter() + self.warmup_config.get('max_seconds', 60)
+
+        def replay(query: str) -> bool:
+            if time.perf_counter() > deadline:
+                return False
+            try:
+                with service.metrics.request('warmup'):
+                    response = service._text_results(query)
+            except Exception as e:
+                logger.warning(f"Warm-up query '{query}' failed: {str(e)}")
+                return False
+            return response.get('status') == 'success'
+
+        max_workers = max(1, min(self.warmup_config.get('replay_concurrency', 4), len(queries)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            replayed = sum(executor.map(replay, queries))
+
+        return {'queries': len(queries), 'replayed': replayed,
+                'skipped_or_failed': len(queries) - replayed}